@@ -0,0 +1,131 @@
+"""Concurrency benchmark: sync Supabase calls in async handlers vs the async pool.
+
+Drives ``GET /api/drinks/sessions/{id}`` with many concurrent clients against
+a fake PostgREST upstream that answers every query after ``--latency`` ms.
+The baseline mounts the pre-async handler, which calls a synchronous client
+and blocks the event loop for every round trip.
+
+    cd backend && python -m benchmarks.bench_async_db --requests 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://upstream")
+
+import httpx
+from fastapi import Depends, FastAPI
+from postgrest import SyncPostgrestClient
+
+from db import db
+from main import app
+from routers.auth import get_current_user
+
+SESSION = {"id": "s1", "user_id": "u1", "started_at": "2026-01-01T00:00:00+00:00"}
+
+
+def _respond(request: httpx.Request) -> httpx.Response:
+    if "object" in request.headers.get("accept", ""):
+        return httpx.Response(200, json=SESSION)
+    return httpx.Response(200, json=[{"id": "l1", "session_id": "s1"}])
+
+
+def async_upstream(latency: float) -> httpx.MockTransport:
+    async def handler(request):
+        await asyncio.sleep(latency)
+        return _respond(request)
+
+    return httpx.MockTransport(handler)
+
+
+def blocking_upstream(latency: float) -> httpx.MockTransport:
+    def handler(request):
+        time.sleep(latency)
+        return _respond(request)
+
+    return httpx.MockTransport(handler)
+
+
+def blocking_app(latency: float) -> FastAPI:
+    """The handler as it was before the async data-access layer."""
+    client = SyncPostgrestClient("http://upstream/rest/v1")
+    client.session = httpx.Client(
+        base_url="http://upstream/rest/v1", transport=blocking_upstream(latency)
+    )
+    legacy = FastAPI()
+
+    @legacy.get("/api/drinks/sessions/{session_id}")
+    async def get_session(session_id: str, user_id: str = Depends(get_current_user)):
+        session = (
+            client.from_("drink_sessions")
+            .select("*")
+            .eq("id", session_id)
+            .eq("user_id", user_id)
+            .single()
+            .execute()
+        )
+        logs = (
+            client.from_("drink_logs")
+            .select("*")
+            .eq("session_id", session_id)
+            .order("logged_at")
+            .execute()
+        )
+        return {"session": session.data, "logs": logs.data or []}
+
+    legacy.dependency_overrides[get_current_user] = lambda: "u1"
+    return legacy
+
+
+async def drive(target: FastAPI, requests: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=target)
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one():
+            async with sem:
+                start = time.perf_counter()
+                response = await client.get("/api/drinks/sessions/s1")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "throughput_rps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=20, help="upstream latency in ms")
+    args = parser.parse_args()
+    latency = args.latency / 1000
+
+    db.use_transport(async_upstream(latency))
+    app.dependency_overrides[get_current_user] = lambda: "u1"
+
+    results = {
+        "blocking": await drive(blocking_app(latency), args.requests, args.concurrency),
+        "async_pool": await drive(app, args.requests, args.concurrency),
+    }
+    results["speedup"] = round(
+        results["async_pool"]["throughput_rps"] / results["blocking"]["throughput_rps"], 1
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""Per-request auth overhead: full JWT verification vs the verified-token cache.
+
+Calls get_current_user directly with a freshly signed Supabase-style token,
+once with the cache cleared before every call and once warm.
+
+    cd backend && python -m benchmarks.bench_auth --iterations 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+
+from jose import jwt
+
+from config import SUPABASE_JWT_SECRET
+from routers.auth import get_current_user, verified_tokens
+
+
+async def per_call_us(authorization: str, iterations: int, cached: bool) -> float:
+    await get_current_user(authorization)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if not cached:
+            verified_tokens.clear()
+        await get_current_user(authorization)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = jwt.encode(
+        {"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 3600, "role": "authenticated"},
+        SUPABASE_JWT_SECRET,
+        algorithm="HS256",
+    )
+    authorization = f"Bearer {token}"
+
+    uncached = await per_call_us(authorization, args.iterations, cached=False)
+    verified_tokens.hits = verified_tokens.misses = 0
+    cached = await per_call_us(authorization, args.iterations, cached=True)
+    print(
+        json.dumps(
+            {
+                "uncached_us_per_request": round(uncached, 2),
+                "cached_us_per_request": round(cached, 2),
+                "speedup": round(uncached / cached, 1),
+                "cache": verified_tokens.stats(),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""BAC timeline engine cost for large sessions.
+
+Times building a BACTimeline, sampling the curve and locating the exact
+peak for sessions with many drinks and many sample points.
+
+    cd backend && python -m benchmarks.bench_bac_timeline --drinks 10 100 500 --points 5000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from services.bac_timeline import BACTimeline
+
+
+def session_logs(drinks: int, seed: int = 7) -> list[dict]:
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, 21, tzinfo=timezone.utc)
+    minutes = sorted(rng.uniform(0, 6 * 60) for _ in range(drinks))
+    return [
+        {
+            "logged_at": (start + timedelta(minutes=m)).isoformat(),
+            "standard_drink_equivalent": rng.choice([1.0, 1.0, 1.5]),
+        }
+        for m in minutes
+    ]
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--drinks", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--points", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = {}
+    for drinks in args.drinks:
+        logs = session_logs(drinks)
+        timeline = BACTimeline(logs, 160, "male")
+        start = timeline.origin
+        end = start + timedelta(hours=12)
+        results[drinks] = {
+            "build_ms": best_of(lambda: BACTimeline(logs, 160, "male"), args.repeat),
+            f"sample_{args.points}_ms": best_of(
+                lambda: timeline.sample(start, end, args.points), args.repeat
+            ),
+            "peak_ms": best_of(timeline.peak, args.repeat),
+            "peak_bac": timeline.peak()[0],
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
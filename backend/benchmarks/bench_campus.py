@@ -0,0 +1,208 @@
+"""End-to-end load test of the API on a synthetic campus.
+
+Seeds benchmarks.campus into an in-memory PostgREST store (local_db), then
+drives the real FastAPI app in process over httpx.ASGITransport with
+--concurrency clients, each sending a fixed mix of what students do on a
+night out: checking their session and projection, logging drinks, looking
+at friends, alerts, history and leaderboards, polling the unread badge, and
+searching universities. Reports p50/p95/p99 latency and throughput per
+endpoint.
+
+Runs are comparable: the campus, the users each client acts as and the
+request mix all come from --seed, and the first --warmup requests (cold
+boards, caches and indexes) are not measured. Save a run with --save and
+pass it as --baseline to a later run to print the change per endpoint.
+Timings include FastAPI background tasks (ASGITransport waits for them)
+and no network, so they measure the app's own cost per request. Clients
+send back to back (closed loop), so at high concurrency most of the
+latency is queueing on the event loop; --concurrency 1 gives the service
+time of each endpoint on its own.
+
+    cd backend && python -m benchmarks.bench_campus --users 10000 --requests 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://upstream")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+
+import httpx
+import numpy as np
+from jose import jwt
+
+from benchmarks.campus import DRINK_TYPES, seed_campus
+from db import db
+from main import app
+from services.university_index import get_index
+
+# (label, weight); a label is the route template the request hits
+MIX = [
+    ("GET /api/drinks/sessions/active", 14),
+    ("GET /api/drinks/sessions/active/projection", 10),
+    ("POST /api/drinks/log", 12),
+    ("GET /api/social/friends", 14),
+    ("GET /api/social/alerts", 8),
+    ("GET /api/social/alerts/unread", 10),
+    ("GET /api/profile/", 8),
+    ("GET /api/drinks/history", 8),
+    ("GET /api/leaderboard/university", 10),
+    ("GET /api/leaderboard/group/{group_id}", 8),
+    ("GET /api/social/groups/{group_id}/live", 6),
+    ("GET /api/universities/search", 8),
+]
+SEARCHES = ["stan", "univ of mich", "state", "college", "tech", "new york", "calif", "texas a&m"]
+
+
+class Client:
+    def __init__(self, campus, rng: random.Random, http: httpx.AsyncClient):
+        self.campus = campus
+        self.rng = rng
+        self.http = http
+        self.tokens: dict[str, str] = {}
+        self.labels = [label for label, _ in MIX]
+        self.weights = [weight for _, weight in MIX]
+
+    def headers(self, user_id: str) -> dict:
+        token = self.tokens.get(user_id)
+        if token is None:
+            token = self.tokens[user_id] = jwt.encode(
+                {"sub": user_id, "aud": "authenticated", "exp": time.time() + 86400},
+                os.environ["SUPABASE_JWT_SECRET"],
+            )
+        return {"Authorization": f"Bearer {token}"}
+
+    async def request(self) -> tuple[str, float, int]:
+        rng, campus = self.rng, self.campus
+        label = rng.choices(self.labels, self.weights)[0]
+        method, path = label.split(" ", 1)
+        user_id = rng.choice(campus.users)
+        kwargs = {}
+
+        if label in ("GET /api/drinks/sessions/active/projection", "POST /api/drinks/log"):
+            user_id = rng.choice(self.active_users)
+        if label == "POST /api/drinks/log":
+            kwargs["json"] = {
+                "session_id": campus.active_sessions[user_id],
+                "drink_type": rng.choice(DRINK_TYPES),
+            }
+        elif label == "GET /api/leaderboard/university":
+            kwargs["params"] = {"name": rng.choice(campus.universities), "limit": 50}
+        elif label == "GET /api/leaderboard/group/{group_id}":
+            path = path.format(group_id=rng.choice(campus.groups))
+        elif label == "GET /api/social/groups/{group_id}/live":
+            group_id = rng.choice(campus.groups)
+            user_id = rng.choice(campus.store.lookup("friend_group_members", "group_id", group_id))["user_id"]
+            path = path.format(group_id=group_id)
+        elif label == "GET /api/universities/search":
+            kwargs["params"] = {"q": rng.choice(SEARCHES)}
+
+        start = time.perf_counter()
+        response = await self.http.request(method, path, headers=self.headers(user_id), **kwargs)
+        return label, time.perf_counter() - start, response.status_code
+
+
+def summarize(samples: dict[str, list[float]], errors: dict[str, int], wall: float) -> dict:
+    endpoints = {}
+    for label, _ in MIX:
+        latencies = np.array(samples.get(label, []), dtype=np.float64) * 1000
+        if not latencies.size:
+            continue
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        endpoints[label] = {
+            "requests": int(latencies.size),
+            "errors": errors.get(label, 0),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "requests_per_second": round(latencies.size / wall, 1),
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {"requests_per_second": round(total / wall, 1), "endpoints": endpoints}
+
+
+def compare(result: dict, baseline: dict) -> dict:
+    """Ratio of this run to the baseline (below 1 is faster) per endpoint."""
+    out = {}
+    for label, now in result["endpoints"].items():
+        before = baseline["endpoints"].get(label)
+        if before:
+            out[label] = {
+                key: round(now[key] / before[key], 3) if before[key] else None
+                for key in ("p50_ms", "p95_ms", "p99_ms", "requests_per_second")
+            }
+    return out
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--warmup", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", help="write the results as JSON to this path")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    campus = seed_campus(users=args.users, seed=args.seed)
+    seed_s = time.perf_counter() - start
+    db.use_transport(campus.store)
+    get_index()
+
+    samples: dict[str, list[float]] = {}
+    errors: dict[str, int] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://campus") as http:
+        active_users = sorted(campus.active_sessions)
+        clients = []
+        for i in range(args.concurrency):
+            client = Client(campus, random.Random(args.seed * 1000 + i), http)
+            client.active_users = active_users
+            clients.append(client)
+
+        async def run(client: Client, count: int, record: bool):
+            for _ in range(count):
+                label, elapsed, status = await client.request()
+                if record:
+                    samples.setdefault(label, []).append(elapsed)
+                    if status >= 400:
+                        errors[label] = errors.get(label, 0) + 1
+
+        per_client = args.warmup // args.concurrency
+        await asyncio.gather(*(run(c, per_client, False) for c in clients))
+
+        per_client = args.requests // args.concurrency
+        start = time.perf_counter()
+        await asyncio.gather(*(run(c, per_client, True) for c in clients))
+        wall = time.perf_counter() - start
+
+    result = {
+        "config": {
+            "users": args.users,
+            "requests": per_client * args.concurrency,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "seed_seconds": round(seed_s, 2),
+        "rows": {name: len(rows) for name, rows in campus.store.tables.items()},
+        **summarize(samples, errors, wall),
+    }
+    if args.baseline:
+        with open(args.baseline) as f:
+            result["vs_baseline"] = compare(result, json.load(f))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
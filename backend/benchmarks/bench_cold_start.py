@@ -0,0 +1,71 @@
+"""Time from process start to the first healthy /api/health response.
+
+Launches uvicorn the way the Dockerfile does, polls /api/health until it
+answers 200, then kills the process; repeated --runs times. This is the
+delay the first request after a scale-from-zero waits for, on top of the
+machine boot itself. No upstream is needed: warm-up failures are logged and
+don't hold up serving.
+
+    cd backend && python -m benchmarks.bench_cold_start --runs 5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+
+def health_ok(port: int) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.5) as sock:
+            sock.sendall(b"GET /api/health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            return sock.recv(64).startswith(b"HTTP/1.1 200")
+    except OSError:
+        return False
+
+
+def start_to_health(port: int, env: dict, timeout: float = 30) -> float:
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        while not health_ok(port):
+            if server.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError("server did not become healthy")
+            time.sleep(0.005)
+        return time.perf_counter() - start
+    finally:
+        server.kill()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    env = {**os.environ, "SUPABASE_URL": os.environ.get("SUPABASE_URL", "http://127.0.0.1:9")}
+    samples = [start_to_health(args.port, env) * 1000 for _ in range(args.runs)]
+    print(
+        json.dumps(
+            {
+                "runs": args.runs,
+                "min_ms": round(min(samples)),
+                "median_ms": round(statistics.median(samples)),
+                "max_ms": round(max(samples)),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Memory and lookup cost of the in-memory friend graph.
+
+Seeds benchmarks.campus, builds services.friend_graph from it and reports
+the bytes each accepted friendship costs (tracemalloc over the build, so
+interned ids and per-user arrays are included) and the time to apply them.
+Then times the visibility decision send_friend_alerts makes, and the friend
+list /friends needs, through the graph and through the queries it replaces. The queries run
+against the in-memory store, so the gap is the client and store cost alone;
+against Supabase each one also pays a network round trip.
+
+    cd backend && python -m benchmarks.bench_friend_graph --users 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import tracemalloc
+
+os.environ.setdefault("SUPABASE_URL", "http://upstream")
+
+from benchmarks.campus import seed_campus
+from db import db
+from services.alert_service import _drink_viewers
+from services.friend_graph import FriendGraph
+
+
+async def timed(calls: int, fn) -> float:
+    """Mean microseconds per call of `fn(i)`, which may be sync or async."""
+    start = time.perf_counter()
+    for i in range(calls):
+        result = fn(i)
+        if asyncio.iscoroutine(result):
+            await result
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--friends", type=int, default=12)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    campus = seed_campus(users=args.users, friends_per_user=args.friends, seed=args.seed)
+    db.use_transport(campus.store)
+
+    # Built from the seeded rows as rebuild() would apply them: keyset pages
+    # scan the whole table in the in-memory store, where Postgres would use
+    # the primary key, so timing rebuild() here would measure the store
+    rows = sorted(
+        (f for f in campus.store["friendships"] if f["status"] == "accepted"), key=lambda f: f["id"]
+    )
+    start = time.perf_counter()
+    graph = FriendGraph()
+    for row in rows:
+        graph.apply(row)
+    build_s = time.perf_counter() - start
+
+    graph = FriendGraph()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for row in rows:
+        graph.apply(row)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    graph.ready = True
+    edges = graph.edge_count()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    rng = random.Random(args.seed)
+    users = [rng.choice(campus.users) for _ in range(args.lookups)]
+    sessions = [campus.active_sessions.get(u, "none") for u in users]
+
+    async def query_friends(i):
+        user_id = users[i]
+        result = await (
+            db.table("friendships")
+            .select("requester_id, addressee_id")
+            .or_(f"requester_id.eq.{user_id},addressee_id.eq.{user_id}")
+            .eq("status", "accepted")
+            .execute()
+        )
+        return result.data
+
+    print(
+        json.dumps(
+            {
+                "users": args.users,
+                "edges": edges,
+                "build_ms": round(build_s * 1000, 1),
+                "retained_bytes": retained,
+                "bytes_per_edge": round(retained / edges, 1) if edges else None,
+                "edge_array_bytes_per_edge": round(graph.stats()["edge_bytes"] / edges, 1) if edges else None,
+                "drink_viewers_us": {
+                    "graph": round(await timed(args.lookups, lambda i: graph.drink_viewers(users[i], sessions[i])), 2),
+                    "queries": round(await timed(args.lookups, lambda i: _drink_viewers(users[i], sessions[i])), 2),
+                },
+                "friend_ids_us": {
+                    "graph": round(await timed(args.lookups, lambda i: graph.friend_ids(users[i])), 2),
+                    "query": round(await timed(args.lookups, query_friends), 2),
+                },
+                "stats": graph.stats(),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
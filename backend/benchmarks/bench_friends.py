@@ -0,0 +1,118 @@
+"""GET /api/social/friends latency as the friend count grows.
+
+A fake PostgREST upstream answers every query after ``--latency`` ms. The
+legacy handler issues one drink_sessions query per friend; the current one
+resolves presence for all friends in a single batched query.
+
+    cd backend && python -m benchmarks.bench_friends --friends 10 50 150 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://upstream")
+
+import httpx
+from fastapi import Depends, FastAPI
+
+from db import db
+from main import app
+from routers.auth import get_current_user
+
+
+def upstream(friend_count: int, latency: float, round_trips: list) -> httpx.MockTransport:
+    friendships = [
+        {
+            "id": f"f{i}",
+            "requester_id": "u0",
+            "addressee_id": f"u{i + 1}",
+            "can_see_drinks": True,
+            "requester": {"id": "u0", "display_name": "me"},
+            "addressee": {"id": f"u{i + 1}", "display_name": f"friend {i}"},
+        }
+        for i in range(friend_count)
+    ]
+
+    async def handler(request):
+        round_trips.append(request.url.path)
+        await asyncio.sleep(latency)
+        if request.url.path.endswith("friendships"):
+            return httpx.Response(200, json=friendships)
+        # Every third friend is out
+        if "in." in str(request.url.query):
+            return httpx.Response(
+                200, json=[{"user_id": f["addressee_id"]} for f in friendships[::3]]
+            )
+        return httpx.Response(200, json=[{"id": "s1"}])
+
+    return httpx.MockTransport(handler)
+
+
+def legacy_app() -> FastAPI:
+    """The handler as it was before presence was batched."""
+    legacy = FastAPI()
+
+    @legacy.get("/api/social/friends")
+    async def get_friends(user_id: str = Depends(get_current_user)):
+        result = await (
+            db.table("friendships")
+            .select("*, requester:profiles!friendships_requester_id_fkey(id, display_name), addressee:profiles!friendships_addressee_id_fkey(id, display_name)")
+            .or_(f"requester_id.eq.{user_id},addressee_id.eq.{user_id}")
+            .eq("status", "accepted")
+            .execute()
+        )
+        friends = []
+        for f in result.data or []:
+            friend_profile = f["addressee"] if f["requester_id"] == user_id else f["requester"]
+            active = await (
+                db.table("drink_sessions")
+                .select("id")
+                .eq("user_id", friend_profile["id"])
+                .eq("is_active", True)
+                .execute()
+            )
+            friends.append({**friend_profile, "has_active_session": bool(active.data)})
+        return friends
+
+    legacy.dependency_overrides[get_current_user] = lambda: "u0"
+    return legacy
+
+
+async def measure(target: FastAPI, repeat: int, round_trips: list) -> dict:
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        round_trips.clear()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            response = await client.get("/api/social/friends")
+            response.raise_for_status()
+        elapsed = time.perf_counter() - start
+    return {
+        "mean_ms": round(elapsed / repeat * 1000, 1),
+        "round_trips": len(round_trips) // repeat,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--friends", type=int, nargs="+", default=[10, 50, 150, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=5, help="upstream latency in ms")
+    args = parser.parse_args()
+
+    app.dependency_overrides[get_current_user] = lambda: "u0"
+    results = {}
+    for count in args.friends:
+        round_trips = []
+        db.use_transport(upstream(count, args.latency / 1000, round_trips))
+        results[count] = {
+            "legacy": await measure(legacy_app(), args.repeat, round_trips),
+            "batched": await measure(app, args.repeat, round_trips),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
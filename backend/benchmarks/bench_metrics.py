@@ -0,0 +1,108 @@
+"""Cost of the metrics instrumentation per request and per upstream call.
+
+Times MetricsMiddleware around a trivial ASGI app and InstrumentedTransport
+around httpx.MockTransport, each against the bare version, so the numbers
+are the instrumentation alone. For scale it also times a full request to
+the real app in process (PostgREST mocked, so no network), and rendering
+/metrics once every route has a few series. Comparing whole requests with
+and without metrics is not useful here: run-to-run noise is larger than the
+difference.
+
+    cd backend && python -m benchmarks.bench_metrics --iterations 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://upstream")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+
+import httpx
+from jose import jwt
+
+from db import db
+from main import app
+from services import metrics
+
+
+async def trivial_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def discard(message):
+    pass
+
+
+async def per_call_us(call, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        await call()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def middleware_overhead(n: int) -> float:
+    route = next(r for r in app.routes if getattr(r, "path", "") == "/api/drinks/history")
+    scope = {"type": "http", "method": "GET", "route": route}
+    wrapped = metrics.MetricsMiddleware(trivial_app)
+    bare = await per_call_us(lambda: trivial_app(scope, None, discard), n)
+    instrumented = await per_call_us(lambda: wrapped(scope, None, discard), n)
+    return instrumented - bare
+
+
+async def transport_overhead(n: int) -> float:
+    mock = httpx.MockTransport(lambda request: httpx.Response(200, json=[]))
+    wrapped = metrics.InstrumentedTransport(mock)
+    request = httpx.Request("GET", "http://upstream/rest/v1/drink_sessions?user_id=eq.1")
+    bare = await per_call_us(lambda: mock.handle_async_request(request), n)
+    instrumented = await per_call_us(lambda: wrapped.handle_async_request(request), n)
+    return instrumented - bare
+
+
+async def full_request_us(n: int) -> float:
+    db.use_transport(httpx.MockTransport(lambda request: httpx.Response(200, json=[])))
+    token = jwt.encode(
+        {"sub": "bench-user", "aud": "authenticated", "exp": time.time() + 3600},
+        os.environ["SUPABASE_JWT_SECRET"],
+    )
+    headers = {"Authorization": f"Bearer {token}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/api/drinks/history", headers=headers)
+        return await per_call_us(lambda: client.get("/api/drinks/history", headers=headers), n)
+
+
+def render_ms() -> tuple[float, int]:
+    for route in app.routes:
+        for method in getattr(route, "methods", ()):
+            for status in (200, 404, 500):
+                metrics.record({"method": method, "route": route}, status, 0.02, metrics._UpstreamTally())
+    start = time.perf_counter()
+    body = metrics.render()
+    return (time.perf_counter() - start) * 1000, len(body)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    render, size = render_ms()
+    print(
+        json.dumps(
+            {
+                "middleware_us_per_request": round(await middleware_overhead(args.iterations), 2),
+                "transport_us_per_upstream_call": round(await transport_overhead(args.iterations // 5), 2),
+                "full_request_us_for_scale": round(await full_request_us(args.requests), 1),
+                "render_ms": round(render, 2),
+                "render_bytes": size,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
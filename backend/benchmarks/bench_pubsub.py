@@ -0,0 +1,126 @@
+"""Idle subscriber capacity of the realtime stream.
+
+Starts the API under uvicorn in a child process, opens N real connections to
+GET /api/social/stream (one user each), and reads the server's resident
+memory before and after. The per-connection cost is then extrapolated to how
+many idle subscribers fit in one 256 MB instance. No upstream is needed: the
+stream endpoint only verifies the token and waits on the hub.
+
+    cd backend && python -m benchmarks.bench_pubsub --connections 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from jose import jwt
+
+SECRET = "bench-secret"
+INSTANCE_BYTES = 256 * 1024 * 1024
+
+
+def rss_bytes(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    raise RuntimeError("VmRSS not found")
+
+
+async def wait_for_server(port: int, timeout: float = 15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def open_stream(port: int, user_id: str):
+    token = jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 3600},
+        SECRET,
+        algorithm="HS256",
+    )
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /api/social/stream HTTP/1.1\r\n"
+        f"Host: localhost\r\nAuthorization: Bearer {token}\r\n"
+        f"Accept: text/event-stream\r\n\r\n".encode()
+    )
+    await writer.drain()
+    status = await reader.readline()
+    if b" 200 " not in status:
+        raise RuntimeError(f"stream refused: {status!r}")
+    # Headers, then the first chunk (the retry hint)
+    while await reader.readline() not in (b"\r\n", b""):
+        pass
+    await reader.readuntil(b"\n\n")
+    return reader, writer
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    env = {
+        **os.environ,
+        "SUPABASE_URL": os.environ.get("SUPABASE_URL", "http://upstream"),
+        "SUPABASE_JWT_SECRET": SECRET,
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    streams = []
+    try:
+        await wait_for_server(args.port)
+        # Warm up one stream so lazily imported code is already resident
+        streams.append(await open_stream(args.port, "warmup"))
+        await asyncio.sleep(0.5)
+        baseline = rss_bytes(server.pid)
+
+        start = time.perf_counter()
+        for offset in range(0, args.connections, args.batch):
+            count = min(args.batch, args.connections - offset)
+            streams += await asyncio.gather(
+                *(open_stream(args.port, f"user-{offset + i}") for i in range(count))
+            )
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(1)
+        loaded = rss_bytes(server.pid)
+
+        per_connection = (loaded - baseline) / args.connections
+        print(
+            json.dumps(
+                {
+                    "connections": args.connections,
+                    "connect_seconds": round(elapsed, 2),
+                    "baseline_rss_mb": round(baseline / 2**20, 1),
+                    "loaded_rss_mb": round(loaded / 2**20, 1),
+                    "bytes_per_connection": round(per_connection),
+                    "idle_subscribers_per_256mb": int((INSTANCE_BYTES - baseline) / per_connection),
+                },
+                indent=2,
+            )
+        )
+    finally:
+        for _, writer in streams:
+            writer.close()
+        # Open streams never finish on their own, so don't wait out a
+        # graceful shutdown
+        server.kill()
+        server.wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,172 @@
+"""Bulk limit recomputation: scalar vs vectorized, and the job end to end.
+
+Generates N calibrated profiles with three or four calibration sessions
+each. It first times a per-profile path (calculate_limits plus the
+adjustment rule of adjust_limits_from_calibration, then the same change
+detection and row building) against the NumPy path used by
+scripts/recompute_limits.py, both without I/O. It then runs the
+whole job against an in-memory upstream served over httpx.MockTransport
+(calibration_aggregates answered from pre-computed totals) and reports
+profiles per second.
+
+    cd backend && python -m benchmarks.bench_recompute_limits --profiles 50000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+os.environ.setdefault("SUPABASE_URL", "http://upstream")
+
+import httpx
+import numpy as np
+
+from db import db
+from scripts.recompute_limits import changed_rows, recompute
+from services.bac_calculator import calculate_limits
+from services.limit_engine import limits_version
+
+
+def make_data(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    profiles, sessions = [], []
+    for _ in range(n):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        profiles.append(
+            {
+                "id": user_id,
+                "weight_lbs": rng.randint(100, 300),
+                "biological_gender": rng.choice(["male", "female"]),
+                "limits_version": None,
+                "calculated_low_limit": 2,
+                "calculated_med_limit": 3,
+                "calculated_high_limit": 4,
+            }
+        )
+        for number in range(rng.choice([3, 3, 4])):
+            sessions.append(
+                {
+                    "user_id": user_id,
+                    "could_handle_more": rng.random() < 0.5,
+                    "feeling_rating": rng.randint(1, 5),
+                    "session_number": number + 1,
+                }
+            )
+    profiles.sort(key=lambda p: p["id"])
+    sessions.sort(key=lambda s: s["user_id"])
+    return profiles, sessions
+
+
+def scalar_limits(profiles: list[dict], sessions: list[dict]) -> list[dict]:
+    by_user: dict[str, list[dict]] = {}
+    for s in sessions:
+        by_user.setdefault(s["user_id"], []).append(s)
+    out = []
+    for p in profiles:
+        base = calculate_limits(p["weight_lbs"], p["biological_gender"])
+        rows = by_user.get(p["id"], [])
+        handle_more = sum(1 for s in rows if s["could_handle_more"])
+        avg_feeling = sum(s["feeling_rating"] for s in rows) / len(rows)
+        adjustment = 0
+        if handle_more >= 2 and avg_feeling >= 3:
+            adjustment = 1
+        elif handle_more == 0 and avg_feeling <= 2:
+            adjustment = -1
+        limits = {
+            "low": max(1, base["low"] + adjustment),
+            "med": max(2, base["med"] + adjustment),
+            "high": min(base["high"] + adjustment, base["high"]),
+        }
+        version = limits_version(p["weight_lbs"], p["biological_gender"])
+        if p["limits_version"] != version or any(
+            p[f"calculated_{level}_limit"] != value for level, value in limits.items()
+        ):
+            out.append(
+                {
+                    "id": p["id"],
+                    **limits,
+                    "limits_version": version,
+                    "weight_lbs": p["weight_lbs"],
+                    "biological_gender": p["biological_gender"],
+                }
+            )
+    return out
+
+
+def vectorized_limits(profiles: list[dict], sessions: list[dict]) -> list[dict]:
+    position = {p["id"]: i for i, p in enumerate(profiles)}
+    owners = np.array([position[s["user_id"]] for s in sessions], dtype=np.intp)
+    n = len(profiles)
+    return changed_rows(
+        profiles,
+        np.bincount(owners, minlength=n),
+        np.bincount(owners, weights=[s["could_handle_more"] for s in sessions], minlength=n),
+        np.bincount(owners, weights=[s["feeling_rating"] for s in sessions], minlength=n),
+    )
+
+
+def upstream(profiles: list[dict], sessions: list[dict]) -> httpx.MockTransport:
+    profile_ids = [p["id"] for p in profiles]
+    # What calibration_aggregates() returns, per user in id order
+    totals: dict[str, dict] = {}
+    for s in sessions:
+        t = totals.setdefault(s["user_id"], {"user_id": s["user_id"], "sessions": 0, "handle_more": 0, "feeling": 0})
+        t["sessions"] += 1
+        t["handle_more"] += s["could_handle_more"]
+        t["feeling"] += s["feeling_rating"]
+    aggregates = list(totals.values())
+    aggregate_ids = [t["user_id"] for t in aggregates]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if request.url.path.endswith("/profiles"):
+            after = params.get("id", "gt.")[3:]
+            start = np.searchsorted(profile_ids, after, side="right") if after else 0
+            return httpx.Response(200, json=profiles[start:start + int(params["limit"])])
+        body = json.loads(request.content)
+        if request.url.path.endswith("/rpc/calibration_aggregates"):
+            start = np.searchsorted(aggregate_ids, body["p_first"], side="left")
+            end = np.searchsorted(aggregate_ids, body["p_last"], side="right")
+            return httpx.Response(200, json=aggregates[start:end])
+        return httpx.Response(200, json=len(body["p_rows"]))
+
+    return httpx.MockTransport(handler)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    profiles, sessions = make_data(args.profiles)
+
+    start = time.perf_counter()
+    scalar = scalar_limits(profiles, sessions)
+    scalar_s = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorized = vectorized_limits(profiles, sessions)
+    vector_s = time.perf_counter() - start
+    assert vectorized == scalar
+
+    db.use_transport(upstream(profiles, sessions))
+    job = await recompute(args.chunk_size, dry_run=False)
+
+    print(
+        json.dumps(
+            {
+                "profiles": args.profiles,
+                "scalar_profiles_per_second": round(args.profiles / scalar_s),
+                "vectorized_profiles_per_second": round(args.profiles / vector_s),
+                "job": job,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,176 @@
+"""Drink logging from the in-memory session store vs the log_drink RPC.
+
+Seeds benchmarks.campus and sends POST /api/drinks/log through the real app
+(httpx.ASGITransport) for students with an active session, first with the
+store off (every drink is a log_drink round trip) and then with
+services.session_store loaded (answered from memory, written behind in
+batches). The in-memory PostgREST store answers instantly, so
+--latency-ms adds a simulated round trip to every database call; the
+write-behind flushes pay it too, once per batch. Also times the two calls
+directly, without HTTP, and checks that the database ends up with every
+drink either way.
+
+    cd backend && python -m benchmarks.bench_session_store --latency-ms 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://upstream")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "bench-secret")
+
+import httpx
+import numpy as np
+from jose import jwt
+
+from benchmarks.campus import DRINK_TYPES, seed_campus
+from db import db
+from main import app
+from services.drink_logger import record_drink
+from services.profile_cache import get_profile
+from services.session_store import session_store
+
+
+class Delayed(httpx.AsyncBaseTransport):
+    """Adds a fixed round trip to every request sent to `inner`."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, latency: float):
+        self.inner = inner
+        self.latency = latency
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await self.inner.handle_async_request(request)
+
+
+def percentiles(seconds: list[float]) -> dict:
+    ms = np.array(seconds) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+
+
+async def drive(http: httpx.AsyncClient, campus, users: list[str], tokens: dict, args, seed: int) -> dict:
+    samples: list[float] = []
+
+    async def client(i: int):
+        rng = random.Random(seed * 1000 + i)
+        for _ in range(args.requests // args.concurrency):
+            user_id = rng.choice(users)
+            start = time.perf_counter()
+            response = await http.post(
+                "/api/drinks/log",
+                json={"session_id": campus.active_sessions[user_id], "drink_type": rng.choice(DRINK_TYPES)},
+                headers={"Authorization": f"Bearer {tokens[user_id]}"},
+            )
+            samples.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(args.concurrency)))
+    wall = time.perf_counter() - start
+    return {**percentiles(samples), "requests_per_second": round(len(samples) / wall, 1)}
+
+
+async def direct(campus, users: list[str], args) -> dict:
+    """Microseconds per call of each path on its own, one call at a time."""
+    rng = random.Random(args.seed)
+    picks = [rng.choice(users) for _ in range(args.direct)]
+    profiles = {u: await get_profile(u) for u in set(picks)}
+    out = {}
+
+    start = time.perf_counter()
+    for user_id in picks:
+        await record_drink(user_id, campus.active_sessions[user_id], "beer", 1.0, 1.0)
+    out["log_drink_rpc_us"] = round((time.perf_counter() - start) / len(picks) * 1e6, 1)
+
+    start = time.perf_counter()
+    for user_id in picks:
+        session_store.log_drink(user_id, campus.active_sessions[user_id], "beer", 1.0, 1.0, profiles[user_id])
+    out["session_store_us"] = round((time.perf_counter() - start) / len(picks) * 1e6, 1)
+    return out
+
+
+def stored_logs(campus) -> int:
+    return sum(len(campus.store.lookup("drink_logs", "session_id", s)) for s in campus.active_sessions.values())
+
+
+def totals_match(campus) -> bool:
+    """Every active session's stored total equals the sum of its stored logs."""
+    for session_id in campus.active_sessions.values():
+        session = campus.store.get("drink_sessions", session_id)
+        logs = campus.store.lookup("drink_logs", "session_id", session_id)
+        if abs(session["total_standard_drinks"] - sum(l["standard_drink_equivalent"] for l in logs)) > 1e-9:
+            return False
+    return True
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--direct", type=int, default=2000, help="calls per path in the direct timing")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    campus = seed_campus(users=args.users, seed=args.seed)
+    db.use_transport(Delayed(campus.store, args.latency_ms / 1000))
+    users = sorted(campus.active_sessions)
+    tokens = {
+        u: jwt.encode({"sub": u, "aud": "authenticated", "exp": time.time() + 86400}, os.environ["SUPABASE_JWT_SECRET"])
+        for u in users
+    }
+    for user_id in users:
+        await get_profile(user_id)  # both runs read profiles from the cache
+
+    journal_dir = tempfile.mkdtemp()
+    session_store.journal_path = os.path.join(journal_dir, "journal.ndjson")
+
+    results = {}
+    before = stored_logs(campus)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://campus") as http:
+        results["rpc"] = await drive(http, campus, users, tokens, args, args.seed)
+
+        await session_store.load()
+        session_store.start()
+        results["session_store"] = await drive(http, campus, users, tokens, args, args.seed + 1)
+        await session_store.flush()
+
+    stats = session_store.stats()
+    results["direct"] = await direct(campus, users, args)
+    await session_store.stop()
+    logged = 2 * (args.requests // args.concurrency) * args.concurrency + 2 * args.direct
+    print(
+        json.dumps(
+            {
+                "users": args.users,
+                "active_sessions": len(users),
+                "requests_per_run": (args.requests // args.concurrency) * args.concurrency,
+                "concurrency": args.concurrency,
+                "latency_ms": args.latency_ms,
+                **results,
+                "write_behind": {
+                    "batches": stats["batches"],
+                    "avg_batch": round(stats["flushed"] / stats["batches"], 1) if stats["batches"] else 0,
+                    "flush_seconds": stats["flush_seconds"],
+                },
+                "persisted": {
+                    "logged": logged,
+                    "stored": stored_logs(campus) - before,
+                    "totals_match": totals_match(campus),
+                },
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
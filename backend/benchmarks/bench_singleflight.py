@@ -0,0 +1,95 @@
+"""Upstream load from a burst of identical cold leaderboard reads.
+
+Fires N concurrent reads of one university board and of one group board,
+with every PostgREST call taking --latency-ms, first by calling the loaders
+directly (what each request did before) and then through the index, where
+single-flight coalesces them. Reports upstream calls and wall time for each.
+
+    cd backend && python -m benchmarks.bench_singleflight --readers 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_right
+
+os.environ.setdefault("SUPABASE_URL", "http://upstream")
+
+import httpx
+
+from db import db
+from services.groups import _fetch_members, group_reads
+from services.leaderboard_index import board_loads, leaderboards
+
+UNIVERSITY = "Stanford University"
+GROUP_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def upstream(latency: float, members: int, counter: list) -> httpx.MockTransport:
+    profiles = sorted(
+        ({"id": f"user-{i}", "display_name": f"Student {i}", "completed_sessions": i % 40} for i in range(members)),
+        key=lambda p: p["id"],
+    )
+    ids = [p["id"] for p in profiles]
+    rows = [{"user_id": p["id"], "profiles": p} for p in profiles]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        counter[0] += 1
+        await asyncio.sleep(latency)
+        if request.url.path.endswith("/friend_group_members"):
+            return httpx.Response(200, json=rows)
+        # University boards load in keyset pages by id
+        after = request.url.params.get("id", "gt.")[3:]
+        start = bisect_right(ids, after) if after else 0
+        return httpx.Response(200, json=profiles[start:start + int(request.url.params["limit"])])
+
+    return httpx.MockTransport(handler)
+
+
+async def burst(args, read) -> tuple[int, float]:
+    leaderboards.clear()
+    group_reads.forget(GROUP_ID)
+    calls = [0]
+    db.use_transport(upstream(args.latency_ms / 1000, args.members, calls))
+    start = time.perf_counter()
+    await asyncio.gather(*(read() for _ in range(args.readers)))
+    return calls[0], time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--members", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, direct, coalesced in (
+        ("university", lambda: leaderboards._load_university(UNIVERSITY), lambda: leaderboards.university(UNIVERSITY)),
+        ("group", lambda: _fetch_members(GROUP_ID), lambda: leaderboards.group(GROUP_ID)),
+    ):
+        before_calls, before_s = await burst(args, direct)
+        after_calls, after_s = await burst(args, coalesced)
+        results[name] = {
+            "upstream_calls_before": before_calls,
+            "upstream_calls_after": after_calls,
+            "wall_ms_before": round(before_s * 1000, 1),
+            "wall_ms_after": round(after_s * 1000, 1),
+        }
+
+    print(
+        json.dumps(
+            {
+                "readers": args.readers,
+                **results,
+                "board_loads": board_loads.stats(),
+                "group_reads": group_reads.stats(),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
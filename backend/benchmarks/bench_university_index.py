@@ -0,0 +1,67 @@
+"""University index: build time, memory footprint and query latency.
+
+Builds the index from UNIVERSITIES_CSV once for timing and once under
+tracemalloc for memory, then times a mix of prefix, multi-word and
+misspelled queries.
+
+    cd backend && python -m benchmarks.bench_university_index --iterations 2000
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+from config import UNIVERSITIES_CSV
+from services.university_index import UniversityIndex
+
+QUERIES = [
+    "ha", "harv", "berkeley", "university of cal", "univ", "ohio st",
+    "mass inst tech", "stanfrod", "texas a&m", "ecole polytech",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=8)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    UniversityIndex.from_csv(UNIVERSITIES_CSV)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    tracemalloc.start()
+    index = UniversityIndex.from_csv(UNIVERSITIES_CSV)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = {}
+    for q in QUERIES:
+        samples = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            index.search(q, args.limit)
+            samples.append((time.perf_counter() - start) * 1e6)
+        samples.sort()
+        latencies[q] = {
+            "p50_us": round(statistics.median(samples), 1),
+            "p99_us": round(samples[int(len(samples) * 0.99)], 1),
+        }
+
+    print(
+        json.dumps(
+            {
+                "universities": len(index),
+                "build_ms": round(build_ms, 1),
+                "index_mb": round(retained / 2**20, 2),
+                "build_peak_mb": round(peak / 2**20, 2),
+                "queries": latencies,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
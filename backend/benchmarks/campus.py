@@ -0,0 +1,195 @@
+"""A synthetic campus in a local_db.LocalPostgrest store, for load benchmarks.
+
+Everything is drawn from one seeded RNG, so the same arguments always give
+the same rows, ids included, and runs stay comparable. Students are spread
+over a few dozen US universities from the university list with a
+long tail (a handful of big schools, many small ones). Friendships mostly
+stay within a school, groups are drawn from a creator's friends, and every
+student has a few completed nights with drinks and some alerts from
+friends; some are out right now.
+"""
+import csv
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from config import UNIVERSITIES_CSV
+from local_db import LocalPostgrest
+from services.bac_calculator import DRINK_STANDARD_EQUIVALENTS, calculate_limits
+from services.limit_engine import limits_version
+
+DRINK_TYPES = list(DRINK_STANDARD_EQUIVALENTS)
+
+
+class Campus:
+    def __init__(self, store: LocalPostgrest, users: list[str], universities: list[str],
+                 groups: list[str], active_sessions: dict[str, str]):
+        self.store = store
+        self.users = users
+        self.universities = universities
+        self.groups = groups
+        self.active_sessions = active_sessions  # user_id -> session_id
+
+
+def _universities(rng: random.Random, count: int) -> list[str]:
+    with open(UNIVERSITIES_CSV, newline="", encoding="utf-8") as f:
+        names = sorted({row[1].strip() for row in csv.reader(f) if len(row) >= 2 and row[0] == "US"})
+    return rng.sample(names, count)
+
+
+def seed_campus(
+    users: int = 10000,
+    universities: int = 40,
+    friends_per_user: int = 12,
+    sessions_per_user: int = 3,
+    active_share: float = 0.15,
+    seed: int = 42,
+) -> Campus:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    schools = _universities(rng, universities)
+    weights = [1 / (rank + 1) for rank in range(len(schools))]
+
+    profiles = []
+    for i in range(users):
+        weight = rng.randint(110, 260)
+        gender = rng.choice(["male", "female"])
+        limits = calculate_limits(weight, gender)
+        calibrated = rng.random() < 0.6
+        profiles.append(
+            {
+                "id": new_id(),
+                "display_name": f"Student {i}",
+                "biological_gender": gender,
+                "height_inches": rng.randint(60, 76),
+                "weight_lbs": weight,
+                "university_name": rng.choices(schools, weights)[0],
+                "personal_drink_limit": None,
+                "show_on_leaderboard": rng.random() < 0.85,
+                "calculated_low_limit": limits["low"],
+                "calculated_med_limit": limits["med"],
+                "calculated_high_limit": limits["high"],
+                "calibration_count": 3 if calibrated else rng.randint(0, 2),
+                "limits_version": limits_version(weight, gender) if calibrated else None,
+                "completed_sessions": 0,
+                "unread_alerts": 0,
+                "created_at": (now - timedelta(days=120)).isoformat(),
+            }
+        )
+    ids = [p["id"] for p in profiles]
+    by_school: dict[str, list[str]] = {}
+    for p in profiles:
+        by_school.setdefault(p["university_name"], []).append(p["id"])
+
+    friendships, pairs = [], set()
+    friends_of: dict[str, list[str]] = {user_id: [] for user_id in ids}
+    for p in profiles:
+        classmates = by_school[p["university_name"]]
+        for _ in range(friends_per_user // 2):
+            pool = classmates if rng.random() < 0.8 and len(classmates) > 1 else ids
+            other = rng.choice(pool)
+            pair = tuple(sorted((p["id"], other)))
+            if other == p["id"] or pair in pairs:
+                continue
+            pairs.add(pair)
+            accepted = rng.random() < 0.9
+            friendships.append(
+                {
+                    "id": new_id(),
+                    "requester_id": p["id"],
+                    "addressee_id": other,
+                    "status": "accepted" if accepted else "pending",
+                    "can_see_drinks": rng.random() < 0.8,
+                    "created_at": now.isoformat(),
+                }
+            )
+            if accepted:
+                friends_of[p["id"]].append(other)
+                friends_of[other].append(p["id"])
+
+    groups, members = [], []
+    for creator in rng.sample(ids, users // 8):
+        group_id = new_id()
+        groups.append({"id": group_id, "creator_id": creator, "name": f"Crew {len(groups)}", "created_at": now.isoformat()})
+        crew = {creator, *rng.sample(friends_of[creator], min(len(friends_of[creator]), rng.randint(3, 11)))}
+        members.extend({"id": new_id(), "group_id": group_id, "user_id": user_id} for user_id in sorted(crew))
+
+    sessions, logs, active = [], [], {}
+    for p in profiles:
+        nights = [(now - timedelta(days=rng.uniform(2, 90)), False) for _ in range(rng.randint(0, sessions_per_user * 2))]
+        if rng.random() < active_share:
+            nights.append((now - timedelta(hours=rng.uniform(0.5, 3)), True))
+        for started_at, is_active in nights:
+            session_id = new_id()
+            total = 0.0
+            drinks = rng.randint(0, 4) if is_active else rng.randint(1, 8)
+            for k in range(drinks):
+                drink_type = rng.choice(DRINK_TYPES)
+                total += DRINK_STANDARD_EQUIVALENTS[drink_type]
+                logs.append(
+                    {
+                        "id": new_id(),
+                        "session_id": session_id,
+                        "client_id": None,
+                        "drink_type": drink_type,
+                        "quantity": 1.0,
+                        "standard_drink_equivalent": DRINK_STANDARD_EQUIVALENTS[drink_type],
+                        "logged_at": (started_at + timedelta(minutes=25 * k)).isoformat(),
+                    }
+                )
+            sessions.append(
+                {
+                    "id": session_id,
+                    "user_id": p["id"],
+                    "started_at": started_at.isoformat(),
+                    "ended_at": None if is_active else (started_at + timedelta(hours=4)).isoformat(),
+                    "is_active": is_active,
+                    "status": "active" if is_active else "completed",
+                    "total_standard_drinks": total,
+                    "peak_bac": None,
+                    "created_at": started_at.isoformat(),
+                }
+            )
+            if is_active:
+                active[p["id"]] = session_id
+            else:
+                p["completed_sessions"] += 1
+
+    # Past alerts from friends' nights; recent ones are more often unread
+    alerts = []
+    for p in profiles:
+        for _ in range(rng.randint(0, 8) if friends_of[p["id"]] else 0):
+            age = timedelta(days=rng.uniform(0, 60))
+            is_read = rng.random() < min(0.95, 0.3 + age.days / 20)
+            alerts.append(
+                {
+                    "id": new_id(),
+                    "user_id": rng.choice(friends_of[p["id"]]),
+                    "friend_id": p["id"],
+                    "session_id": None,
+                    "message": "Your friend has exceeded their med limit (BAC: 0.081). Check in on them!",
+                    "is_read": is_read,
+                    "created_at": (now - age).isoformat(),
+                }
+            )
+            if not is_read:
+                p["unread_alerts"] += 1
+
+    store = LocalPostgrest(
+        {
+            "profiles": profiles,
+            "friendships": friendships,
+            "friend_groups": groups,
+            "friend_group_members": members,
+            "drink_sessions": sessions,
+            "drink_logs": logs,
+            "calibration_sessions": [],
+            "friend_alerts": alerts,
+            "night_privacy_overrides": [],
+        }
+    )
+    return Campus(store, ids, schools, [g["id"] for g in groups], active)
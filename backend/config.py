@@ -1,6 +1,6 @@
 import os
+import secrets
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
 load_dotenv()
 
@@ -8,4 +8,86 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+# Connections kept open to PostgREST per process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+
+# Verified JWTs remembered per process, keyed by token digest
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# Profile rows cached per process; writes made outside this API (e.g. from the
+# web client straight to Supabase) become visible after at most the TTL
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "5000"))
+PROFILE_CACHE_TTL = float(os.getenv("PROFILE_CACHE_TTL", "300"))
+
+# Realtime streams: events buffered per connection before a slow client is
+# cut off, open streams kept per user, and keep-alive interval in seconds
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "64"))
+PUBSUB_MAX_STREAMS_PER_USER = int(os.getenv("PUBSUB_MAX_STREAMS_PER_USER", "4"))
+PUBSUB_HEARTBEAT = float(os.getenv("PUBSUB_HEARTBEAT", "15"))
+
+# Seconds a stream ticket (POST /api/auth/stream-ticket) stays redeemable,
+# and the key tickets are signed with. It must differ from the Supabase JWT
+# secret so a leaked ticket is no bearer token; unset, each process makes
+# its own, so set it when clients may redeem on another instance
+STREAM_TICKET_TTL = float(os.getenv("STREAM_TICKET_TTL", "30"))
+STREAM_TICKET_SECRET = os.getenv("STREAM_TICKET_SECRET") or secrets.token_urlsafe(32)
+
+# University list used for search and to validate profiles.university_name.
+# A copy of public/world-universities.csv ships in backend/data, since the
+# Docker image is built from backend/ only. The API refuses to start
+# without it rather than accept unchecked names
+UNIVERSITIES_CSV = os.getenv(
+    "UNIVERSITIES_CSV",
+    os.path.join(os.path.dirname(__file__), "data", "world-universities.csv"),
+)
+
+# Prime the connection pool and in-process indexes in the background at
+# startup, so the first request after a scale-from-zero doesn't pay for them
+WARM_UP = os.getenv("WARM_UP", "1") != "0"
+
+# Log a warning for requests slower than this many milliseconds (0 = off)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+
+# Bearer token required to scrape /metrics; unset leaves it open, so only do
+# that where the port isn't reachable from the internet
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Seconds a group's member list is reused across requests; adding a member
+# through this API refreshes it at once
+GROUP_CACHE_TTL = float(os.getenv("GROUP_CACHE_TTL", "5"))
+
+# Seconds a group's live state (members' sessions, BAC and limit levels) is
+# reused, so members refreshing the dashboard together share one build
+GROUP_LIVE_TTL = float(os.getenv("GROUP_LIVE_TTL", "3"))
+
+# Background jobs (services/scheduler.py): set SCHEDULER=0 to run none in
+# this process. Active sessions with no drink for STALE_SESSION_MINUTES are
+# closed, up to STALE_SWEEP_BATCH per statement, every STALE_SWEEP_INTERVAL
+# seconds; completed-session counters are recounted every
+# LEADERBOARD_REFRESH_INTERVAL seconds and unread-alert counters every
+# UNREAD_RECOUNT_INTERVAL seconds. Intervals vary by +/- SCHEDULER_JITTER
+SCHEDULER = os.getenv("SCHEDULER", "1") != "0"
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+STALE_SESSION_MINUTES = int(os.getenv("STALE_SESSION_MINUTES", "360"))
+STALE_SWEEP_INTERVAL = float(os.getenv("STALE_SWEEP_INTERVAL", "300"))
+STALE_SWEEP_BATCH = int(os.getenv("STALE_SWEEP_BATCH", "500"))
+LEADERBOARD_REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", "3600"))
+UNREAD_RECOUNT_INTERVAL = float(os.getenv("UNREAD_RECOUNT_INTERVAL", "3600"))
+
+# Seconds between rebuilds of the in-memory friend graph
+# (services/friend_graph.py). Routes in this API update it as they write,
+# but the web client also writes friendships straight to Supabase, and
+# those changes only reach visibility decisions on the next rebuild
+FRIEND_GRAPH_REFRESH = float(os.getenv("FRIEND_GRAPH_REFRESH", "60"))
+
+# Serve active sessions from process memory (services/session_store.py) and
+# write drink logs behind in batches of up to WRITE_BEHIND_BATCH, at least
+# every WRITE_BEHIND_INTERVAL_MS. Only correct with a single API instance
+# that is the sole writer of drink_sessions and drink_logs (the web client
+# still writes both straight to Supabase), so off by default. Unflushed
+# writes are journaled to SESSION_JOURNAL and replayed at startup; put it on
+# a persistent volume to survive a machine restart, not just a process one
+SESSION_STORE = os.getenv("SESSION_STORE", "0") == "1"
+SESSION_JOURNAL = os.getenv("SESSION_JOURNAL", "session-journal.ndjson")
+WRITE_BEHIND_INTERVAL_MS = float(os.getenv("WRITE_BEHIND_INTERVAL_MS", "100"))
+WRITE_BEHIND_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "500"))
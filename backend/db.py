@@ -0,0 +1,103 @@
+"""Async data-access layer for the Supabase PostgREST API.
+
+Every router and service goes through :data:`db` rather than a synchronous
+client, so a database round trip never blocks the event loop. All queries
+share one keep-alive connection pool per process, created on first use so
+importing the app stays cheap. Every call is timed through
+:class:`services.metrics.InstrumentedTransport`.
+"""
+import asyncio
+from typing import Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+
+from config import SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY, DB_POOL_SIZE
+from services.metrics import InstrumentedTransport
+
+REQUEST_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client whose httpx session uses explicit pool limits."""
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: dict,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self._transport = transport
+        super().__init__(base_url, headers=headers, timeout=REQUEST_TIMEOUT)
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        transport = self._transport or httpx.AsyncHTTPTransport(
+            verify=verify,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=DB_POOL_SIZE,
+                max_keepalive_connections=DB_POOL_SIZE,
+                keepalive_expiry=60,
+            ),
+            proxy=proxy,
+        )
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            follow_redirects=True,
+            transport=InstrumentedTransport(transport),
+        )
+
+
+class Database:
+    def __init__(self, url: str, key: str):
+        self.url = url
+        self.key = key
+        self._transport: Optional[httpx.AsyncBaseTransport] = None
+        self._client: Optional[_PooledPostgrestClient] = None
+
+    @property
+    def client(self) -> _PooledPostgrestClient:
+        if self._client is None:
+            self._client = self._connect(self._transport)
+        return self._client
+
+    def _connect(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        return _PooledPostgrestClient(
+            f"{self.url}/rest/v1",
+            headers={
+                **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                "apikey": self.key or "",
+                "Authorization": f"Bearer {self.key or ''}",
+            },
+            transport=transport,
+        )
+
+    def use_transport(self, transport: httpx.AsyncBaseTransport):
+        """Route all queries through a custom transport (benchmarks, local stand-ins)."""
+        self._transport = transport
+        self._client = None
+
+    def table(self, name: str):
+        return self.client.from_(name)
+
+    def rpc(self, fn: str, params: dict):
+        return self.client.rpc(fn, params)
+
+    async def gather(self, *queries):
+        """Execute independent queries concurrently and return their responses in order."""
+        return await asyncio.gather(*(q.execute() for q in queries))
+
+    async def warm_up(self):
+        """Open a pooled connection (TCP, TLS and HTTP/2 setup) ahead of real queries."""
+        await self.table("profiles").select("id", head=True).limit(1).execute()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+db = Database(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
@@ -0,0 +1,478 @@
+"""In-memory stand-in for the Supabase PostgREST API.
+
+:class:`LocalPostgrest` is an httpx transport that answers the REST calls
+postgrest-py makes from plain lists of row dicts, so the app runs unchanged
+on top of it, from db.py up, with no Supabase project:
+
+    db.use_transport(LocalPostgrest(tables))
+
+It covers the part of PostgREST the app uses. Selects support column lists,
+aliases, embedded relations (with `!constraint` hints), the usual filters
+(eq, neq, gt, gte, lt, lte, in, is, like, ilike, `not.`, nested `or`/`and`),
+order, limit, offset, exact counts, HEAD, and single and maybe-single
+objects. Inserts, upserts, updates and deletes return their rows. RPCs
+dispatch to the stand-ins in local_rpcs.py. Each call runs to completion
+without awaiting, so it is atomic with respect to other coroutines, like
+the transaction behind the real endpoint. With `max_rows` set, reads are
+cut to that many rows without an error, as PostgREST's db-max-rows does.
+
+Rows hold JSON values only; timestamps are ISO strings, compared as
+datetimes. Foreign keys, types and row-level security are not enforced,
+but the unique keys in UNIQUE_KEYS are. Lookups by the immutable id and
+foreign-key columns in INDEXED_COLUMNS use hash indexes, so a request costs
+about as much as the rows it touches, not the size of the table.
+"""
+import json
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+from urllib.parse import unquote
+
+import httpx
+
+# (constraint, table, column, referenced table); every reference is to `id`
+RELATIONSHIPS = [
+    ("friendships_requester_id_fkey", "friendships", "requester_id", "profiles"),
+    ("friendships_addressee_id_fkey", "friendships", "addressee_id", "profiles"),
+    ("friend_groups_creator_id_fkey", "friend_groups", "creator_id", "profiles"),
+    ("friend_group_members_group_id_fkey", "friend_group_members", "group_id", "friend_groups"),
+    ("friend_group_members_user_id_fkey", "friend_group_members", "user_id", "profiles"),
+    ("drink_sessions_user_id_fkey", "drink_sessions", "user_id", "profiles"),
+    ("drink_logs_session_id_fkey", "drink_logs", "session_id", "drink_sessions"),
+    ("calibration_sessions_user_id_fkey", "calibration_sessions", "user_id", "profiles"),
+    ("friend_alerts_user_id_fkey", "friend_alerts", "user_id", "profiles"),
+    ("friend_alerts_friend_id_fkey", "friend_alerts", "friend_id", "profiles"),
+    ("night_privacy_overrides_session_id_fkey", "night_privacy_overrides", "session_id", "drink_sessions"),
+]
+
+UNIQUE_KEYS = {
+    "friendships": [("requester_id", "addressee_id")],
+    "friend_group_members": [("group_id", "user_id")],
+    "drink_logs": [("session_id", "client_id")],
+    "night_privacy_overrides": [("user_id", "session_id", "friend_id")],
+}
+
+INDEXED_COLUMNS = {"id"} | {column for _, _, column, _ in RELATIONSHIPS}
+
+# Column defaults applied on insert, besides id and created_at
+DEFAULTS = {
+    "profiles": {
+        "completed_sessions": 0,
+        "unread_alerts": 0,
+        "calibration_count": 0,
+        "show_on_leaderboard": True,
+    },
+    "drink_sessions": {
+        "is_active": True,
+        "status": "active",
+        "total_standard_drinks": 0,
+        "peak_bac": None,
+        "ended_at": None,
+    },
+    "drink_logs": {"client_id": None},
+    "friendships": {"status": "pending", "can_see_drinks": True},
+    "friend_alerts": {"is_read": False},
+}
+TIMESTAMP_DEFAULTS = {"drink_sessions": "started_at", "drink_logs": "logged_at"}
+
+NOT_FOUND = {"code": "P0002", "message": "Not found", "details": None, "hint": None}
+
+
+class QueryError(Exception):
+    def __init__(self, status: int, code: str, message: str, details: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.body = {"code": code, "message": message, "details": details, "hint": None}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _split(text: str) -> list[str]:
+    """Split on commas outside parentheses and double quotes."""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _as_timestamp(value: str) -> Optional[datetime]:
+    if len(value) >= 19 and value[4] == "-" and value[10] in "T ":
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return None
+
+
+def _coerce(row_value: Any, text: str) -> Any:
+    """The filter literal `text` as the type of the stored value."""
+    if isinstance(row_value, bool):
+        return text.lower() == "true"
+    if isinstance(row_value, (int, float)):
+        return float(text)
+    if isinstance(row_value, str):
+        ts = _as_timestamp(row_value)
+        if ts is not None:
+            other = _as_timestamp(text)
+            if other is not None:
+                return other
+    return text
+
+
+def _comparable(row_value: Any, literal: Any) -> Any:
+    if isinstance(literal, datetime) and isinstance(row_value, str):
+        return _as_timestamp(row_value)
+    return row_value
+
+
+_COMPARE: dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+
+def _like(pattern: str, flags: int = 0) -> re.Pattern:
+    parts = re.split(r"[*%]", pattern)
+    return re.compile("^" + ".*".join(re.escape(p) for p in parts) + "$", flags | re.DOTALL)
+
+
+def _condition(column: str, expression: str) -> Callable[[dict], bool]:
+    """Predicate for one `column=op.value` filter, e.g. ("id", "in.(a,b)")."""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, value = expression.partition(".")
+
+    if op == "is":
+        target = {"null": None, "true": True, "false": False}[value.lower()]
+
+        def test(row):
+            return row.get(column) is target
+    elif op == "in":
+        options = [_unquote(v) for v in _split(value.strip()[1:-1])]
+        as_text = set(options)
+
+        def test(row):
+            stored = row.get(column)
+            if isinstance(stored, str):
+                return stored in as_text
+            return stored is not None and any(stored == _coerce(stored, o) for o in options)
+    elif op in ("like", "ilike"):
+        pattern = _like(_unquote(value), re.IGNORECASE if op == "ilike" else 0)
+
+        def test(row):
+            stored = row.get(column)
+            return stored is not None and pattern.match(str(stored)) is not None
+    elif op in _COMPARE:
+        compare, literal = _COMPARE[op], _unquote(value)
+        # Text against a literal that isn't a timestamp compares as is
+        plain_text = _as_timestamp(literal) is None
+
+        def test(row):
+            stored = row.get(column)
+            if stored is None:
+                return False  # SQL: comparisons with NULL are never true
+            if plain_text and isinstance(stored, str):
+                return compare(stored, literal)
+            coerced = _coerce(stored, literal)
+            return compare(_comparable(stored, coerced), coerced)
+    else:
+        raise QueryError(400, "PGRST100", f"unsupported operator {op!r}")
+
+    return (lambda row: not test(row)) if negate else test
+
+
+def _logic(expression: str, conjunction: bool) -> Callable[[dict], bool]:
+    """Predicate for an `or=(...)` / `and=(...)` tree."""
+    tests = []
+    for term in _split(expression.strip()[1:-1]):
+        negate = term.startswith("not.")
+        if negate:
+            term = term[4:]
+        if term.startswith(("and(", "or(")):
+            keyword, _, rest = term.partition("(")
+            test = _logic("(" + rest, keyword == "and")
+        else:
+            column, _, condition = term.partition(".")
+            test = _condition(column, condition)
+        tests.append((lambda row, t=test: not t(row)) if negate else test)
+    combine = all if conjunction else any
+    return lambda row: combine(t(row) for t in tests)
+
+
+class _Select:
+    """A parsed `select=` list: columns, aliases and embedded relations."""
+
+    def __init__(self, text: str):
+        self.star = False
+        self.columns: list[tuple[str, str]] = []  # (output name, column)
+        self.embeds: list[tuple[str, str, Optional[str], "_Select"]] = []  # (name, table, hint, select)
+        for item in _split(text or "*"):
+            if item == "*":
+                self.star = True
+                continue
+            alias, _, rest = item.rpartition(":") if "(" not in item.split(":", 1)[0] else ("", "", item)
+            if "(" in rest:
+                head, _, inner = rest.partition("(")
+                table, _, hint = head.partition("!")
+                self.embeds.append((alias or table, table, hint or None, _Select(inner[:-1])))
+            else:
+                column = rest.split("::", 1)[0]
+                self.columns.append((alias or column, column))
+
+
+class LocalPostgrest(httpx.AsyncBaseTransport):
+    def __init__(self, tables: Optional[dict[str, list[dict]]] = None, max_rows: Optional[int] = None):
+        self.tables: dict[str, list[dict]] = {}
+        self.max_rows = max_rows
+        # table -> column -> value -> rows
+        self._indexes: dict[str, dict[str, dict[Any, list[dict]]]] = {}
+        self.calls = 0
+        for name, rows in (tables or {}).items():
+            self.load(name, rows)
+
+    def load(self, table: str, rows: list[dict]):
+        """Replace a table's rows (shared, not copied) and index them."""
+        self.tables[table] = rows
+        self._indexes[table] = {}
+        for row in rows:
+            self._index_row(table, row)
+
+    def _table(self, name: str) -> list[dict]:
+        if name not in self.tables:
+            self.load(name, [])
+        return self.tables[name]
+
+    def _index_row(self, table: str, row: dict):
+        indexes = self._indexes.setdefault(table, {})
+        for column in INDEXED_COLUMNS.intersection(row):
+            indexes.setdefault(column, {}).setdefault(row[column], []).append(row)
+
+    def _unindex_row(self, table: str, row: dict):
+        for column in INDEXED_COLUMNS.intersection(row):
+            bucket = self._indexes[table][column].get(row[column])
+            if bucket is not None:
+                bucket.remove(row)
+
+    def __getitem__(self, table: str) -> list[dict]:
+        return self._table(table)
+
+    def lookup(self, table: str, column: str, value: Any) -> list[dict]:
+        """Rows whose `column` equals `value`, through the index when there is one."""
+        if column in INDEXED_COLUMNS:
+            return self._indexes.get(table, {}).get(column, {}).get(value, [])
+        return [row for row in self._table(table) if row.get(column) == value]
+
+    def get(self, table: str, row_id: Any) -> Optional[dict]:
+        rows = self.lookup(table, "id", row_id)
+        return rows[0] if rows else None
+
+    def add(self, table: str, rows: list[dict]):
+        """Append rows written by an RPC stand-in."""
+        self._table(table).extend(rows)
+        for row in rows:
+            self._index_row(table, row)
+
+    # -- transport ---------------------------------------------------------
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        _, _, path = request.url.path.partition("/rest/v1/")
+        try:
+            if path.startswith("rpc/"):
+                return self._rpc(path[4:], json.loads(request.content or b"{}"))
+            return self._query(request, unquote(path))
+        except QueryError as e:
+            return httpx.Response(e.status, json=e.body)
+
+    def _rpc(self, name: str, params: dict) -> httpx.Response:
+        from local_rpcs import RPCS
+
+        function = RPCS.get(name)
+        if function is None:
+            raise QueryError(404, "PGRST202", f"Could not find the function public.{name}")
+        result = function(self, params)
+        if result is None:
+            return httpx.Response(404, json=NOT_FOUND)
+        return httpx.Response(200, json=result)
+
+    def _query(self, request: httpx.Request, table: str) -> httpx.Response:
+        params = request.url.params
+        prefer = request.headers.get("prefer", "")
+        method = request.method
+
+        if method == "POST":
+            rows = self._insert(table, json.loads(request.content or b"[]"), params, prefer)
+            status = 201
+        else:
+            rows = self._filter(table, params)
+            if method == "PATCH":
+                changes = json.loads(request.content or b"{}")
+                for row in rows:
+                    row.update(changes)
+            elif method == "DELETE":
+                doomed = {id(row) for row in rows}
+                for row in rows:
+                    self._unindex_row(table, row)
+                self.tables[table][:] = [r for r in self._table(table) if id(r) not in doomed]
+            status = 200
+
+        headers = {}
+        total = len(rows)
+        if method in ("GET", "HEAD"):
+            rows = self._order(rows, params.get("order"))
+            offset = int(params.get("offset", 0))
+            limit = params.get("limit")
+            if self.max_rows is not None:
+                limit = min(int(limit), self.max_rows) if limit is not None else self.max_rows
+            rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+            if "count=" in prefer:
+                end = offset + len(rows) - 1
+                headers["content-range"] = f"{offset}-{end}/{total}" if rows else f"*/{total}"
+        elif "return=representation" not in prefer:
+            return httpx.Response(status if method == "POST" else 204, headers=headers)
+
+        body = [self._project(table, row, _Select(params.get("select", "*"))) for row in rows]
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(body) != 1:
+                raise QueryError(
+                    406, "PGRST116",
+                    "JSON object requested, multiple (or no) rows returned",
+                    f"The result contains {len(body)} rows",
+                )
+            body = body[0]
+        if method == "HEAD":
+            return httpx.Response(status, headers=headers)
+        return httpx.Response(status, json=body, headers=headers)
+
+    # -- reads -------------------------------------------------------------
+
+    def _filter(self, table: str, params: httpx.QueryParams) -> list[dict]:
+        tests, candidates = [], None
+        for key, value in params.multi_items():
+            if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+                continue
+            if key in ("or", "and"):
+                if candidates is None and key == "or":
+                    candidates = self._union(table, value)
+                tests.append(_logic(value, key == "and"))
+            elif key in ("not.or", "not.and"):
+                test = _logic(value, key == "not.and")
+                tests.append(lambda row, t=test: not t(row))
+            else:
+                if candidates is None and key in INDEXED_COLUMNS:
+                    if value.startswith("eq."):
+                        candidates = self.lookup(table, key, _unquote(value[3:]))
+                    elif value.startswith("in."):
+                        candidates = [
+                            row
+                            for option in dict.fromkeys(_unquote(v) for v in _split(value[4:-1]))
+                            for row in self.lookup(table, key, option)
+                        ]
+                tests.append(_condition(key, value))
+        rows = self._table(table) if candidates is None else candidates
+        return [row for row in rows if all(test(row) for test in tests)]
+
+    def _union(self, table: str, expression: str) -> Optional[list[dict]]:
+        """Index candidates for an `or` made only of equalities on indexed columns."""
+        found: dict[int, dict] = {}
+        for term in _split(expression.strip()[1:-1]):
+            column, _, condition = term.partition(".")
+            if column not in INDEXED_COLUMNS or not condition.startswith("eq."):
+                return None
+            for row in self.lookup(table, column, _unquote(condition[3:])):
+                found[id(row)] = row
+        return list(found.values())
+
+    @staticmethod
+    def _order(rows: list[dict], order: Optional[str]) -> list[dict]:
+        if not order:
+            return list(rows)
+        rows = list(rows)
+        # Stable sorts, least significant key first. NULLs sort as larger
+        # than any value, as in Postgres (last ascending, first descending)
+        for term in reversed(order.split(",")):
+            column, *modifiers = term.split(".")
+            descending = "desc" in modifiers
+            rows.sort(
+                key=lambda r: (r.get(column) is None, r.get(column) if r.get(column) is not None else 0),
+                reverse=descending,
+            )
+        return rows
+
+    def _project(self, table: str, row: dict, select: _Select) -> dict:
+        out = dict(row) if select.star else {}
+        for name, column in select.columns:
+            out[name] = row.get(column)
+        for name, target, hint, inner in select.embeds:
+            out[name] = self._embed(table, row, target, hint, inner)
+        return out
+
+    def _embed(self, table: str, row: dict, target: str, hint: Optional[str], inner: _Select):
+        for constraint, child, column, parent in RELATIONSHIPS:
+            if hint and hint not in (constraint, column):
+                continue
+            if child == table and parent == target:  # to-one
+                found = self.lookup(target, "id", row.get(column))
+                return self._project(target, found[0], inner) if found else None
+            if child == target and parent == table:  # to-many
+                return [self._project(target, r, inner) for r in self.lookup(target, column, row["id"])]
+        raise QueryError(400, "PGRST200", f"Could not find a relationship between {table} and {target}")
+
+    # -- writes ------------------------------------------------------------
+
+    def _conflict(self, table: str, row: dict, keys: list[tuple]) -> Optional[dict]:
+        for key in keys:
+            if any(row.get(c) is None for c in key):
+                continue
+            candidates = self.lookup(table, key[0], row[key[0]])
+            for existing in candidates:
+                if all(existing.get(c) == row[c] for c in key):
+                    return existing
+        return None
+
+    def _insert(self, table: str, body, params: httpx.QueryParams, prefer: str) -> list[dict]:
+        rows = self._table(table)
+        on_conflict = params.get("on_conflict")
+        keys = [tuple(on_conflict.split(","))] if on_conflict else [("id",), *UNIQUE_KEYS.get(table, [])]
+        out = []
+        for values in body if isinstance(body, list) else [body]:
+            now = _now()
+            row = {"id": str(uuid.uuid4()), "created_at": now, **DEFAULTS.get(table, {})}
+            if table in TIMESTAMP_DEFAULTS:
+                row[TIMESTAMP_DEFAULTS[table]] = now
+            row.update(values)
+
+            existing = self._conflict(table, row, keys)
+            if existing is not None:
+                if "resolution=merge-duplicates" in prefer:
+                    existing.update(values)
+                    out.append(existing)
+                    continue
+                if "resolution=ignore-duplicates" in prefer:
+                    continue
+                raise QueryError(409, "23505", f"duplicate key value violates unique constraint on {table}")
+            rows.append(row)
+            self._index_row(table, row)
+            out.append(row)
+        return out
@@ -0,0 +1,385 @@
+"""In-process stand-ins for the plpgsql functions in sql/, for local_db.
+
+LocalPostgrest answers `POST /rpc/<name>` by calling RPCS[name] with itself
+and the JSON arguments. Each stand-in follows the latest definition of its
+function (named in its docstring) and returns what the RPC returns; None
+becomes a P0002 (not found) error. Only tests and benchmarks import this
+module, and tests/test_local_rpcs.py checks that every function in sql/
+and every db.rpc() call in the app has a stand-in here.
+"""
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from local_db import LocalPostgrest
+from services.bac_calculator import calculate_bac
+from services.limit_engine import limit_level
+
+
+# -- drinks -------------------------------------------------------------------
+
+def log_drink(tables: LocalPostgrest, params: dict) -> Optional[dict]:
+    """sql/006_log_drink_projection_inputs.sql.
+
+    `params` carries the same p_* arguments as the RPC. Nothing here awaits,
+    so a call is atomic with respect to other coroutines, like the
+    database transaction.
+    """
+    session = _active_session(tables, params)
+    if session is None:
+        return None
+
+    previous_total = session.get("total_standard_drinks") or 0
+    session["total_standard_drinks"] = previous_total + params["p_standard_drinks"]
+
+    log = {
+        "id": str(uuid.uuid4()),
+        "session_id": params["p_session_id"],
+        "drink_type": params["p_drink_type"],
+        "quantity": params["p_quantity"],
+        "standard_drink_equivalent": params["p_standard_drinks"],
+        "logged_at": datetime.now(timezone.utc).isoformat(),
+    }
+    tables.add("drink_logs", [log])
+
+    profile = tables.get("profiles", params["p_user_id"])
+    hours_elapsed = (
+        datetime.now(timezone.utc) - datetime.fromisoformat(session["started_at"])
+    ).total_seconds() / 3600
+    current_bac = calculate_bac(
+        session["total_standard_drinks"],
+        profile["weight_lbs"],
+        profile["biological_gender"],
+        hours_elapsed,
+    )
+    session["peak_bac"] = max(session.get("peak_bac") or 0, current_bac)
+
+    total = session["total_standard_drinks"]
+    level = limit_level(total, profile)
+
+    return {
+        "log": log,
+        "previous_total": previous_total,
+        "total_standard_drinks": total,
+        "current_bac": current_bac,
+        "peak_bac": session["peak_bac"],
+        "limit_level": level,
+        "crossed_level": level if level != limit_level(previous_total, profile) else None,
+        "started_at": session["started_at"],
+        "weight_lbs": profile["weight_lbs"],
+        "biological_gender": profile["biological_gender"],
+    }
+
+
+def _active_session(tables: LocalPostgrest, params: dict) -> Optional[dict]:
+    session = tables.get("drink_sessions", params["p_session_id"])
+    if session and session["user_id"] == params["p_user_id"] and session["is_active"]:
+        return session
+    return None
+
+
+def log_drinks(tables: LocalPostgrest, params: dict) -> Optional[dict]:
+    """sql/007_log_drinks_batch.sql."""
+    session = _active_session(tables, params)
+    if session is None:
+        return None
+
+    now = datetime.now(timezone.utc)
+    started_at = datetime.fromisoformat(session["started_at"])
+    session_logs = list(tables.lookup("drink_logs", "session_id", session["id"]))
+    seen = {l.get("client_id") for l in session_logs}
+
+    logs = []
+    for drink in params["p_drinks"]:
+        if drink["client_id"] in seen:
+            continue
+        seen.add(drink["client_id"])
+        logged_at = datetime.fromisoformat(drink["logged_at"]) if drink.get("logged_at") else now
+        logs.append(
+            {
+                "id": str(uuid.uuid4()),
+                "session_id": session["id"],
+                "client_id": drink["client_id"],
+                "drink_type": drink["drink_type"],
+                "quantity": drink["quantity"],
+                "standard_drink_equivalent": drink["standard_drinks"],
+                "logged_at": min(max(logged_at, started_at), now).isoformat(),
+            }
+        )
+    logs.sort(key=lambda l: l["logged_at"])
+    tables.add("drink_logs", logs)
+
+    added = sum(l["standard_drink_equivalent"] for l in logs)
+    previous_total = session.get("total_standard_drinks") or 0
+    total = session["total_standard_drinks"] = previous_total + added
+
+    profile = tables.get("profiles", params["p_user_id"])
+    current_bac = calculate_bac(
+        total,
+        profile["weight_lbs"],
+        profile["biological_gender"],
+        (now - started_at).total_seconds() / 3600,
+    )
+    level = limit_level(total, profile)
+
+    return {
+        "logs": logs,
+        "duplicates": len(params["p_drinks"]) - len(logs),
+        "previous_total": previous_total,
+        "total_standard_drinks": total,
+        "current_bac": current_bac,
+        "peak_bac": session.get("peak_bac"),
+        "limit_level": level,
+        "crossed_level": level if level != limit_level(previous_total, profile) else None,
+        "started_at": session["started_at"],
+        "weight_lbs": profile["weight_lbs"],
+        "biological_gender": profile["biological_gender"],
+        "session_drinks": [
+            {"logged_at": l["logged_at"], "standard_drink_equivalent": l["standard_drink_equivalent"]}
+            for l in session_logs + logs
+        ],
+    }
+
+
+def complete_session(tables: LocalPostgrest, params: dict) -> Optional[dict]:
+    """sql/003_completed_sessions.sql."""
+    session = tables.get("drink_sessions", params["p_session_id"])
+    if session is None or session["user_id"] != params["p_user_id"]:
+        return None
+    if session.get("status") == "completed":
+        return {"session": session, "completed_sessions": None}
+
+    session.update(
+        {
+            "is_active": False,
+            "ended_at": datetime.now(timezone.utc).isoformat(),
+            "status": "completed",
+        }
+    )
+    profile = tables.get("profiles", params["p_user_id"])
+    profile["completed_sessions"] = (profile.get("completed_sessions") or 0) + 1
+    return {"session": session, "completed_sessions": profile["completed_sessions"]}
+
+
+def apply_drink_writes(tables: LocalPostgrest, params: dict) -> int:
+    """sql/012_drink_write_behind.sql."""
+    inserted = []
+    for log in params["p_logs"]:
+        if tables.get("drink_logs", log["id"]) is None:
+            inserted.append(dict(log))
+    tables.add("drink_logs", inserted)
+    for log in inserted:
+        session = tables.get("drink_sessions", log["session_id"])
+        if session is not None:
+            session["total_standard_drinks"] = (session.get("total_standard_drinks") or 0) + log["standard_drink_equivalent"]
+    for row in params["p_sessions"]:
+        session = tables.get("drink_sessions", row["id"])
+        if session is not None and (session.get("peak_bac") is None or session["peak_bac"] < row["peak_bac"]):
+            session["peak_bac"] = row["peak_bac"]
+    return len(inserted)
+
+
+# -- housekeeping and scheduler leases ----------------------------------------
+
+def close_stale_sessions(tables: LocalPostgrest, params: dict) -> list[dict]:
+    """sql/010_session_housekeeping.sql."""
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(minutes=params["p_idle_minutes"])
+
+    stale = []
+    active = (s for s in tables["drink_sessions"] if s["is_active"] and s.get("status") != "completed")
+    for s in sorted(active, key=lambda s: s["started_at"]):
+        drinks = sorted(
+            (
+                {"logged_at": l["logged_at"], "standard_drink_equivalent": l["standard_drink_equivalent"]}
+                for l in tables.lookup("drink_logs", "session_id", s["id"])
+            ),
+            key=lambda l: l["logged_at"],
+        )
+        last_activity = datetime.fromisoformat(drinks[-1]["logged_at"] if drinks else s["started_at"])
+        if last_activity < cutoff:
+            stale.append((s, last_activity, drinks))
+            if len(stale) == params["p_limit"]:
+                break
+
+    closed = []
+    for s, last_activity, drinks in stale:
+        s.update({"is_active": False, "ended_at": last_activity.isoformat(), "status": "completed"})
+        profile = tables.get("profiles", s["user_id"])
+        profile["completed_sessions"] = (profile.get("completed_sessions") or 0) + 1
+        closed.append(
+            {
+                "session_id": s["id"],
+                "user_id": s["user_id"],
+                "started_at": s["started_at"],
+                "ended_at": s["ended_at"],
+                "peak_bac": s.get("peak_bac"),
+                "completed_sessions": profile["completed_sessions"],
+                "weight_lbs": profile.get("weight_lbs"),
+                "biological_gender": profile.get("biological_gender"),
+                "drinks": drinks,
+            }
+        )
+    return closed
+
+
+def finalize_peak_bac(tables: LocalPostgrest, params: dict) -> int:
+    """sql/010_session_housekeeping.sql."""
+    updated = 0
+    for row in params["p_rows"]:
+        session = tables.get("drink_sessions", row["id"])
+        if session is not None and (session.get("peak_bac") is None or session["peak_bac"] < row["peak_bac"]):
+            session["peak_bac"] = row["peak_bac"]
+            updated += 1
+    return updated
+
+
+def rebuild_completed_sessions(tables: LocalPostgrest, params: dict) -> int:
+    """sql/003_completed_sessions.sql."""
+    counts: dict[str, int] = {}
+    for s in tables["drink_sessions"]:
+        if s.get("status") == "completed":
+            counts[s["user_id"]] = counts.get(s["user_id"], 0) + 1
+    updated = 0
+    for profile in tables["profiles"]:
+        n = counts.get(profile["id"], 0)
+        if profile.get("completed_sessions") != n:
+            profile["completed_sessions"] = n
+            updated += 1
+    return updated
+
+
+def acquire_lease(tables: LocalPostgrest, params: dict) -> bool:
+    """sql/010_session_housekeeping.sql."""
+    now = time.time()
+    lease = tables.get("scheduler_leases", params["p_job"])
+    if lease is None:
+        tables.add("scheduler_leases", [{"id": params["p_job"], "holder": params["p_holder"], "expires_at": 0}])
+        lease = tables.get("scheduler_leases", params["p_job"])
+    if lease["holder"] != params["p_holder"] and lease["expires_at"] >= now:
+        return False
+    lease.update(holder=params["p_holder"], expires_at=now + params["p_ttl_seconds"])
+    return True
+
+
+# -- alerts inbox -------------------------------------------------------------
+
+def insert_friend_alerts(tables: LocalPostgrest, params: dict) -> list[dict]:
+    """sql/011_alert_inbox.sql."""
+    now = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {**alert, "id": str(uuid.uuid4()), "is_read": False, "created_at": now}
+        for alert in params["p_alerts"]
+    ]
+    tables.add("friend_alerts", rows)
+    for row in rows:
+        profile = tables.get("profiles", row["friend_id"])
+        if profile is not None:
+            profile["unread_alerts"] = profile.get("unread_alerts", 0) + 1
+    unread = {
+        row["friend_id"]: (tables.get("profiles", row["friend_id"]) or {}).get("unread_alerts")
+        for row in rows
+    }
+    return [{**row, "unread": unread[row["friend_id"]]} for row in rows]
+
+
+def _mark_read(tables: LocalPostgrest, user_id: str, alerts) -> Optional[int]:
+    profile = tables.get("profiles", user_id)
+    if profile is None:
+        return None
+    marked = 0
+    for alert in alerts:
+        if not alert.get("is_read"):
+            alert["is_read"] = True
+            marked += 1
+    profile["unread_alerts"] = max(profile.get("unread_alerts", 0) - marked, 0)
+    return profile["unread_alerts"]
+
+
+def mark_alerts_read(tables: LocalPostgrest, params: dict) -> Optional[int]:
+    """sql/011_alert_inbox.sql."""
+    key = (datetime.fromisoformat(params["p_created_at"]), params["p_id"])
+    return _mark_read(
+        tables,
+        params["p_user_id"],
+        (
+            a for a in tables.lookup("friend_alerts", "friend_id", params["p_user_id"])
+            if (datetime.fromisoformat(a["created_at"]), a["id"]) <= key
+        ),
+    )
+
+
+def mark_alert_read(tables: LocalPostgrest, params: dict) -> Optional[int]:
+    """sql/011_alert_inbox.sql."""
+    alert = tables.get("friend_alerts", params["p_alert_id"])
+    mine = [alert] if alert is not None and alert["friend_id"] == params["p_user_id"] else []
+    return _mark_read(tables, params["p_user_id"], mine)
+
+
+def rebuild_unread_alerts(tables: LocalPostgrest, params: dict) -> int:
+    """sql/011_alert_inbox.sql."""
+    counts: dict[str, int] = {}
+    for alert in tables["friend_alerts"]:
+        if not alert.get("is_read"):
+            counts[alert["friend_id"]] = counts.get(alert["friend_id"], 0) + 1
+    updated = 0
+    for profile in tables["profiles"]:
+        n = counts.get(profile["id"], 0)
+        if profile.get("unread_alerts") != n:
+            profile["unread_alerts"] = n
+            updated += 1
+    return updated
+
+
+# -- profiles -----------------------------------------------------------------
+
+def update_profile_limits(tables: LocalPostgrest, params: dict) -> int:
+    """sql/009_update_profile_limits.sql."""
+    updated = 0
+    for row in params["p_rows"]:
+        profile = tables.get("profiles", row["id"])
+        if (
+            profile is None
+            or profile.get("weight_lbs") != row["weight_lbs"]
+            or profile.get("biological_gender") != row["biological_gender"]
+        ):
+            continue
+        profile.update(
+            calculated_low_limit=row["low"],
+            calculated_med_limit=row["med"],
+            calculated_high_limit=row["high"],
+            limits_version=row["limits_version"],
+        )
+        updated += 1
+    return updated
+
+
+def calibration_aggregates(tables: LocalPostgrest, params: dict) -> list[dict]:
+    """sql/013_calibration_aggregates.sql."""
+    totals: dict[str, dict] = {}
+    for row in tables["calibration_sessions"]:
+        if params["p_first"] <= row["user_id"] <= params["p_last"]:
+            t = totals.setdefault(row["user_id"], {"user_id": row["user_id"], "sessions": 0, "handle_more": 0, "feeling": 0})
+            t["sessions"] += 1
+            t["handle_more"] += bool(row["could_handle_more"])
+            t["feeling"] += row["feeling_rating"] or 0
+    return list(totals.values())
+
+
+RPCS = {
+    "log_drink": log_drink,
+    "log_drinks": log_drinks,
+    "complete_session": complete_session,
+    "apply_drink_writes": apply_drink_writes,
+    "close_stale_sessions": close_stale_sessions,
+    "finalize_peak_bac": finalize_peak_bac,
+    "rebuild_completed_sessions": rebuild_completed_sessions,
+    "acquire_lease": acquire_lease,
+    "insert_friend_alerts": insert_friend_alerts,
+    "mark_alerts_read": mark_alerts_read,
+    "mark_alert_read": mark_alert_read,
+    "rebuild_unread_alerts": rebuild_unread_alerts,
+    "update_profile_limits": update_profile_limits,
+    "calibration_aggregates": calibration_aggregates,
+}
@@ -1,8 +1,87 @@
+import asyncio
+import logging
 import os
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from config import (
+    FRIEND_GRAPH_REFRESH,
+    LEADERBOARD_REFRESH_INTERVAL,
+    METRICS_TOKEN,
+    SCHEDULER,
+    SCHEDULER_JITTER,
+    SESSION_STORE,
+    STALE_SWEEP_INTERVAL,
+    UNIVERSITIES_CSV,
+    UNREAD_RECOUNT_INTERVAL,
+    WARM_UP,
+)
+from db import db
+from services import housekeeping, metrics
+from services.friend_graph import friend_graph
+from services.scheduler import Scheduler
+from services.session_store import session_store
+
+logger = logging.getLogger(__name__)
+
+
+def _load_indexes():
+    # NumPy and the university index are kept off the import path; load
+    # them off the event loop instead of inside the first request using them
+    import services.bac_timeline  # noqa: F401
+    from services.university_index import get_index
+
+    get_index()
+
+
+async def warm_up():
+    """One-off startup costs, paid while the server is already accepting requests."""
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        db.warm_up(),
+        asyncio.to_thread(_load_indexes),
+        friend_graph.rebuild(),
+        return_exceptions=True,
+    )
+    for error in results:
+        if isinstance(error, Exception):
+            logger.warning("warm-up step failed: %r", error)
+    logger.info("warm-up finished in %.0f ms", (time.perf_counter() - start) * 1000)
+
 
-app = FastAPI(title="BuzzBoard API", version="0.1.0")
+scheduler = Scheduler(jitter=SCHEDULER_JITTER)
+scheduler.add("close_stale_sessions", STALE_SWEEP_INTERVAL, housekeeping.close_stale_sessions)
+scheduler.add("refresh_leaderboard_counters", LEADERBOARD_REFRESH_INTERVAL, housekeeping.refresh_leaderboard_counters)
+scheduler.add("recount_unread_alerts", UNREAD_RECOUNT_INTERVAL, housekeeping.recount_unread_alerts)
+scheduler.add("reload_leaderboards", LEADERBOARD_REFRESH_INTERVAL, housekeeping.reload_leaderboards, lease=False)
+scheduler.add("refresh_friend_graph", FRIEND_GRAPH_REFRESH, friend_graph.rebuild, lease=False)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Search and profile validation can't work without the university list;
+    # the index itself is built in the background by warm_up
+    if not os.path.exists(UNIVERSITIES_CSV):
+        raise RuntimeError(f"University list not found at {UNIVERSITIES_CSV}; set UNIVERSITIES_CSV")
+    if SESSION_STORE:
+        # Before serving: requests must not see the database behind the store
+        await session_store.load()
+        session_store.start()
+    warming = asyncio.create_task(warm_up()) if WARM_UP else None
+    if SCHEDULER:
+        scheduler.start()
+    yield
+    if warming:
+        warming.cancel()
+    await scheduler.stop()
+    await session_store.stop()
+    await db.aclose()
+
+
+app = FastAPI(title="BuzzBoard API", version="0.1.0", lifespan=lifespan)
 
 _origins_env = os.getenv("ALLOWED_ORIGINS", "")
 allowed_origins = [o.strip() for o in _origins_env.split(",") if o.strip()] or [
@@ -18,8 +97,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
 
-from routers import auth, profile, calibration, drinks, social, leaderboard
+from routers import auth, profile, calibration, drinks, social, leaderboard, universities
 
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(profile.router, prefix="/api/profile", tags=["profile"])
@@ -27,8 +107,33 @@ app.include_router(calibration.router, prefix="/api/calibration", tags=["calibra
 app.include_router(drinks.router, prefix="/api/drinks", tags=["drinks"])
 app.include_router(social.router, prefix="/api/social", tags=["social"])
 app.include_router(leaderboard.router, prefix="/api/leaderboard", tags=["leaderboard"])
+app.include_router(universities.router, prefix="/api/universities", tags=["universities"])
+
+from services.group_live import live_reads
+from services.groups import group_reads
+from services.leaderboard_index import board_loads
+from services.profile_cache import profiles
+from services.pubsub import hub
+
+metrics.collect("buzzboard_cache", auth.verified_tokens.stats, cache="tokens")
+metrics.collect("buzzboard_cache", profiles.stats, cache="profiles")
+metrics.collect("buzzboard_pubsub", hub.stats)
+metrics.collect("buzzboard_singleflight", board_loads.stats, flight="leaderboards")
+metrics.collect("buzzboard_singleflight", group_reads.stats, flight="group_members")
+metrics.collect("buzzboard_singleflight", live_reads.stats, flight="group_live")
+metrics.collect("buzzboard_friend_graph", friend_graph.stats)
+metrics.collect("buzzboard_session_store", session_store.stats)
+for job in scheduler.jobs.values():
+    metrics.collect("buzzboard_job", job.stats, job=job.name)
 
 
 @app.get("/api/health")
 async def health():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional
 
 
@@ -11,6 +12,19 @@ class ProfileUpdate(BaseModel):
     personal_drink_limit: Optional[int] = None
     show_on_leaderboard: Optional[bool] = None
 
+    @field_validator("university_name")
+    @classmethod
+    def canonical_university(cls, v: Optional[str]) -> Optional[str]:
+        # Leaderboards group by exact name, so store the list's spelling
+        from services.university_index import get_index  # NumPy; kept off the import path
+
+        if not v:
+            return v
+        name = get_index().canonical(v)
+        if name is None:
+            raise ValueError("Unknown university; pick one from /api/universities/search")
+        return name
+
 
 class DrinkLogCreate(BaseModel):
     session_id: str
@@ -18,6 +32,18 @@ class DrinkLogCreate(BaseModel):
     quantity: float = 1.0
 
 
+class QueuedDrink(BaseModel):
+    client_id: str = Field(..., min_length=1, max_length=64)  # idempotency key
+    drink_type: str  # 'shot', 'beer', 'mixed'
+    quantity: float = 1.0
+    logged_at: Optional[datetime] = None  # when the drink was had; default now
+
+
+class DrinkLogBatch(BaseModel):
+    session_id: str
+    drinks: list[QueuedDrink] = Field(..., min_length=1, max_length=200)
+
+
 class CalibrationCreate(BaseModel):
     drinks_consumed: int
     feeling_rating: int  # 1-5
@@ -40,6 +66,10 @@ class PrivacyToggle(BaseModel):
     can_see_drinks: bool
 
 
+class AlertsRead(BaseModel):
+    cursor: str  # read_cursor from GET /social/alerts
+
+
 class NightPrivacyOverride(BaseModel):
     session_id: str
     friend_id: str
@@ -1,27 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+import hashlib
+import time
+import uuid
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from jose import jwt, JWTError
-from config import SUPABASE_JWT_SECRET
+from config import STREAM_TICKET_SECRET, STREAM_TICKET_TTL, SUPABASE_JWT_SECRET, TOKEN_CACHE_SIZE
+from services.cache import TTLCache
 
 router = APIRouter()
 
+# sha256(token) -> user_id, each entry expiring at the token's own exp
+verified_tokens = TTLCache(maxsize=TOKEN_CACHE_SIZE)
+
+# Stream tickets already redeemed, by jti, kept until they would expire
+redeemed_tickets = TTLCache(maxsize=TOKEN_CACHE_SIZE)
+
+STREAM_TICKET_AUDIENCE = "stream"
+
 
 async def get_current_user(authorization: str = Header(...)) -> str:
     """Extract user_id from Supabase JWT token."""
+    token = authorization.replace("Bearer ", "")
+    digest = hashlib.sha256(token.encode()).digest()
+    user_id = verified_tokens.get(digest)
+    if user_id is not None:
+        return user_id
+
     try:
-        token = authorization.replace("Bearer ", "")
         payload = jwt.decode(
             token,
             SUPABASE_JWT_SECRET,
             algorithms=["HS256"],
             audience="authenticated",
         )
-        user_id = payload.get("sub")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    # Only tokens that expire are cached, and never past their expiry
+    exp = payload.get("exp")
+    if exp:
+        verified_tokens.set(digest, user_id, ttl=exp - time.time())
+    return user_id
+
+
+async def get_stream_user(
+    authorization: Optional[str] = Header(None),
+    ticket: Optional[str] = Query(None),
+) -> str:
+    """get_current_user that also takes a stream ticket as ?ticket=.
+
+    Browsers' EventSource cannot set an Authorization header, and a JWT in
+    the query string ends up in access logs, so the query string only
+    takes a ticket from POST /stream-ticket: short-lived and single-use.
+    Tickets are signed with STREAM_TICKET_SECRET rather than the Supabase
+    secret, so a leaked one is no bearer token; instances sharing the key
+    redeem each other's, and each refuses a ticket it has already seen.
+    """
+    if authorization:
+        return await get_current_user(authorization)
+    if not ticket:
+        raise HTTPException(status_code=401, detail="Missing token")
+
+    try:
+        payload = jwt.decode(
+            ticket,
+            STREAM_TICKET_SECRET,
+            algorithms=["HS256"],
+            audience=STREAM_TICKET_AUDIENCE,
+        )
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid ticket")
+    jti = payload.get("jti")
+    if not (payload.get("sub") and payload.get("exp") and jti) or redeemed_tickets.get(jti):
+        raise HTTPException(status_code=401, detail="Invalid ticket")
+    redeemed_tickets.set(jti, True, ttl=payload["exp"] - time.time())
+    return payload["sub"]
+
+
+@router.post("/stream-ticket")
+async def create_stream_ticket(user_id: str = Depends(get_current_user)):
+    """A ticket for opening GET /api/social/stream?ticket= once."""
+    ticket = jwt.encode(
+        {
+            "sub": user_id,
+            "aud": STREAM_TICKET_AUDIENCE,
+            "exp": int(time.time() + STREAM_TICKET_TTL),
+            "jti": str(uuid.uuid4()),
+        },
+        STREAM_TICKET_SECRET,
+        algorithm="HS256",
+    )
+    return {"ticket": ticket, "expires_in": STREAM_TICKET_TTL}
+
 
 @router.get("/me")
 async def get_me(user_id: str = Depends(get_current_user)):
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from routers.auth import get_current_user
 from models.schemas import CalibrationCreate
-from config import supabase
-from services.limit_engine import adjust_limits_from_calibration
+from db import db
+from services.limit_engine import adjust_limits_from_calibration, limits_version
+from services.profile_cache import get_profile, store_profile
 
 router = APIRouter()
 
@@ -12,28 +13,30 @@ async def submit_calibration(
     data: CalibrationCreate, user_id: str = Depends(get_current_user)
 ):
     # Get current calibration count
-    profile = (
-        supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-    )
-    if not profile.data:
+    profile = await get_profile(user_id)
+    if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
 
-    current_count = profile.data.get("calibration_count", 0)
+    current_count = profile.get("calibration_count", 0)
     if current_count >= 3:
         raise HTTPException(status_code=400, detail="Calibration already complete")
 
     session_number = current_count + 1
 
     # Insert calibration session
-    supabase.table("calibration_sessions").insert(
-        {
-            "user_id": user_id,
-            "session_number": session_number,
-            "drinks_consumed": data.drinks_consumed,
-            "feeling_rating": data.feeling_rating,
-            "could_handle_more": data.could_handle_more,
-        }
-    ).execute()
+    await (
+        db.table("calibration_sessions")
+        .insert(
+            {
+                "user_id": user_id,
+                "session_number": session_number,
+                "drinks_consumed": data.drinks_consumed,
+                "feeling_rating": data.feeling_rating,
+                "could_handle_more": data.could_handle_more,
+            }
+        )
+        .execute()
+    )
 
     # Update profile calibration count
     new_count = session_number
@@ -41,15 +44,19 @@ async def submit_calibration(
 
     # After 3rd session, recalculate limits
     if new_count >= 3:
-        p = profile.data
-        adjusted = adjust_limits_from_calibration(
-            user_id, p["weight_lbs"], p["biological_gender"]
+        adjusted = await adjust_limits_from_calibration(
+            user_id, profile["weight_lbs"], profile["biological_gender"]
         )
         updates["calculated_low_limit"] = adjusted["low"]
         updates["calculated_med_limit"] = adjusted["med"]
         updates["calculated_high_limit"] = adjusted["high"]
+        updates["limits_version"] = limits_version(
+            profile["weight_lbs"], profile["biological_gender"]
+        )
 
-    supabase.table("profiles").update(updates).eq("id", user_id).execute()
+    result = await db.table("profiles").update(updates).eq("id", user_id).execute()
+    if result.data:
+        store_profile(result.data[0])
 
     return {
         "session_number": session_number,
@@ -59,12 +66,6 @@ async def submit_calibration(
 
 @router.get("/status")
 async def calibration_status(user_id: str = Depends(get_current_user)):
-    profile = (
-        supabase.table("profiles")
-        .select("calibration_count")
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
-    count = profile.data.get("calibration_count", 0) if profile.data else 0
+    profile = await get_profile(user_id)
+    count = profile.get("calibration_count", 0) if profile else 0
     return {"count": count, "complete": count >= 3}
@@ -1,19 +1,46 @@
+import asyncio
+import uuid
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Literal, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from routers.auth import get_current_user
-from models.schemas import DrinkLogCreate
-from config import supabase
-from services.bac_calculator import calculate_bac, DRINK_STANDARD_EQUIVALENTS
-from services.alert_service import send_friend_alerts
+from models.schemas import DrinkLogBatch, DrinkLogCreate
+from db import db
+from services.bac_calculator import DRINK_STANDARD_EQUIVALENTS, peak_bac, project_bac
+from services.drink_logger import complete_session, raise_peak_bac, record_drink, record_drinks
+from services.leaderboard_index import leaderboards
+from services.profile_cache import get_profile, invalidate_profile
+from services.alert_service import publish_presence, send_friend_alerts
+from services.friend_graph import friend_graph
+from services.session_store import session_store
+# services.bac_timeline needs NumPy, so it is imported where used to keep it
+# off the cold-start path (main.warm_up loads it in the background)
+from services.cursors import decode_cursor, encode_cursor
+from services.session_history import (
+    csv_chunks,
+    fetch_history_page,
+    iter_history,
+    ndjson_chunks,
+    summarize_session,
+)
+
+# Sessions fetched per upstream request while exporting
+EXPORT_PAGE_SIZE = 200
 
 router = APIRouter()
 
 
 @router.post("/sessions")
-async def start_session(user_id: str = Depends(get_current_user)):
+async def start_session(
+    background_tasks: BackgroundTasks, user_id: str = Depends(get_current_user)
+):
+    if session_store.ready and session_store.get(user_id):
+        raise HTTPException(status_code=400, detail="Already have an active session")
+
     # Check for existing active session
-    existing = (
-        supabase.table("drink_sessions")
+    existing = await (
+        db.table("drink_sessions")
         .select("id")
         .eq("user_id", user_id)
         .eq("is_active", True)
@@ -22,143 +49,355 @@ async def start_session(user_id: str = Depends(get_current_user)):
     if existing.data:
         raise HTTPException(status_code=400, detail="Already have an active session")
 
-    result = (
-        supabase.table("drink_sessions")
+    result = await (
+        db.table("drink_sessions")
         .insert({"user_id": user_id})
         .execute()
     )
+    if session_store.ready:
+        session_store.add(result.data[0])
+    background_tasks.add_task(publish_presence, user_id, True)
     return result.data[0]
 
 
 @router.get("/sessions/active")
 async def get_active_session(user_id: str = Depends(get_current_user)):
-    result = (
-        supabase.table("drink_sessions")
+    if session_store.ready:
+        session = session_store.get(user_id)
+        return session.row() if session else None
+
+    result = await (
+        db.table("drink_sessions")
         .select("*")
         .eq("user_id", user_id)
         .eq("is_active", True)
         .maybe_single()
         .execute()
     )
-    return result.data
+    return result.data if result else None
+
+
+@router.get("/sessions/active/projection")
+async def get_active_projection(user_id: str = Depends(get_current_user)):
+    """When the active session's BAC drops below zero and each limit.
+
+    Clients refresh at next_change_at instead of polling.
+    """
+    if session_store.ready:
+        active = session_store.get(user_id)
+        session = active.row() if active else None
+        profile = await get_profile(user_id)
+    else:
+        result, profile = await asyncio.gather(
+            db.table("drink_sessions")
+            .select("id, started_at, total_standard_drinks")
+            .eq("user_id", user_id)
+            .eq("is_active", True)
+            .maybe_single()
+            .execute(),
+            get_profile(user_id),
+        )
+        session = result.data if result else None
+    if not session:
+        raise HTTPException(status_code=404, detail="Active session not found")
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return {
+        "session_id": session["id"],
+        **project_bac(
+            session["total_standard_drinks"] or 0,
+            profile["weight_lbs"],
+            profile["biological_gender"],
+            datetime.fromisoformat(session["started_at"]),
+            datetime.now(timezone.utc),
+        ),
+    }
 
 
 @router.post("/log")
-async def log_drink(data: DrinkLogCreate, user_id: str = Depends(get_current_user)):
+async def log_drink(
+    data: DrinkLogCreate,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user),
+):
     # Validate drink type
     std_equiv = DRINK_STANDARD_EQUIVALENTS.get(data.drink_type)
     if std_equiv is None:
         raise HTTPException(status_code=400, detail="Invalid drink type")
 
-    # Verify session belongs to user
-    session = (
-        supabase.table("drink_sessions")
-        .select("*")
-        .eq("id", data.session_id)
-        .eq("user_id", user_id)
-        .eq("is_active", True)
-        .single()
-        .execute()
-    )
-    if not session.data:
+    if session_store.ready:
+        # Answered from memory; the log is written behind
+        profile = await get_profile(user_id)
+        if not profile:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        result = session_store.log_drink(
+            user_id, data.session_id, data.drink_type, data.quantity, std_equiv * data.quantity, profile
+        )
+    else:
+        # Insert, increment totals, update peak BAC and check limits in one RPC
+        result = await record_drink(
+            user_id, data.session_id, data.drink_type, data.quantity, std_equiv * data.quantity
+        )
+    if result is None:
         raise HTTPException(status_code=404, detail="Active session not found")
 
-    # Insert drink log
-    log_result = (
-        supabase.table("drink_logs")
-        .insert(
+    # current_bac comes from the projection, as on /sessions/active/projection
+    projection = project_bac(
+        result["total_standard_drinks"],
+        result["weight_lbs"],
+        result["biological_gender"],
+        datetime.fromisoformat(result["started_at"]),
+        datetime.now(timezone.utc),
+    )
+
+    # Alert friends once, when this drink first crosses a limit, after responding
+    if result["crossed_level"]:
+        background_tasks.add_task(
+            send_friend_alerts,
+            user_id,
+            data.session_id,
+            projection["current_bac"],
+            result["crossed_level"],
+        )
+
+    return {
+        "log": result["log"],
+        "total_standard_drinks": result["total_standard_drinks"],
+        "current_bac": projection["current_bac"],
+        "peak_bac": result["peak_bac"],
+        "projection": projection,
+    }
+
+
+@router.post("/log/batch")
+async def log_drinks(
+    data: DrinkLogBatch,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user),
+):
+    """Log drinks queued while offline; safe to retry with the same batch."""
+    drinks = []
+    for drink in data.drinks:
+        std_equiv = DRINK_STANDARD_EQUIVALENTS.get(drink.drink_type)
+        if std_equiv is None:
+            raise HTTPException(status_code=400, detail=f"Invalid drink type: {drink.drink_type}")
+        logged_at = drink.logged_at
+        if logged_at and logged_at.tzinfo is None:
+            logged_at = logged_at.replace(tzinfo=timezone.utc)
+        drinks.append(
             {
-                "session_id": data.session_id,
-                "drink_type": data.drink_type,
-                "quantity": data.quantity,
-                "standard_drink_equivalent": std_equiv * data.quantity,
+                "client_id": drink.client_id,
+                "drink_type": drink.drink_type,
+                "quantity": drink.quantity,
+                "standard_drinks": std_equiv * drink.quantity,
+                "logged_at": logged_at.isoformat() if logged_at else None,
             }
         )
-        .execute()
-    )
 
-    # Recalculate totals
-    new_total = (session.data["total_standard_drinks"] or 0) + (std_equiv * data.quantity)
+    # The RPC reads the session's logs and totals, so store queued writes first
+    if session_store.ready:
+        await session_store.flush()
 
-    # Get user profile for BAC calculation
-    profile = (
-        supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-    )
+    # One bulk insert; drinks already logged under their client_id are skipped
+    result = await record_drinks(user_id, data.session_id, drinks)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Active session not found")
 
-    hours_elapsed = (
-        datetime.now(timezone.utc) - datetime.fromisoformat(session.data["started_at"])
-    ).total_seconds() / 3600
+    # Backfilled drinks can move the peak into the past, so take it from
+    # every drink rather than from the current BAC
+    now = datetime.now(timezone.utc)
+    peak = max(
+        result["peak_bac"] or 0,
+        peak_bac(
+            result["session_drinks"],
+            result["weight_lbs"],
+            result["biological_gender"],
+            datetime.fromisoformat(result["started_at"]),
+        ),
+    )
+    if result["logs"] and peak > (result["peak_bac"] or 0):
+        background_tasks.add_task(raise_peak_bac, data.session_id, peak)
+    total = result["total_standard_drinks"]
+    if session_store.ready:
+        session_store.apply(user_id, {**result, "peak_bac": peak})
+        # Includes drinks logged in memory while the RPC ran
+        active = session_store.get(user_id)
+        if active is not None and active.id == data.session_id:
+            total = active.total
 
-    current_bac = calculate_bac(
-        new_total,
-        profile.data["weight_lbs"],
-        profile.data["biological_gender"],
-        hours_elapsed,
+    projection = project_bac(
+        total,
+        result["weight_lbs"],
+        result["biological_gender"],
+        datetime.fromisoformat(result["started_at"]),
+        now,
     )
 
-    peak_bac = max(session.data.get("peak_bac", 0), current_bac)
+    # The batch counts as one step, so at most one alert
+    if result["crossed_level"]:
+        background_tasks.add_task(
+            send_friend_alerts,
+            user_id,
+            data.session_id,
+            projection["current_bac"],
+            result["crossed_level"],
+        )
 
-    # Update session
-    supabase.table("drink_sessions").update(
-        {"total_standard_drinks": new_total, "peak_bac": peak_bac}
-    ).eq("id", data.session_id).execute()
+    return {
+        "logs": result["logs"],
+        "duplicates": result["duplicates"],
+        "total_standard_drinks": total,
+        "current_bac": projection["current_bac"],
+        "peak_bac": peak,
+        "projection": projection,
+    }
 
-    # Check limits and send alerts if exceeded
-    high_limit = profile.data.get("calculated_high_limit", 0)
-    med_limit = profile.data.get("calculated_med_limit", 0)
 
-    if high_limit and new_total >= high_limit:
-        send_friend_alerts(user_id, data.session_id, current_bac, "high")
-    elif med_limit and new_total >= med_limit:
-        send_friend_alerts(user_id, data.session_id, current_bac, "medium")
+@router.put("/sessions/{session_id}/end")
+async def end_session(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    user_id: str = Depends(get_current_user),
+):
+    # Untrack the session first, so a drink logged while it closes is
+    # refused rather than queued against it; drinks already queued must be
+    # stored before it closes
+    closing = session_store.take(user_id, session_id) if session_store.ready else None
+    try:
+        if session_store.ready:
+            await session_store.flush()
+        # End the session and bump the leaderboard counter in one RPC
+        result = await complete_session(user_id, session_id)
+    except Exception:
+        session_store.restore(closing)
+        raise
+    if result is None:
+        session_store.restore(closing)
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if result["completed_sessions"] is not None:
+        leaderboards.record_completed(user_id, result["completed_sessions"])
+        invalidate_profile(user_id)
+        friend_graph.forget_session(session_id)
+        background_tasks.add_task(publish_presence, user_id, False)
+    return result["session"]
+
+
+@router.get("/history")
+async def get_history(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user_id: str = Depends(get_current_user),
+):
+    after = None
+    if cursor:
+        try:
+            started_at, session_id = decode_cursor(cursor)
+            after = (datetime.fromisoformat(started_at).isoformat(), str(uuid.UUID(session_id)))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
 
+    page, profile = await asyncio.gather(
+        fetch_history_page(user_id, after, limit), get_profile(user_id)
+    )
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    last = page[-1] if len(page) == limit else None
     return {
-        "log": log_result.data[0] if log_result.data else None,
-        "total_standard_drinks": new_total,
-        "current_bac": current_bac,
-        "peak_bac": peak_bac,
+        "sessions": [summarize_session(s, profile) for s in page],
+        "next_cursor": encode_cursor(last["started_at"], last["id"]) if last else None,
     }
 
 
-@router.put("/sessions/{session_id}/end")
-async def end_session(session_id: str, user_id: str = Depends(get_current_user)):
-    result = (
-        supabase.table("drink_sessions")
-        .update(
-            {
-                "is_active": False,
-                "ended_at": datetime.now(timezone.utc).isoformat(),
-                "status": "completed",
-            }
-        )
-        .eq("id", session_id)
-        .eq("user_id", user_id)
-        .execute()
+@router.get("/history/export")
+async def export_history(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    user_id: str = Depends(get_current_user),
+):
+    profile = await get_profile(user_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    pages = iter_history(user_id, profile, EXPORT_PAGE_SIZE)
+    if format == "csv":
+        body, media_type = csv_chunks(pages), "text/csv"
+    else:
+        body, media_type = ndjson_chunks(pages), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="buzzboard-history.{format}"'},
     )
-    if not result.data:
-        raise HTTPException(status_code=404, detail="Session not found")
-    return result.data[0]
 
 
 @router.get("/sessions/{session_id}")
 async def get_session(session_id: str, user_id: str = Depends(get_current_user)):
-    session = (
-        supabase.table("drink_sessions")
+    session, logs = await db.gather(
+        db.table("drink_sessions")
         .select("*")
         .eq("id", session_id)
         .eq("user_id", user_id)
-        .single()
-        .execute()
+        .single(),
+        db.table("drink_logs")
+        .select("*")
+        .eq("session_id", session_id)
+        .order("logged_at"),
     )
     if not session.data:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    logs = (
-        supabase.table("drink_logs")
-        .select("*")
-        .eq("session_id", session_id)
-        .order("logged_at")
-        .execute()
+    return {"session": session.data, "logs": logs.data or []}
+
+
+@router.get("/sessions/{session_id}/curve")
+async def get_session_curve(
+    session_id: str,
+    points: int = Query(120, ge=2, le=5000),
+    user_id: str = Depends(get_current_user),
+):
+    """The session's BAC curve from services.bac_timeline.
+
+    The curve absorbs each drink gradually from when it was logged, so it
+    differs from `current_bac` elsewhere in the API (/log, /projection,
+    group live state, limits and alerts), which counts every drink as
+    absorbed at the session start; the session's stored peak_bac is in
+    that model too. The curve's value now and its peak are `curve_bac` and
+    `curve_peak_bac`, named apart so clients don't mix the two.
+    """
+    session, logs = await db.gather(
+        db.table("drink_sessions")
+        .select("id, started_at, ended_at")
+        .eq("id", session_id)
+        .eq("user_id", user_id)
+        .maybe_single(),
+        db.table("drink_logs")
+        .select("logged_at, standard_drink_equivalent")
+        .eq("session_id", session_id),
     )
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    profile = await get_profile(user_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
 
-    return {"session": session.data, "logs": logs.data or []}
+    from services.bac_timeline import BACTimeline
+
+    timeline = BACTimeline(logs.data or [], profile["weight_lbs"], profile["biological_gender"])
+    now = datetime.now(timezone.utc)
+    start = datetime.fromisoformat(session.data["started_at"])
+    end = datetime.fromisoformat(session.data["ended_at"]) if session.data.get("ended_at") else now
+    _, bac = timeline.sample(start, end, points)
+    curve_peak, curve_peak_at = timeline.peak(end)
+
+    return {
+        "session_id": session_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "step_seconds": (end - start).total_seconds() / (points - 1),
+        "bac": bac.round(4).tolist(),
+        "curve_bac": round(float(timeline.at(timeline.hours(now))[0]), 4),
+        "curve_peak_bac": curve_peak,
+        "curve_peak_at": curve_peak_at.isoformat(),
+    }
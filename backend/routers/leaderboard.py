@@ -1,97 +1,78 @@
-from fastapi import APIRouter, Depends, Query
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from routers.auth import get_current_user
-from config import supabase
+from services.cursors import decode_cursor, encode_cursor
+from services.leaderboard_index import Leaderboard, leaderboards
 
 router = APIRouter()
 
 
+def _page(board: Leaderboard, cursor: Optional[str], limit: int) -> dict:
+    after = None
+    if cursor:
+        try:
+            sessions, cursor_user = decode_cursor(cursor)
+            after = (int(sessions), str(cursor_user))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    entries, next_key = board.page(after, limit)
+    return {
+        "entries": entries,
+        "next_cursor": encode_cursor(*next_key) if next_key else None,
+        "total": len(board),
+    }
+
+
+def _my_rank(board: Leaderboard, user_id: str) -> dict:
+    entry = board.get(user_id)
+    return {
+        "rank": board.rank(user_id),
+        "sessions": entry[0] if entry else None,
+        "total": len(board),
+    }
+
+
+async def _university_board(name: str) -> Leaderboard:
+    board = await leaderboards.university(name)
+    if board is None:
+        raise HTTPException(status_code=404, detail="Unknown university")
+    return board
+
+
 @router.get("/university")
 async def university_leaderboard(
     name: str = Query(..., description="University name"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
     user_id: str = Depends(get_current_user),
 ):
-    # Get opted-in profiles at this university
-    profiles = (
-        supabase.table("profiles")
-        .select("id, display_name")
-        .eq("university_name", name)
-        .eq("show_on_leaderboard", True)
-        .execute()
-    )
-
-    if not profiles.data:
-        return []
-
-    user_ids = [p["id"] for p in profiles.data]
-
-    # Get completed session counts
-    sessions = (
-        supabase.table("drink_sessions")
-        .select("user_id")
-        .in_("user_id", user_ids)
-        .eq("status", "completed")
-        .execute()
-    )
-
-    session_counts = {}
-    for s in sessions.data or []:
-        session_counts[s["user_id"]] = session_counts.get(s["user_id"], 0) + 1
-
-    ranked = sorted(
-        [
-            {
-                "id": p["id"],
-                "display_name": p["display_name"],
-                "sessions": session_counts.get(p["id"], 0),
-            }
-            for p in profiles.data
-        ],
-        key=lambda x: x["sessions"],
-        reverse=True,
-    )[:50]
-
-    return ranked
+    # Opted-in profiles at this university, ranked by completed sessions
+    board = await _university_board(name)
+    return _page(board, cursor, limit)
+
+
+@router.get("/university/me")
+async def university_rank(
+    name: str = Query(..., description="University name"),
+    user_id: str = Depends(get_current_user),
+):
+    board = await _university_board(name)
+    return _my_rank(board, user_id)
 
 
 @router.get("/group/{group_id}")
 async def group_leaderboard(
-    group_id: str, user_id: str = Depends(get_current_user)
+    group_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    user_id: str = Depends(get_current_user),
 ):
-    members = (
-        supabase.table("friend_group_members")
-        .select("user_id, profiles:profiles!friend_group_members_user_id_fkey(id, display_name)")
-        .eq("group_id", group_id)
-        .execute()
-    )
-
-    if not members.data:
-        return []
-
-    user_ids = [m["user_id"] for m in members.data]
-
-    sessions = (
-        supabase.table("drink_sessions")
-        .select("user_id")
-        .in_("user_id", user_ids)
-        .eq("status", "completed")
-        .execute()
-    )
-
-    session_counts = {}
-    for s in sessions.data or []:
-        session_counts[s["user_id"]] = session_counts.get(s["user_id"], 0) + 1
-
-    ranked = sorted(
-        [
-            {
-                "id": m["user_id"],
-                "display_name": m["profiles"]["display_name"] if m.get("profiles") else "Unknown",
-                "sessions": session_counts.get(m["user_id"], 0),
-            }
-            for m in members.data
-        ],
-        key=lambda x: x["sessions"],
-        reverse=True,
-    )
-
-    return ranked
+    board = await leaderboards.group(group_id)
+    return _page(board, cursor, limit)
+
+
+@router.get("/group/{group_id}/me")
+async def group_rank(group_id: str, user_id: str = Depends(get_current_user)):
+    board = await leaderboards.group(group_id)
+    return _my_rank(board, user_id)
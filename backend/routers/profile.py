@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException
 from routers.auth import get_current_user
 from models.schemas import ProfileUpdate
-from config import supabase
-from services.limit_engine import adjust_limits_from_calibration
+from db import db
+from services.limit_engine import current_limits
+from services.leaderboard_index import leaderboards
+from services.profile_cache import get_profile as get_cached_profile, store_profile
 
 router = APIRouter()
 
 
 @router.get("/")
 async def get_profile(user_id: str = Depends(get_current_user)):
-    result = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-    if not result.data:
+    profile = await get_cached_profile(user_id)
+    if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
-    return result.data
+    return profile
 
 
 @router.put("/")
@@ -23,37 +25,26 @@ async def update_profile(
     if not data:
         raise HTTPException(status_code=400, detail="No fields to update")
 
-    result = (
-        supabase.table("profiles")
+    result = await (
+        db.table("profiles")
         .update(data)
         .eq("id", user_id)
         .execute()
     )
+    if result.data:
+        store_profile(result.data[0])
+        leaderboards.update_profile(result.data[0])
     return result.data[0] if result.data else {"status": "updated"}
 
 
 @router.get("/limits")
 async def get_limits(user_id: str = Depends(get_current_user)):
-    profile = (
-        supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-    )
-    if not profile.data:
+    p = await get_cached_profile(user_id)
+    if not p:
         raise HTTPException(status_code=404, detail="Profile not found")
 
-    p = profile.data
-    if p.get("calibration_count", 0) >= 3:
-        limits = adjust_limits_from_calibration(
-            user_id, p["weight_lbs"], p["biological_gender"]
-        )
-    else:
-        limits = {
-            "low": p.get("calculated_low_limit"),
-            "med": p.get("calculated_med_limit"),
-            "high": p.get("calculated_high_limit"),
-        }
-
     return {
-        "limits": limits,
+        "limits": await current_limits(p),
         "personal_limit": p.get("personal_drink_limit"),
         "calibration_count": p.get("calibration_count", 0),
     }
@@ -1,42 +1,98 @@
-from fastapi import APIRouter, Depends, HTTPException
-from routers.auth import get_current_user
-from models.schemas import FriendRequest, GroupCreate, GroupMemberAdd, PrivacyToggle, NightPrivacyOverride
-from config import supabase
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from routers.auth import get_current_user, get_stream_user
+from models.schemas import AlertsRead, FriendRequest, GroupCreate, GroupMemberAdd, PrivacyToggle, NightPrivacyOverride
+from config import PUBSUB_HEARTBEAT
+from db import db
+from services import alert_service
+from services.cursors import decode_cursor, encode_cursor
+from services.friend_graph import friend_graph
+from services.group_live import group_live, invalidate_group_live, visible_members
+from services.groups import invalidate_group_members
+from services.leaderboard_index import leaderboards
+from services.pubsub import hub
+from services.session_store import session_store
 
 router = APIRouter()
 
 
 @router.get("/friends")
 async def get_friends(user_id: str = Depends(get_current_user)):
-    result = (
-        supabase.table("friendships")
-        .select("*, requester:profiles!friendships_requester_id_fkey(id, display_name), addressee:profiles!friendships_addressee_id_fkey(id, display_name)")
+    if friend_graph.ready:
+        return await _friends_from_graph(user_id)
+
+    result = await (
+        db.table("friendships")
+        .select("id, requester_id, can_see_drinks, requester:profiles!friendships_requester_id_fkey(id, display_name), addressee:profiles!friendships_addressee_id_fkey(id, display_name)")
         .or_(f"requester_id.eq.{user_id},addressee_id.eq.{user_id}")
         .eq("status", "accepted")
         .execute()
     )
+    if not result.data:
+        return []
 
-    friends = []
-    for f in result.data or []:
-        friend_profile = f["addressee"] if f["requester_id"] == user_id else f["requester"]
-        # Check if friend has active session
-        active = (
-            supabase.table("drink_sessions")
-            .select("id")
-            .eq("user_id", friend_profile["id"])
-            .eq("is_active", True)
-            .execute()
-        )
-        friends.append(
-            {
-                **friend_profile,
-                "friendship_id": f["id"],
-                "can_see_drinks": f["can_see_drinks"],
-                "has_active_session": bool(active.data),
-            }
+    friend_profiles = [
+        f["addressee"] if f["requester_id"] == user_id else f["requester"]
+        for f in result.data
+    ]
+
+    # Which friends have an active session, in one query
+    active = await (
+        db.table("drink_sessions")
+        .select("user_id")
+        .in_("user_id", [p["id"] for p in friend_profiles])
+        .eq("is_active", True)
+        .execute()
+    )
+    active_ids = {s["user_id"] for s in active.data or []}
+
+    return [
+        {
+            **friend_profile,
+            "friendship_id": f["id"],
+            "can_see_drinks": f["can_see_drinks"],
+            "has_active_session": friend_profile["id"] in active_ids,
+        }
+        for f, friend_profile in zip(result.data, friend_profiles)
+    ]
+
+
+async def _friends_from_graph(user_id: str):
+    edges = friend_graph.friends(user_id)
+    if not edges:
+        return []
+
+    # Names and active sessions for the friends the graph lists, concurrently
+    friend_ids = [friend_id for friend_id, _, _ in edges]
+    if session_store.ready:
+        found = await db.table("profiles").select("id, display_name").in_("id", friend_ids).execute()
+        active_ids = {f for f in friend_ids if session_store.get(f)}
+    else:
+        found, active = await db.gather(
+            db.table("profiles").select("id, display_name").in_("id", friend_ids),
+            db.table("drink_sessions")
+            .select("user_id")
+            .in_("user_id", friend_ids)
+            .eq("is_active", True),
         )
+        active_ids = {s["user_id"] for s in active.data or []}
+    names = {p["id"]: p for p in found.data or []}
 
-    return friends
+    return [
+        {
+            **names[friend_id],
+            "friendship_id": friendship_id,
+            "can_see_drinks": can_see_drinks,
+            "has_active_session": friend_id in active_ids,
+        }
+        for friend_id, friendship_id, can_see_drinks in edges
+        if friend_id in names
+    ]
 
 
 @router.post("/friends/request")
@@ -46,8 +102,8 @@ async def send_friend_request(
     if data.addressee_id == user_id:
         raise HTTPException(status_code=400, detail="Cannot friend yourself")
 
-    result = (
-        supabase.table("friendships")
+    result = await (
+        db.table("friendships")
         .insert({"requester_id": user_id, "addressee_id": data.addressee_id})
         .execute()
     )
@@ -56,25 +112,29 @@ async def send_friend_request(
 
 @router.put("/friends/{friendship_id}/accept")
 async def accept_request(friendship_id: str, user_id: str = Depends(get_current_user)):
-    result = (
-        supabase.table("friendships")
+    result = await (
+        db.table("friendships")
         .update({"status": "accepted"})
         .eq("id", friendship_id)
         .eq("addressee_id", user_id)
         .execute()
     )
+    for friendship in result.data or []:
+        friend_graph.apply(friendship)
     return result.data[0] if result.data else {"status": "accepted"}
 
 
 @router.put("/friends/{friendship_id}/block")
 async def block_friend(friendship_id: str, user_id: str = Depends(get_current_user)):
-    result = (
-        supabase.table("friendships")
+    result = await (
+        db.table("friendships")
         .update({"status": "blocked"})
         .eq("id", friendship_id)
         .or_(f"requester_id.eq.{user_id},addressee_id.eq.{user_id}")
         .execute()
     )
+    for friendship in result.data or []:
+        friend_graph.apply(friendship)
     return result.data[0] if result.data else {"status": "blocked"}
 
 
@@ -84,20 +144,22 @@ async def toggle_privacy(
     data: PrivacyToggle,
     user_id: str = Depends(get_current_user),
 ):
-    result = (
-        supabase.table("friendships")
+    result = await (
+        db.table("friendships")
         .update({"can_see_drinks": data.can_see_drinks})
         .eq("id", friendship_id)
         .or_(f"requester_id.eq.{user_id},addressee_id.eq.{user_id}")
         .execute()
     )
+    for friendship in result.data or []:
+        friend_graph.apply(friendship)
     return result.data[0] if result.data else {"status": "updated"}
 
 
 @router.post("/groups")
 async def create_group(data: GroupCreate, user_id: str = Depends(get_current_user)):
-    result = (
-        supabase.table("friend_groups")
+    result = await (
+        db.table("friend_groups")
         .insert({"creator_id": user_id, "name": data.name})
         .execute()
     )
@@ -106,8 +168,8 @@ async def create_group(data: GroupCreate, user_id: str = Depends(get_current_use
 
 @router.get("/groups")
 async def get_groups(user_id: str = Depends(get_current_user)):
-    result = (
-        supabase.table("friend_groups")
+    result = await (
+        db.table("friend_groups")
         .select("*, friend_group_members(user_id)")
         .eq("creator_id", user_id)
         .execute()
@@ -122,8 +184,8 @@ async def add_group_member(
     user_id: str = Depends(get_current_user),
 ):
     # Verify user owns the group
-    group = (
-        supabase.table("friend_groups")
+    group = await (
+        db.table("friend_groups")
         .select("id")
         .eq("id", group_id)
         .eq("creator_id", user_id)
@@ -133,45 +195,142 @@ async def add_group_member(
     if not group.data:
         raise HTTPException(status_code=403, detail="Not your group")
 
-    result = (
-        supabase.table("friend_group_members")
+    result = await (
+        db.table("friend_group_members")
         .insert({"group_id": group_id, "user_id": data.user_id})
         .execute()
     )
+    invalidate_group_members(group_id)
+    invalidate_group_live(group_id)
+    leaderboards.invalidate_group(group_id)
     return result.data[0] if result.data else {"status": "added"}
 
 
+@router.get("/groups/{group_id}/live")
+async def get_group_live(group_id: str, user_id: str = Depends(get_current_user)):
+    """Each member's active session, current BAC and limit level, as far as the caller may see them."""
+    live = await group_live(group_id)
+    if live is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    if user_id != live["group"]["creator_id"] and all(m["id"] != user_id for m in live["members"]):
+        raise HTTPException(status_code=403, detail="Not in this group")
+
+    members = visible_members(live, user_id)
+    return {
+        "group_id": group_id,
+        "name": live["group"]["name"],
+        "as_of": live["as_of"],
+        "members": members,
+        "hidden": len(live["members"]) - len(members),
+    }
+
+
 @router.get("/alerts")
-async def get_alerts(user_id: str = Depends(get_current_user)):
-    result = (
-        supabase.table("friend_alerts")
-        .select("*")
-        .eq("friend_id", user_id)
-        .order("created_at", desc=True)
-        .limit(20)
-        .execute()
+async def get_alerts(
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user_id: str = Depends(get_current_user),
+):
+    """One page of the inbox, newest first.
+
+    `next_cursor` continues to older alerts. `read_cursor` marks the newest
+    alert on the page; PUT /alerts/read with it marks that alert and
+    everything older as read.
+    """
+    after = _alert_key(cursor) if cursor else None
+    page = await alert_service.fetch_alerts_page(user_id, after, limit)
+    last = page[-1] if len(page) == limit else None
+    return {
+        "alerts": page,
+        "next_cursor": encode_cursor(last["created_at"], last["id"]) if last else None,
+        "read_cursor": encode_cursor(page[0]["created_at"], page[0]["id"]) if page else None,
+    }
+
+
+@router.get("/alerts/unread")
+async def get_unread_count(user_id: str = Depends(get_current_user)):
+    unread = await alert_service.unread_count(user_id)
+    if unread is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return {"unread": unread}
+
+
+@router.put("/alerts/read")
+async def mark_alerts_read(data: AlertsRead, user_id: str = Depends(get_current_user)):
+    unread = await alert_service.mark_alerts_read(user_id, _alert_key(data.cursor))
+    return {"status": "read", "unread": unread}
+
+
+def _alert_key(cursor: str) -> tuple[str, str]:
+    try:
+        created_at, alert_id = decode_cursor(cursor)
+        return datetime.fromisoformat(created_at).isoformat(), str(uuid.UUID(alert_id))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/stream")
+async def stream_events(user_id: str = Depends(get_stream_user)):
+    """Server-Sent Events: `alert` and `presence` events for this user.
+
+    Each `alert` carries the user's new `unread` count, so a badge can follow
+    the stream without polling /alerts/unread.
+
+    A `reset` event means the stream fell behind and was closed; the client
+    should refetch /alerts and /friends, then reconnect. Browsers, whose
+    EventSource can't send headers, authenticate with ?ticket= from
+    POST /api/auth/stream-ticket, fetching a fresh one per connection.
+    """
+
+    async def events():
+        with hub.subscribe(user_id) as sub:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await sub.get(timeout=PUBSUB_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # Comment line; keeps proxies from closing an idle stream
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                name, data = event
+                yield f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    return result.data or []
 
 
 @router.put("/alerts/{alert_id}/read")
 async def mark_alert_read(alert_id: str, user_id: str = Depends(get_current_user)):
-    result = (
-        supabase.table("friend_alerts")
-        .update({"is_read": True})
-        .eq("id", alert_id)
-        .eq("friend_id", user_id)
-        .execute()
-    )
-    return {"status": "read"}
+    unread = await alert_service.mark_alert_read(user_id, alert_id)
+    return {"status": "read", "unread": unread}
 
 
 @router.post("/privacy/override")
 async def set_night_override(
     data: NightPrivacyOverride, user_id: str = Depends(get_current_user)
 ):
-    result = (
-        supabase.table("night_privacy_overrides")
+    # Overrides apply per session, so only its owner may set them
+    active = session_store.get(user_id) if session_store.ready else None
+    if active is None or active.id != data.session_id:
+        session = await (
+            db.table("drink_sessions")
+            .select("id")
+            .eq("id", data.session_id)
+            .eq("user_id", user_id)
+            .maybe_single()
+            .execute()
+        )
+        if not session or not session.data:
+            raise HTTPException(status_code=403, detail="Not your session")
+
+    result = await (
+        db.table("night_privacy_overrides")
         .upsert(
             {
                 "user_id": user_id,
@@ -182,4 +341,5 @@ async def set_night_override(
         )
         .execute()
     )
+    friend_graph.set_override(data.session_id, data.friend_id, data.can_see)
     return result.data[0] if result.data else {"status": "set"}
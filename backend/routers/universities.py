@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, Query
+from routers.auth import get_current_user
+
+router = APIRouter()
+
+
+@router.get("/search")
+async def search_universities(
+    q: str = Query(..., max_length=100),
+    limit: int = Query(8, ge=1, le=50),
+    user_id: str = Depends(get_current_user),
+):
+    from services.university_index import get_index  # NumPy; kept off the import path
+
+    return get_index().search(q, limit)
@@ -0,0 +1,61 @@
+"""Import-time profile of the app, checked against a startup budget.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, sums
+self time per top-level package and prints the most expensive ones. Exits
+non-zero when the total exceeds the budget, so it can gate CI.
+
+    cd backend && python -m scripts.import_report --budget-ms 1500 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+APP_PACKAGES = {"main", "config", "db", "routers", "services", "models"}
+
+
+def profile_imports(module: str = "main") -> list[tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for every import, in import order."""
+    env = {**os.environ, "SUPABASE_URL": os.environ.get("SUPABASE_URL", "http://upstream")}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", "1500")))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = profile_imports()
+    by_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    total_ms = sum(by_package.values()) / 1000
+    app_ms = sum(us for pkg, us in by_package.items() if pkg in APP_PACKAGES) / 1000
+
+    print(f"{'package':<24}{'self ms':>10}")
+    for pkg, us in sorted(by_package.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"{pkg:<24}{us / 1000:>10.1f}")
+    print(f"\nimport main: {total_ms:.0f} ms total, {app_ms:.0f} ms in app code, budget {args.budget_ms:.0f} ms")
+    heavy = sorted(p for p in ("numpy",) if p in by_package)
+    if heavy:
+        print(f"warning: {', '.join(heavy)} imported at startup; keep it behind a lazy import")
+
+    if total_ms > args.budget_ms:
+        print("over budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
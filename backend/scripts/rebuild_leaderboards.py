@@ -0,0 +1,21 @@
+"""Backfill profiles.completed_sessions from drink_sessions.
+
+Run after applying sql/003_completed_sessions.sql, or whenever the counters
+are suspected to have drifted. The recount happens server-side in a single
+statement; running instances pick up the new counts as their boards reload.
+
+    cd backend && python -m scripts.rebuild_leaderboards
+"""
+import asyncio
+
+from db import db
+
+
+async def main():
+    result = await db.rpc("rebuild_completed_sessions", {}).execute()
+    print(f"Updated {result.data} profile counters")
+    await db.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
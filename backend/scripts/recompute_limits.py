@@ -0,0 +1,162 @@
+"""Re-derive every calibrated profile's limits after a formula change.
+
+Bump LIMITS_FORMULA_VERSION (or change ELIMINATION_RATE, GENDER_RATIO or
+LIMIT_BAC_TARGETS) and run this instead of waiting for each profile to be
+refreshed lazily by current_limits. Calibrated profiles are streamed in
+keyset chunks by id, each with its per-user calibration totals
+(calibration_aggregates, sql/013_calibration_aggregates.sql); limits for a
+whole chunk are computed with NumPy, and only rows whose limits or stamp
+differ are written back, in one update_profile_limits RPC per chunk
+(sql/009_update_profile_limits.sql) that runs while the next chunk is read.
+Profiles still calibrating keep the limits the web client stored for them.
+
+Running API processes see the new limits once their profile cache expires
+(PROFILE_CACHE_TTL).
+
+    cd backend && python -m scripts.recompute_limits --chunk-size 1000 [--dry-run]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from db import db
+from services.limit_batch import (
+    base_limits,
+    calibrated_limits,
+    calibration_adjustments,
+    gender_ratios,
+)
+from services.limit_engine import limits_version
+
+_PROFILE_COLUMNS = (
+    "id, weight_lbs, biological_gender, limits_version, "
+    "calculated_low_limit, calculated_med_limit, calculated_high_limit"
+)
+
+
+async def profile_chunks(chunk_size: int):
+    """Calibrated profiles, chunk_size rows at a time, in id order.
+
+    Only an empty page ends the scan: PostgREST caps every read at its
+    max-rows setting, so a page shorter than chunk_size may not be the last.
+    """
+    after = None
+    while True:
+        query = (
+            db.table("profiles")
+            .select(_PROFILE_COLUMNS)
+            .gte("calibration_count", 3)
+            .not_.is_("weight_lbs", "null")
+        )
+        if after:
+            query = query.gt("id", after)
+        result = await query.order("id").limit(chunk_size).execute()
+        rows = result.data or []
+        if not rows:
+            return
+        yield rows
+        after = rows[-1]["id"]
+
+
+async def calibration_aggregates(user_ids: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-user session count, could-handle-more count and feeling total.
+
+    user_ids are sorted, so they are aggregated in the database as one id
+    range rather than an IN list that would overflow the URL. The range
+    also covers uncalibrated users, whose totals are dropped here.
+    """
+    result = await db.rpc(
+        "calibration_aggregates", {"p_first": user_ids[0], "p_last": user_ids[-1]}
+    ).execute()
+    position = {user_id: i for i, user_id in enumerate(user_ids)}
+    n = len(user_ids)
+    sessions = np.zeros(n, dtype=np.int64)
+    handle_more = np.zeros(n)
+    feeling = np.zeros(n)
+    for row in result.data or []:
+        i = position.get(row["user_id"])
+        if i is not None:
+            sessions[i] = row["sessions"]
+            handle_more[i] = row["handle_more"]
+            feeling[i] = row["feeling"]
+    return sessions, handle_more, feeling
+
+
+def changed_rows(profiles: list[dict], sessions, handle_more, feeling) -> list[dict]:
+    weights = [p["weight_lbs"] for p in profiles]
+    genders = [p["biological_gender"] for p in profiles]
+    limits = calibrated_limits(
+        base_limits(np.array(weights, dtype=np.int64), gender_ratios(genders)),
+        calibration_adjustments(sessions, handle_more, feeling),
+    )
+
+    stored = np.array(
+        [
+            (p["calculated_low_limit"] or -1, p["calculated_med_limit"] or -1, p["calculated_high_limit"] or -1)
+            for p in profiles
+        ],
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    computed = np.column_stack([limits["low"], limits["med"], limits["high"]])
+    versions = [limits_version(w, g) for w, g in zip(weights, genders)]
+    changed = (stored != computed).any(axis=1) | np.array(
+        [p["limits_version"] != v for p, v in zip(profiles, versions)], dtype=bool
+    )
+
+    rows = []
+    for i, (low, med, high) in zip(np.flatnonzero(changed).tolist(), computed[changed].tolist()):
+        rows.append(
+            {
+                "id": profiles[i]["id"],
+                "low": low,
+                "med": med,
+                "high": high,
+                "limits_version": versions[i],
+                "weight_lbs": weights[i],
+                "biological_gender": genders[i],
+            }
+        )
+    return rows
+
+
+async def recompute(chunk_size: int, dry_run: bool) -> dict:
+    stats = {"profiles": 0, "changed": 0, "written": 0, "chunks": 0}
+    start = time.perf_counter()
+    # Each chunk's write overlaps the next chunk's reads
+    writing = None
+    async for profiles in profile_chunks(chunk_size):
+        aggregates = await calibration_aggregates([p["id"] for p in profiles])
+        rows = changed_rows(profiles, *aggregates)
+        if writing:
+            stats["written"] += (await writing).data or 0
+            writing = None
+        if rows and not dry_run:
+            writing = asyncio.ensure_future(db.rpc("update_profile_limits", {"p_rows": rows}).execute())
+        stats["profiles"] += len(profiles)
+        stats["changed"] += len(rows)
+        stats["chunks"] += 1
+    if writing:
+        stats["written"] += (await writing).data or 0
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = round(elapsed, 3)
+    stats["profiles_per_second"] = round(stats["profiles"] / elapsed) if elapsed else 0
+    return stats
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="compute and count, write nothing")
+    args = parser.parse_args()
+
+    stats = await recompute(args.chunk_size, args.dry_run)
+    print(json.dumps(stats, indent=2))
+    await db.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
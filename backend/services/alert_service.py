@@ -1,29 +1,30 @@
-from config import supabase
+from typing import Optional
 
+from db import db
+from services.friend_graph import friend_graph
+from services.profile_cache import invalidate_profile
+from services.pubsub import hub
 
-def send_friend_alerts(user_id: str, session_id: str, bac: float, limit_level: str):
-    """Send alerts to friends who have can_see_drinks = true."""
-    # Get all accepted friendships where can_see_drinks is true
-    friendships = (
-        supabase.table("friendships")
-        .select("*")
+
+async def _drink_viewers(user_id: str, session_id: str) -> list[str]:
+    """Friends allowed to see this session's drinks, read from storage."""
+    # Accepted friendships where can_see_drinks is true, and the night
+    # privacy overrides for this session, fetched concurrently
+    friendships, overrides = await db.gather(
+        db.table("friendships")
+        .select("requester_id, addressee_id")
         .or_(f"requester_id.eq.{user_id},addressee_id.eq.{user_id}")
         .eq("status", "accepted")
-        .eq("can_see_drinks", True)
-        .execute()
-    )
-
-    # Check night privacy overrides for this session
-    overrides = (
-        supabase.table("night_privacy_overrides")
+        .eq("can_see_drinks", True),
+        db.table("night_privacy_overrides")
         .select("friend_id, can_see")
         .eq("user_id", user_id)
-        .eq("session_id", session_id)
-        .execute()
+        .eq("session_id", session_id),
     )
 
     override_map = {o["friend_id"]: o["can_see"] for o in overrides.data}
 
+    viewers = []
     for friendship in friendships.data:
         friend_id = (
             friendship["addressee_id"]
@@ -34,14 +35,113 @@ def send_friend_alerts(user_id: str, session_id: str, bac: float, limit_level: s
         # Check override
         if friend_id in override_map and not override_map[friend_id]:
             continue
+        viewers.append(friend_id)
+    return viewers
+
+
+async def send_friend_alerts(user_id: str, session_id: str, bac: float, limit_level: str):
+    """Send alerts to friends who have can_see_drinks = true.
+
+    Called once per level crossed in a session, off the request path. All
+    alerts go out in a single RPC that also bumps each recipient's unread
+    counter, and each stored alert is pushed to its recipient's open
+    streams with their new unread count.
+    """
+    # The friend graph answers without a round trip once it has loaded
+    if friend_graph.ready:
+        viewers = friend_graph.drink_viewers(user_id, session_id)
+    else:
+        viewers = await _drink_viewers(user_id, session_id)
+
+    message = f"Your friend has exceeded their {limit_level} limit (BAC: {bac:.3f}). Check in on them!"
+    alerts = [
+        {
+            "user_id": user_id,
+            "friend_id": friend_id,
+            "session_id": session_id,
+            "message": message,
+        }
+        for friend_id in viewers
+    ]
+
+    if alerts:
+        result = await db.rpc("insert_friend_alerts", {"p_alerts": alerts}).execute()
+        for alert in result.data or []:
+            # The cached profile holds the old unread_alerts counter
+            invalidate_profile(alert["friend_id"])
+            hub.publish([alert["friend_id"]], "alert", alert)
+
+
+async def publish_presence(user_id: str, has_active_session: bool):
+    """Tell the user's connected friends that a session started or ended."""
+    if not hub.has_subscribers:
+        return
+
+    if friend_graph.ready:
+        friend_ids = friend_graph.friend_ids(user_id)
+    else:
+        friendships = await (
+            db.table("friendships")
+            .select("requester_id, addressee_id")
+            .or_(f"requester_id.eq.{user_id},addressee_id.eq.{user_id}")
+            .eq("status", "accepted")
+            .execute()
+        )
+        friend_ids = [
+            f["addressee_id"] if f["requester_id"] == user_id else f["requester_id"]
+            for f in friendships.data or []
+        ]
+    hub.publish(
+        [f for f in friend_ids if hub.is_connected(f)],
+        "presence",
+        {"user_id": user_id, "has_active_session": has_active_session},
+    )
+
+
+# -- inbox -------------------------------------------------------------------
+
+_ALERT_COLUMNS = "id, user_id, friend_id, session_id, message, is_read, created_at"
+
+
+async def fetch_alerts_page(
+    user_id: str, after: Optional[tuple[str, str]], limit: int
+) -> list[dict]:
+    """Alerts sent to the user, newest first, after the (created_at, id) key `after`."""
+    query = db.table("friend_alerts").select(_ALERT_COLUMNS).eq("friend_id", user_id)
+    if after:
+        created_at, alert_id = after
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt.{alert_id})'
+        )
+    result = await (
+        query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
+    )
+    return result.data or []
+
+
+async def unread_count(user_id: str) -> Optional[int]:
+    """The user's unread counter, or None without a profile."""
+    result = await (
+        db.table("profiles").select("unread_alerts").eq("id", user_id).maybe_single().execute()
+    )
+    return result.data["unread_alerts"] if result and result.data else None
+
+
+async def mark_alerts_read(user_id: str, up_to: tuple[str, str]) -> Optional[int]:
+    """Mark every unread alert at or before the (created_at, id) key read; returns the unread count."""
+    created_at, alert_id = up_to
+    result = await db.rpc(
+        "mark_alerts_read",
+        {"p_user_id": user_id, "p_created_at": created_at, "p_id": alert_id},
+    ).execute()
+    invalidate_profile(user_id)
+    return result.data
 
-        message = f"Your friend has exceeded their {limit_level} limit (BAC: {bac:.3f}). Check in on them!"
 
-        supabase.table("friend_alerts").insert(
-            {
-                "user_id": user_id,
-                "friend_id": friend_id,
-                "session_id": session_id,
-                "message": message,
-            }
-        ).execute()
+async def mark_alert_read(user_id: str, alert_id: str) -> Optional[int]:
+    result = await db.rpc(
+        "mark_alert_read", {"p_user_id": user_id, "p_alert_id": alert_id}
+    ).execute()
+    invalidate_profile(user_id)
+    return result.data
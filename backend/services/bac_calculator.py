@@ -1,7 +1,12 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
 STANDARD_DRINK_GRAMS = 14
 ELIMINATION_RATE = 0.015
 GENDER_RATIO = {"male": 0.68, "female": 0.55}
 LBS_TO_GRAMS = 453.592
+# First-order absorption rate constant (per hour), as in src/utils/bac.js
+ABSORPTION_RATE = 6.5
 
 DRINK_STANDARD_EQUIVALENTS = {
     "shot": 1.0,
@@ -9,6 +14,17 @@ DRINK_STANDARD_EQUIVALENTS = {
     "mixed": 1.5,
 }
 
+# BAC each drink limit is derived from
+LIMIT_BAC_TARGETS = {"low": 0.04, "med": 0.06, "high": 0.08}
+
+
+def widmark_bac(total_standard_drinks: float, weight_lbs: int, gender: str) -> float:
+    """BAC in g/dL with everything absorbed and nothing yet eliminated."""
+    alcohol_grams = total_standard_drinks * STANDARD_DRINK_GRAMS
+    body_weight_grams = weight_lbs * LBS_TO_GRAMS
+    r = GENDER_RATIO.get(gender, 0.68)
+    return (alcohol_grams / (body_weight_grams * r)) * 100
+
 
 def calculate_bac(
     total_standard_drinks: float,
@@ -16,13 +32,75 @@ def calculate_bac(
     gender: str,
     hours_elapsed: float,
 ) -> float:
-    alcohol_grams = total_standard_drinks * STANDARD_DRINK_GRAMS
-    body_weight_grams = weight_lbs * LBS_TO_GRAMS
-    r = GENDER_RATIO.get(gender, 0.68)
-    bac = (alcohol_grams / (body_weight_grams * r)) - (ELIMINATION_RATE * hours_elapsed)
+    bac = widmark_bac(total_standard_drinks, weight_lbs, gender) - (ELIMINATION_RATE * hours_elapsed)
     return max(0.0, round(bac, 4))
 
 
+def peak_bac(
+    drinks: list[dict],
+    weight_lbs: int,
+    gender: str,
+    started_at: datetime,
+) -> float:
+    """Highest calculate_bac over a session's drinks, backfilled ones included.
+
+    This is the model peak_bac is stored in. It only rises when a drink is
+    logged and falls in between, so the peak is right after some drink.
+    """
+    peak, total = 0.0, 0.0
+    for logged_at, standard_drinks in sorted(
+        (datetime.fromisoformat(d["logged_at"]), d.get("standard_drink_equivalent") or 0) for d in drinks
+    ):
+        total += standard_drinks
+        hours = (logged_at - started_at).total_seconds() / 3600
+        peak = max(peak, calculate_bac(total, weight_lbs, gender, hours))
+    return peak
+
+
+def project_bac(
+    total_standard_drinks: float,
+    weight_lbs: int,
+    gender: str,
+    started_at: datetime,
+    now: datetime,
+) -> dict:
+    """Closed-form projection of calculate_bac, assuming no further drinks.
+
+    The model falls linearly from its value at started_at, so the time BAC
+    reaches zero and the time it drops below each limit's target BAC are
+    each one division. Crossing times in the past are when that limit was
+    crossed; future ones are when it will be. next_change_at is the first
+    future crossing, which is when a client needs to refresh.
+    """
+    initial = widmark_bac(total_standard_drinks, weight_lbs, gender)
+
+    def drops_below(bac: float) -> Optional[datetime]:
+        if initial <= bac:
+            return None
+        return started_at + timedelta(hours=(initial - bac) / ELIMINATION_RATE)
+
+    hours_elapsed = (now - started_at).total_seconds() / 3600
+    current = calculate_bac(total_standard_drinks, weight_lbs, gender, hours_elapsed)
+    sober_at = drops_below(0)
+    crossings = {level: drops_below(target) for level, target in LIMIT_BAC_TARGETS.items()}
+    upcoming = [t for t in [sober_at, *crossings.values()] if t is not None and t > now]
+
+    return {
+        "current_bac": current,
+        "as_of": now.isoformat(),
+        "sober_at": sober_at.isoformat() if sober_at else None,
+        "limits": {
+            level: {
+                "bac": LIMIT_BAC_TARGETS[level],
+                "above": current >= LIMIT_BAC_TARGETS[level],
+                "drops_below_at": crossed.isoformat() if crossed else None,
+            }
+            for level, crossed in crossings.items()
+        },
+        "next_change_at": min(upcoming).isoformat() if upcoming else None,
+    }
+
+
 def drinks_for_bac(
     target_bac: float,
     weight_lbs: int,
@@ -31,13 +109,12 @@ def drinks_for_bac(
 ) -> int:
     body_weight_grams = weight_lbs * LBS_TO_GRAMS
     r = GENDER_RATIO.get(gender, 0.68)
-    alcohol_grams = (target_bac + ELIMINATION_RATE * hours_elapsed) * body_weight_grams * r
+    alcohol_grams = (target_bac + ELIMINATION_RATE * hours_elapsed) / 100 * body_weight_grams * r
     return max(1, round(alcohol_grams / STANDARD_DRINK_GRAMS))
 
 
 def calculate_limits(weight_lbs: int, gender: str) -> dict:
     return {
-        "low": drinks_for_bac(0.04, weight_lbs, gender),
-        "med": drinks_for_bac(0.06, weight_lbs, gender),
-        "high": drinks_for_bac(0.08, weight_lbs, gender),
+        level: drinks_for_bac(target, weight_lbs, gender)
+        for level, target in LIMIT_BAC_TARGETS.items()
     }
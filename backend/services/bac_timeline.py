@@ -0,0 +1,118 @@
+"""Per-drink BAC timeline for a session.
+
+Every drink in drink_logs is absorbed on its own, first-order from the moment
+it was logged, and the body eliminates alcohol at the zero-order Widmark rate
+while BAC is above zero. (Giving each drink its own elimination line would
+multiply the elimination rate by the number of drinks in the system.)
+
+With X(t) = absorbed(t) - ELIMINATION_RATE * t, BAC is X reflected at zero:
+BAC(t) = X(t) - min(0, min over s <= t of X(s)). Between two drinks X is
+concave, so that running minimum only needs X at the drink times, and its
+maximum has a closed form. Evaluation at m time points is O(n + m) NumPy
+work for n drinks.
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+
+import numpy as np
+
+from services.bac_calculator import (
+    ABSORPTION_RATE,
+    ELIMINATION_RATE,
+    GENDER_RATIO,
+    LBS_TO_GRAMS,
+    STANDARD_DRINK_GRAMS,
+)
+
+
+def _parse(ts) -> datetime:
+    return ts if isinstance(ts, datetime) else datetime.fromisoformat(ts)
+
+
+class BACTimeline:
+    """BAC over time for one session's drinks.
+
+    Times are datetimes, or float hours since `origin` (the first drink, or
+    now if there are none).
+    """
+
+    def __init__(self, logs: Sequence[dict], weight_lbs: int, gender: str):
+        logs = sorted(logs, key=lambda log: _parse(log["logged_at"]))
+        logged = [_parse(log["logged_at"]) for log in logs]
+        self.origin = logged[0] if logged else datetime.now(timezone.utc)
+        self.drink_hours = np.array(
+            [(t - self.origin).total_seconds() / 3600 for t in logged], dtype=np.float64
+        )
+
+        # BAC each drink would add if absorbed instantly, in g/dL
+        r = GENDER_RATIO.get(gender, 0.68)
+        grams = np.array(
+            [(log.get("standard_drink_equivalent") or 0) * STANDARD_DRINK_GRAMS for log in logs],
+            dtype=np.float64,
+        )
+        doses = grams / (weight_lbs * LBS_TO_GRAMS * r) * 100
+
+        # Right after drink k: total dose so far and the part not yet absorbed
+        self._dose = np.cumsum(doses)
+        self._pending = np.empty_like(doses)
+        pending, previous = 0.0, 0.0
+        for k, (hour, dose) in enumerate(zip(self.drink_hours, doses)):
+            pending = pending * math.exp(-ABSORPTION_RATE * (hour - previous)) + dose
+            self._pending[k] = pending
+            previous = hour
+
+        # min(0, X at drinks 0..k): where BAC was last floored at zero
+        at_drinks = self._dose - self._pending - ELIMINATION_RATE * self.drink_hours
+        self._floor = np.minimum.accumulate(np.minimum(at_drinks, 0.0))
+
+    def hours(self, ts) -> float:
+        return (_parse(ts) - self.origin).total_seconds() / 3600
+
+    def time_at(self, hours: float) -> datetime:
+        return self.origin + timedelta(hours=float(hours))
+
+    def _excess(self, t: np.ndarray, k: np.ndarray) -> np.ndarray:
+        """X(t), for times t at or after drink k and before drink k + 1."""
+        absorbing = self._pending[k] * np.exp(-ABSORPTION_RATE * (t - self.drink_hours[k]))
+        return self._dose[k] - absorbing - ELIMINATION_RATE * t
+
+    def at(self, hours) -> np.ndarray:
+        """BAC at each of `hours` (hours since origin)."""
+        t = np.atleast_1d(np.asarray(hours, dtype=np.float64))
+        out = np.zeros(t.shape, dtype=np.float64)
+        if not self._dose.size:
+            return out
+        k = np.searchsorted(self.drink_hours, t, side="right") - 1
+        started = k >= 0
+        kk = k[started]
+        out[started] = np.maximum(self._excess(t[started], kk) - self._floor[kk], 0.0)
+        return out
+
+    def sample(self, start, end, points: int) -> tuple[np.ndarray, np.ndarray]:
+        """`points` evenly spaced (hours, bac) samples between start and end."""
+        hours = np.linspace(self.hours(start), self.hours(end), points)
+        return hours, self.at(hours)
+
+    def peak(self, end: Optional[datetime] = None) -> tuple[float, datetime]:
+        """Highest BAC reached up to `end` (default: ever), and when.
+
+        Between drinks X is concave, so each interval's maximum is where the
+        absorption rate falls to the elimination rate, clipped to the interval.
+        """
+        n = self._dose.size
+        limit = math.inf if end is None else self.hours(end)
+        if not n or limit <= 0:
+            return 0.0, self.origin
+
+        k = np.arange(n)
+        lo = self.drink_hours
+        hi = np.minimum(np.append(self.drink_hours[1:], math.inf), limit)
+        rate = np.maximum(ABSORPTION_RATE * self._pending / ELIMINATION_RATE, 1.0)
+        crest = np.clip(lo + np.log(rate) / ABSORPTION_RATE, lo, hi)
+        candidates = np.concatenate([crest, hi[np.isfinite(hi)]])
+        owners = np.concatenate([k, k[np.isfinite(hi)]])
+        values = np.maximum(self._excess(candidates, owners) - self._floor[owners], 0.0)
+
+        best = int(np.argmax(values))
+        return round(float(values[best]), 4), self.time_at(candidates[best])
@@ -0,0 +1,85 @@
+from typing import Optional
+
+from postgrest.exceptions import APIError
+
+from db import db
+
+# Raised by the RPCs when the session is missing or inactive
+NO_DATA_FOUND = "P0002"
+
+
+async def record_drink(
+    user_id: str,
+    session_id: str,
+    drink_type: str,
+    quantity: float,
+    standard_drinks: float,
+) -> Optional[dict]:
+    """Log a drink through the log_drink RPC (see sql/006_log_drink_projection_inputs.sql).
+
+    Returns None when the user has no such active session.
+    """
+    try:
+        result = await db.rpc(
+            "log_drink",
+            {
+                "p_user_id": user_id,
+                "p_session_id": session_id,
+                "p_drink_type": drink_type,
+                "p_quantity": quantity,
+                "p_standard_drinks": standard_drinks,
+            },
+        ).execute()
+    except APIError as e:
+        if e.code == NO_DATA_FOUND:
+            return None
+        raise
+    return result.data
+
+
+async def record_drinks(user_id: str, session_id: str, drinks: list[dict]) -> Optional[dict]:
+    """Log a batch of queued drinks through the log_drinks RPC (see
+    sql/007_log_drinks_batch.sql).
+
+    Each drink is {client_id, drink_type, quantity, standard_drinks,
+    logged_at}; drinks whose client_id is already logged are skipped.
+    Returns None when the user has no such active session.
+    """
+    try:
+        result = await db.rpc(
+            "log_drinks",
+            {"p_user_id": user_id, "p_session_id": session_id, "p_drinks": drinks},
+        ).execute()
+    except APIError as e:
+        if e.code == NO_DATA_FOUND:
+            return None
+        raise
+    return result.data
+
+
+async def raise_peak_bac(session_id: str, peak_bac: float):
+    """Store peak_bac if it is higher than the recorded one."""
+    await (
+        db.table("drink_sessions")
+        .update({"peak_bac": peak_bac})
+        .eq("id", session_id)
+        .or_(f"peak_bac.is.null,peak_bac.lt.{peak_bac}")
+        .execute()
+    )
+
+
+async def complete_session(user_id: str, session_id: str) -> Optional[dict]:
+    """End a session and bump the completed-session counter in one RPC.
+
+    Returns {"session", "completed_sessions"}; completed_sessions is None when
+    the session was already completed. Returns None for an unknown session.
+    """
+    try:
+        result = await db.rpc(
+            "complete_session", {"p_user_id": user_id, "p_session_id": session_id}
+        ).execute()
+    except APIError as e:
+        if e.code == NO_DATA_FOUND:
+            return None
+        raise
+    return result.data
@@ -0,0 +1,237 @@
+"""Per-process index of accepted friendships, for visibility decisions.
+
+Deciding who sees a user's drinks used to take an `or` query over
+friendships plus a night_privacy_overrides lookup on every alert. The graph
+keeps the accepted friendships in memory instead, with each edge's
+can_see_drinks flag and the per-session overrides, so that decision is a
+lookup.
+
+User ids are interned to small ints. Each user's edges sit in three packed
+arrays (friend index, visibility byte, 16-byte friendship id), so an edge
+costs about 2 x 21 bytes plus the amortized array overhead; see
+benchmarks/bench_friend_graph.py.
+
+The routes in routers/social.py update the graph as they write. It is
+rebuilt from storage at startup and again every FRIEND_GRAPH_REFRESH
+seconds, because the web client also writes friendships straight to
+Supabase. Until the first build finishes, `ready` is False and callers
+fall back to querying.
+"""
+import asyncio
+import uuid
+from array import array
+from typing import Optional
+
+from db import db
+
+REBUILD_PAGE_SIZE = 1000
+
+
+class _Edges:
+    __slots__ = ("friends", "visible", "ids")
+
+    def __init__(self):
+        self.friends = array("i")
+        self.visible = bytearray()
+        self.ids = bytearray()  # friendship ids, 16 bytes each
+
+    def find(self, friend: int) -> int:
+        try:
+            return self.friends.index(friend)
+        except ValueError:
+            return -1
+
+    def set(self, friend: int, visible: bool, friendship_id: bytes):
+        i = self.find(friend)
+        if i < 0:
+            self.friends.append(friend)
+            self.visible.append(visible)
+            self.ids += friendship_id
+        else:
+            self.visible[i] = visible
+            self.ids[16 * i:16 * i + 16] = friendship_id
+
+    def remove(self, friend: int):
+        i = self.find(friend)
+        if i >= 0:
+            del self.friends[i]
+            del self.visible[i]
+            del self.ids[16 * i:16 * i + 16]
+
+    def nbytes(self) -> int:
+        return (
+            self.friends.buffer_info()[1] * self.friends.itemsize
+            + len(self.visible)
+            + len(self.ids)
+        )
+
+
+class FriendGraph:
+    def __init__(self):
+        self.ready = False
+        self._index: dict[str, int] = {}
+        self._users: list[str] = []
+        self._edges: list[Optional[_Edges]] = []
+        # session_id -> {friend index: can_see} from night_privacy_overrides
+        self._overrides: dict[str, dict[int, bool]] = {}
+        # Writes seen while a rebuild is reading, re-applied to its result
+        self._replay: Optional[list[tuple]] = None
+        self._rebuilding = asyncio.Lock()
+
+    def _intern(self, user_id: str) -> int:
+        i = self._index.get(user_id)
+        if i is None:
+            i = self._index[user_id] = len(self._users)
+            self._users.append(user_id)
+            self._edges.append(None)
+        return i
+
+    def _edges_of(self, i: int) -> _Edges:
+        edges = self._edges[i]
+        if edges is None:
+            edges = self._edges[i] = _Edges()
+        return edges
+
+    # -- writes ------------------------------------------------------------
+
+    def apply(self, friendship: dict):
+        """Reflect a friendships row as written (accepted, blocked, privacy toggled)."""
+        if self._replay is not None:
+            self._replay.append(("apply", friendship))
+        a = self._intern(friendship["requester_id"])
+        b = self._intern(friendship["addressee_id"])
+        if friendship.get("status") != "accepted":
+            self._edges_of(a).remove(b)
+            self._edges_of(b).remove(a)
+            return
+        visible = bool(friendship.get("can_see_drinks", True))
+        edge_id = uuid.UUID(friendship["id"]).bytes
+        self._edges_of(a).set(b, visible, edge_id)
+        self._edges_of(b).set(a, visible, edge_id)
+
+    def set_override(self, session_id: str, friend_id: str, can_see: bool):
+        if self._replay is not None:
+            self._replay.append(("set_override", session_id, friend_id, can_see))
+        self._overrides.setdefault(session_id, {})[self._intern(friend_id)] = can_see
+
+    def forget_session(self, session_id: str):
+        """Drop a finished session's overrides; they only matter while it's active."""
+        if self._replay is not None:
+            self._replay.append(("forget_session", session_id))
+        self._overrides.pop(session_id, None)
+
+    # -- reads -------------------------------------------------------------
+
+    def friends(self, user_id: str) -> list[tuple[str, str, bool]]:
+        """(friend_id, friendship_id, can_see_drinks) for each accepted friend."""
+        i = self._index.get(user_id)
+        edges = self._edges[i] if i is not None else None
+        if edges is None:
+            return []
+        users, ids = self._users, edges.ids
+        return [
+            (users[f], str(uuid.UUID(bytes=bytes(ids[16 * k:16 * k + 16]))), bool(edges.visible[k]))
+            for k, f in enumerate(edges.friends)
+        ]
+
+    def friend_ids(self, user_id: str) -> list[str]:
+        i = self._index.get(user_id)
+        edges = self._edges[i] if i is not None else None
+        return [self._users[f] for f in edges.friends] if edges is not None else []
+
+    def drink_viewers(self, user_id: str, session_id: str) -> list[str]:
+        """Friends allowed to see this session's drinks: can_see_drinks, unless overridden off."""
+        i = self._index.get(user_id)
+        edges = self._edges[i] if i is not None else None
+        if edges is None:
+            return []
+        overrides = self._overrides.get(session_id, {})
+        return [
+            self._users[f]
+            for f, visible in zip(edges.friends, edges.visible)
+            if visible and overrides.get(f, True)
+        ]
+
+    def can_see_drinks(self, viewer_id: str, user_id: str, session_id: Optional[str]) -> bool:
+        """Whether viewer_id is among drink_viewers(user_id, session_id)."""
+        i, j = self._index.get(user_id), self._index.get(viewer_id)
+        edges = self._edges[i] if i is not None else None
+        if edges is None or j is None:
+            return False
+        k = edges.find(j)
+        return k >= 0 and bool(edges.visible[k]) and self._overrides.get(session_id, {}).get(j, True)
+
+    # -- rebuild -----------------------------------------------------------
+
+    async def rebuild(self) -> int:
+        """Reload accepted friendships and active sessions' overrides; returns the edge count."""
+        async with self._rebuilding:
+            return await self._rebuild()
+
+    async def _rebuild(self) -> int:
+        fresh = FriendGraph()
+        self._replay = []
+        try:
+            after = None
+            while True:
+                query = (
+                    db.table("friendships")
+                    .select("id, requester_id, addressee_id, status, can_see_drinks")
+                    .eq("status", "accepted")
+                )
+                if after:
+                    query = query.gt("id", after)
+                page = (await query.order("id").limit(REBUILD_PAGE_SIZE).execute()).data or []
+                # PostgREST caps each read at max-rows, so a short page isn't necessarily the last
+                if not page:
+                    break
+                for row in page:
+                    fresh.apply(row)
+                after = page[-1]["id"]
+
+            # Overrides only matter while their session is active (ending one
+            # forgets them), so read them embedded in the active sessions,
+            # paged by session id
+            after = None
+            while True:
+                query = (
+                    db.table("drink_sessions")
+                    .select("id, user_id, night_privacy_overrides(user_id, friend_id, can_see)")
+                    .eq("is_active", True)
+                )
+                if after:
+                    query = query.gt("id", after)
+                page = (await query.order("id").limit(REBUILD_PAGE_SIZE).execute()).data or []
+                if not page:
+                    break
+                for session in page:
+                    for row in session["night_privacy_overrides"] or []:
+                        # Only the session's owner decides who sees it
+                        if row["user_id"] == session["user_id"]:
+                            fresh.set_override(session["id"], row["friend_id"], row["can_see"])
+                after = page[-1]["id"]
+
+            for op, *args in self._replay:
+                getattr(fresh, op)(*args)
+        finally:
+            self._replay = None
+
+        self._index, self._users, self._edges = fresh._index, fresh._users, fresh._edges
+        self._overrides = fresh._overrides
+        self.ready = True
+        return self.edge_count()
+
+    def edge_count(self) -> int:
+        return sum(len(e.friends) for e in self._edges if e is not None) // 2
+
+    def stats(self) -> dict:
+        return {
+            "ready": int(self.ready),
+            "users": len(self._users),
+            "edges": self.edge_count(),
+            "override_sessions": len(self._overrides),
+            "edge_bytes": sum(e.nbytes() for e in self._edges if e is not None),
+        }
+
+
+friend_graph = FriendGraph()
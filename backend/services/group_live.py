@@ -0,0 +1,176 @@
+"""Live state of a friend group: who is out, their BAC and limit level.
+
+A group's state is built once per GROUP_LIVE_TTL and shared by every member
+reading it (live_reads): the member list (services.groups), their active
+sessions and their profiles are read in one batch, and BAC and limit levels
+are computed from those. What each viewer may see is decided per request,
+from the friend graph while it is ready. Before that, the build also reads
+the friendships among the members and the sessions' night privacy
+overrides, so the per-viewer step never queries.
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+from config import GROUP_LIVE_TTL
+from db import db
+from services.bac_calculator import calculate_bac
+from services.friend_graph import friend_graph
+from services.groups import group_members
+from services.limit_engine import limit_level
+from services.profile_cache import profiles, store_profile
+from services.session_store import session_store
+from services.singleflight import SingleFlight
+
+# group_id -> the group's live state, viewer independent
+live_reads = SingleFlight(ttl=GROUP_LIVE_TTL)
+
+
+async def group_live(group_id: str) -> Optional[dict]:
+    """The group's shared live state, or None if there is no such group."""
+    return await live_reads.do(group_id, lambda: _build(group_id))
+
+
+def invalidate_group_live(group_id: str):
+    live_reads.forget(group_id)
+
+
+def visible_members(live: dict, viewer_id: str) -> list[dict]:
+    """The members whose drinks viewer_id may see (always including themselves)."""
+    viewers = live["viewers"]
+    visible = []
+    for member in live["members"]:
+        session_id = member["session"]["id"] if member["session"] else None
+        if member["id"] == viewer_id:
+            allowed = True
+        elif viewers is None:
+            allowed = friend_graph.can_see_drinks(viewer_id, member["id"], session_id)
+        else:
+            allowed = viewer_id in viewers.get(member["id"], ())
+        if allowed:
+            visible.append(member)
+    return visible
+
+
+async def _build(group_id: str) -> Optional[dict]:
+    group, members = await asyncio.gather(
+        db.table("friend_groups")
+        .select("id, name, creator_id")
+        .eq("id", group_id)
+        .maybe_single()
+        .execute(),
+        group_members(group_id),
+    )
+    if not group or not group.data:
+        return None
+
+    member_ids = [m["user_id"] for m in members]
+    sessions, found = await asyncio.gather(_active_sessions(member_ids), _profiles(member_ids))
+
+    now = datetime.now(timezone.utc)
+    out = []
+    for m in members:
+        user_id = m["user_id"]
+        session, profile = sessions.get(user_id), found.get(user_id)
+        state = None
+        if session and profile:
+            total = float(session["total_standard_drinks"] or 0)
+            started_at = datetime.fromisoformat(session["started_at"])
+            state = {
+                "id": session["id"],
+                "started_at": session["started_at"],
+                "total_standard_drinks": total,
+                "current_bac": calculate_bac(
+                    total,
+                    profile["weight_lbs"],
+                    profile["biological_gender"],
+                    (now - started_at).total_seconds() / 3600,
+                ),
+                "peak_bac": session["peak_bac"],
+                "limit_level": limit_level(total, profile),
+            }
+        out.append(
+            {
+                "id": user_id,
+                "display_name": (m.get("profiles") or {}).get("display_name"),
+                "has_active_session": user_id in sessions,
+                "session": state,
+            }
+        )
+
+    viewers = None
+    if not friend_graph.ready:
+        viewers = await _viewers(member_ids + [group.data["creator_id"]], sessions)
+    return {"group": group.data, "as_of": now.isoformat(), "members": out, "viewers": viewers}
+
+
+async def _active_sessions(user_ids: list[str]) -> dict[str, dict]:
+    if session_store.ready:
+        rows = [s.row() for s in map(session_store.get, user_ids) if s is not None]
+    elif user_ids:
+        result = await (
+            db.table("drink_sessions")
+            .select("id, user_id, started_at, total_standard_drinks, peak_bac")
+            .in_("user_id", user_ids)
+            .eq("is_active", True)
+            .execute()
+        )
+        rows = result.data or []
+    else:
+        rows = []
+    return {s["user_id"]: s for s in rows}
+
+
+async def _profiles(user_ids: list[str]) -> dict[str, dict]:
+    """Profiles from the shared cache, with the misses read in one query."""
+    found = {}
+    for user_id in user_ids:
+        profile = profiles.get(user_id)
+        if profile is not None:
+            found[user_id] = profile
+    missing = [u for u in user_ids if u not in found]
+    if missing:
+        result = await db.table("profiles").select("*").in_("id", missing).execute()
+        for profile in result.data or []:
+            store_profile(profile)
+            found[profile["id"]] = profile
+    return found
+
+
+async def _viewers(user_ids: list[str], sessions: dict[str, dict]) -> dict[str, set[str]]:
+    """member id -> the other group users who may see their drinks, read from storage."""
+    ids = list(dict.fromkeys(user_ids))
+    queries = [
+        db.table("friendships")
+        .select("requester_id, addressee_id, can_see_drinks")
+        .in_("requester_id", ids)
+        .in_("addressee_id", ids)
+        .eq("status", "accepted")
+    ]
+    if sessions:
+        # Overrides only apply to the session they were set for
+        queries.append(
+            db.table("night_privacy_overrides")
+            .select("session_id, user_id, friend_id")
+            .in_("session_id", [s["id"] for s in sessions.values()])
+            .eq("can_see", False)
+        )
+    friendships, *overrides = await db.gather(*queries)
+    # Only the session's owner may hide it
+    hidden = {
+        (o["user_id"], o["friend_id"])
+        for r in overrides
+        for o in r.data or []
+        if o["user_id"] in sessions and sessions[o["user_id"]]["id"] == o["session_id"]
+    }
+
+    viewers: dict[str, set[str]] = {}
+    for f in friendships.data or []:
+        if not f["can_see_drinks"]:
+            continue
+        a, b = f["requester_id"], f["addressee_id"]
+        if (a, b) not in hidden:
+            viewers.setdefault(a, set()).add(b)
+        if (b, a) not in hidden:
+            viewers.setdefault(b, set()).add(a)
+    return viewers
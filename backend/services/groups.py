@@ -0,0 +1,26 @@
+"""Shared reads of friend-group membership."""
+from config import GROUP_CACHE_TTL
+from db import db
+from services.singleflight import SingleFlight
+
+# group_id -> member rows; every member of a group reads the same list
+group_reads = SingleFlight(ttl=GROUP_CACHE_TTL)
+
+
+async def _fetch_members(group_id: str) -> list[dict]:
+    result = await (
+        db.table("friend_group_members")
+        .select("user_id, profiles:profiles!friend_group_members_user_id_fkey(id, display_name, completed_sessions)")
+        .eq("group_id", group_id)
+        .execute()
+    )
+    return result.data or []
+
+
+async def group_members(group_id: str) -> list[dict]:
+    """Member rows with their embedded profile, shared by concurrent readers."""
+    return await group_reads.do(group_id, lambda: _fetch_members(group_id))
+
+
+def invalidate_group_members(group_id: str):
+    group_reads.forget(group_id)
@@ -0,0 +1,107 @@
+"""Scheduled sweeps: closing abandoned sessions and refreshing counters.
+
+Run by services/scheduler.py under a lease, so one instance does each sweep.
+They work in bulk statements (sql/010_session_housekeeping.sql,
+sql/003_completed_sessions.sql and sql/011_alert_inbox.sql) rather than
+per-row requests.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from config import STALE_SESSION_MINUTES, STALE_SWEEP_BATCH
+from db import db
+from services.alert_service import publish_presence
+from services.bac_calculator import peak_bac
+from services.friend_graph import friend_graph
+from services.leaderboard_index import leaderboards
+from services.profile_cache import invalidate_profile, profiles
+from services.session_store import ActiveSession, session_store
+
+
+def final_peaks(sessions: list[dict]) -> list[dict]:
+    """{id, peak_bac} for closed sessions whose drinks peak above the stored peak."""
+    rows = []
+    for s in sessions:
+        if not s["drinks"] or not s.get("weight_lbs"):
+            continue
+        started_at = datetime.fromisoformat(s["started_at"])
+        peak = peak_bac(s["drinks"], s["weight_lbs"], s["biological_gender"], started_at)
+        if peak > (s.get("peak_bac") or 0):
+            rows.append({"id": s["session_id"], "peak_bac": peak})
+    return rows
+
+
+async def close_stale_sessions() -> int:
+    """Complete every session idle for STALE_SESSION_MINUTES; returns how many."""
+    # Untrack the sessions idle in memory, so no drink is queued against one
+    # while it closes; those the database keeps open are tracked again
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=STALE_SESSION_MINUTES)
+    closing = session_store.take_idle(cutoff) if session_store.ready else {}
+    try:
+        return await _close_stale_sessions(closing)
+    finally:
+        for session in closing.values():
+            session_store.restore(session)
+
+
+async def _close_stale_sessions(closing: dict[str, ActiveSession]) -> int:
+    closed = 0
+    while True:
+        # The sweep judges idleness by stored logs, so store queued ones first
+        if session_store.ready:
+            await session_store.flush()
+        result = await db.rpc(
+            "close_stale_sessions",
+            {"p_idle_minutes": STALE_SESSION_MINUTES, "p_limit": STALE_SWEEP_BATCH},
+        ).execute()
+        sessions = result.data or []
+        if not sessions:
+            break
+
+        peaks = final_peaks(sessions)
+        if peaks:
+            await db.rpc("finalize_peak_bac", {"p_rows": peaks}).execute()
+
+        for s in sessions:
+            leaderboards.record_completed(s["user_id"], s["completed_sessions"])
+            invalidate_profile(s["user_id"])
+            friend_graph.forget_session(s["session_id"])
+            closing.pop(s["session_id"], None)
+            session_store.discard(s["user_id"], s["session_id"])
+        await asyncio.gather(
+            *(publish_presence(s["user_id"], False) for s in sessions), return_exceptions=True
+        )
+
+        closed += len(sessions)
+        if len(sessions) < STALE_SWEEP_BATCH:
+            break
+    return closed
+
+
+async def refresh_leaderboard_counters() -> Optional[int]:
+    """Recount completed_sessions server-side; returns how many drifted."""
+    result = await db.rpc("rebuild_completed_sessions", {}).execute()
+    if result.data:
+        leaderboards.clear()
+        profiles.clear()
+    return result.data
+
+
+async def recount_unread_alerts() -> Optional[int]:
+    """Recount every unread-alert counter server-side; returns how many drifted."""
+    result = await db.rpc("rebuild_unread_alerts", {}).execute()
+    if result.data:
+        profiles.clear()
+    return result.data
+
+
+async def reload_leaderboards() -> int:
+    """Drop this process's boards so they reload from the counters.
+
+    Runs on every instance (no lease): sessions closed or recounted by
+    another instance only reach the counters in the database.
+    """
+    loaded = len(leaderboards.universities) + len(leaderboards.groups)
+    leaderboards.clear()
+    return loaded
@@ -0,0 +1,214 @@
+"""In-process university and group leaderboards.
+
+Boards are built on first read from the per-user completed_sessions counter
+(sql/003_completed_sessions.sql) and then kept current by end_session,
+update_profile and add_group_member, so a read never touches drink_sessions
+and costs O(K) in the number of rows returned. The counters in profiles stay
+the source of truth; boards are per process and can be dropped at any time.
+Concurrent first reads of one board share a single load (board_loads).
+University boards exist only for names in the university list
+(services/university_index.py), so clients can't grow the index with
+arbitrary names.
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Optional
+
+from db import db
+from services.groups import group_members
+from services.singleflight import SingleFlight
+
+# Profiles read per request while loading a university board
+LOAD_PAGE_SIZE = 1000
+
+# ("university" | "group", key) -> the board being built; no TTL, since a
+# loaded board stays in the index
+board_loads = SingleFlight()
+
+
+class Leaderboard:
+    """Users ranked by completed sessions, highest first.
+
+    Rank keys (-sessions, user_id) are kept in a sorted list, which doubles as
+    an order-statistics index: a user's rank and the start of any page are a
+    bisect (O(log n)) and the page itself a slice. An update is a bisect plus
+    a list insert and delete, which shift the entries after it, so it costs
+    O(n): a memmove of about 10 us at 10k entries and 40 us at 100k. That is
+    cheap next to the request that causes it (a session ending) at campus
+    sizes; a much larger board would want a balanced tree instead.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, tuple[int, str]] = {}
+        self._keys: list[tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._entries
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def set(self, user_id: str, display_name: str, sessions: int):
+        self.remove(user_id)
+        self._entries[user_id] = (sessions, display_name)
+        insort(self._keys, (-sessions, user_id))
+
+    def remove(self, user_id: str):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            del self._keys[bisect_left(self._keys, (-entry[0], user_id))]
+
+    def get(self, user_id: str) -> Optional[tuple[int, str]]:
+        return self._entries.get(user_id)
+
+    def top(self, k: Optional[int] = None) -> list[dict]:
+        return self._rows(self._keys[:k])
+
+    def page(self, after: Optional[tuple[int, str]], limit: int) -> tuple[list[dict], Optional[tuple[int, str]]]:
+        """Entries ranked after the (sessions, user_id) cursor key, and the next key."""
+        start = bisect_right(self._keys, (-after[0], after[1])) if after else 0
+        keys = self._keys[start:start + limit]
+        more = start + limit < len(self._keys)
+        return self._rows(keys), ((-keys[-1][0], keys[-1][1]) if more else None)
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-based rank; users with the same session count share a rank."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        return bisect_left(self._keys, (-entry[0], "")) + 1
+
+    def _rows(self, keys: list[tuple[int, str]]) -> list[dict]:
+        return [
+            {"id": user_id, "display_name": self._entries[user_id][1], "sessions": -neg}
+            for neg, user_id in keys
+        ]
+
+
+class LeaderboardIndex:
+    def __init__(self):
+        self.universities: dict[str, Leaderboard] = {}
+        self.groups: dict[str, Leaderboard] = {}
+        # user_id -> boards the user appears on, as (kind, key)
+        self._boards_by_user: dict[str, set[tuple[str, str]]] = {}
+
+    def _board(self, kind: str, key: str) -> Optional[Leaderboard]:
+        return (self.universities if kind == "university" else self.groups).get(key)
+
+    def _place(self, kind: str, key: str, board: Leaderboard, user_id: str, name: str, sessions: int):
+        board.set(user_id, name, sessions)
+        self._boards_by_user.setdefault(user_id, set()).add((kind, key))
+
+    def _unplace(self, kind: str, key: str, board: Leaderboard, user_id: str):
+        board.remove(user_id)
+        boards = self._boards_by_user.get(user_id)
+        if boards:
+            boards.discard((kind, key))
+            if not boards:
+                del self._boards_by_user[user_id]
+
+    def _drop(self, kind: str, key: str):
+        board = (self.universities if kind == "university" else self.groups).pop(key, None)
+        if board is not None:
+            for user_id in board:
+                self._unplace(kind, key, board, user_id)
+
+    async def university(self, name: str) -> Optional[Leaderboard]:
+        """The board for a university in the list, by any spelling canonical() accepts; None otherwise."""
+        from services.university_index import get_index  # NumPy; kept off the import path
+
+        name = get_index().canonical(name)
+        if name is None:
+            return None
+        board = self.universities.get(name)
+        if board is None:
+            board = await board_loads.do(("university", name), lambda: self._load_university(name))
+        return board
+
+    async def _load_university(self, name: str) -> Leaderboard:
+        # Keyset pages by id until one comes back empty; PostgREST caps each
+        # read at max-rows, so a short page isn't necessarily the last
+        profiles, after = [], None
+        while True:
+            query = (
+                db.table("profiles")
+                .select("id, display_name, completed_sessions")
+                .eq("university_name", name)
+                .eq("show_on_leaderboard", True)
+            )
+            if after:
+                query = query.gt("id", after)
+            page = (await query.order("id").limit(LOAD_PAGE_SIZE).execute()).data or []
+            if not page:
+                break
+            profiles.extend(page)
+            after = page[-1]["id"]
+
+        self._drop("university", name)
+        board = self.universities[name] = Leaderboard()
+        for p in profiles:
+            self._place(
+                "university", name, board,
+                p["id"], p["display_name"], p.get("completed_sessions") or 0,
+            )
+        return board
+
+    async def group(self, group_id: str) -> Leaderboard:
+        board = self.groups.get(group_id)
+        if board is None:
+            board = await board_loads.do(("group", group_id), lambda: self._load_group(group_id))
+        return board
+
+    async def _load_group(self, group_id: str) -> Leaderboard:
+        members = await group_members(group_id)
+        self._drop("group", group_id)
+        board = self.groups[group_id] = Leaderboard()
+        for m in members:
+            profile = m.get("profiles") or {}
+            self._place(
+                "group", group_id, board,
+                m["user_id"],
+                profile.get("display_name") or "Unknown",
+                profile.get("completed_sessions") or 0,
+            )
+        return board
+
+    def record_completed(self, user_id: str, sessions: int):
+        """Apply a user's new completed-session count to every loaded board."""
+        for kind, key in self._boards_by_user.get(user_id, ()):
+            board = self._board(kind, key)
+            _, name = board.get(user_id)
+            board.set(user_id, name, sessions)
+
+    def update_profile(self, profile: dict):
+        """Re-place a user after a profile write (name, university, opt-in)."""
+        user_id = profile["id"]
+        name = profile.get("display_name")
+        sessions = profile.get("completed_sessions") or 0
+        university = profile.get("university_name") if profile.get("show_on_leaderboard") else None
+
+        for kind, key in list(self._boards_by_user.get(user_id, ())):
+            board = self._board(kind, key)
+            if kind == "university" and key != university:
+                self._unplace(kind, key, board, user_id)
+            else:
+                self._place(kind, key, board, user_id, name, sessions)
+
+        board = self.universities.get(university) if university else None
+        if board is not None and user_id not in board:
+            self._place("university", university, board, user_id, name, sessions)
+
+    def invalidate_group(self, group_id: str):
+        """Forget a group board so its membership is reloaded on next read."""
+        board_loads.forget(("group", group_id))
+        self._drop("group", group_id)
+
+    def clear(self):
+        self.universities.clear()
+        self.groups.clear()
+        self._boards_by_user.clear()
+
+
+leaderboards = LeaderboardIndex()
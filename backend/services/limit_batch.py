@@ -0,0 +1,53 @@
+"""Array versions of calculate_limits and adjust_limits_from_calibration.
+
+Used by scripts/recompute_limits.py to re-derive calibrated limits for many
+profiles at once. Each function mirrors its scalar counterpart exactly
+(same operations in the same order), so a bulk run stores the same limits
+current_limits would compute one profile at a time.
+"""
+import numpy as np
+
+from services.bac_calculator import (
+    ELIMINATION_RATE,
+    GENDER_RATIO,
+    LBS_TO_GRAMS,
+    LIMIT_BAC_TARGETS,
+    STANDARD_DRINK_GRAMS,
+)
+
+
+def gender_ratios(genders) -> np.ndarray:
+    return np.array([GENDER_RATIO.get(g, 0.68) for g in genders], dtype=np.float64)
+
+
+def base_limits(weight_lbs: np.ndarray, ratios: np.ndarray, hours_elapsed: float = 1) -> dict:
+    """calculate_limits over arrays: level -> int array of drinks."""
+    body_weight_grams = weight_lbs.astype(np.float64) * LBS_TO_GRAMS
+    limits = {}
+    for level, target in LIMIT_BAC_TARGETS.items():
+        alcohol_grams = (target + ELIMINATION_RATE * hours_elapsed) / 100 * body_weight_grams * ratios
+        limits[level] = np.maximum(1, np.round(alcohol_grams / STANDARD_DRINK_GRAMS)).astype(np.int64)
+    return limits
+
+
+def calibration_adjustments(
+    sessions: np.ndarray, handle_more: np.ndarray, feeling_total: np.ndarray
+) -> np.ndarray:
+    """The -1/0/+1 adjustment per profile from its calibration aggregates.
+
+    Profiles with fewer than three calibration sessions get 0, as in
+    adjust_limits_from_calibration.
+    """
+    avg_feeling = feeling_total / np.maximum(sessions, 1)
+    up = (handle_more >= 2) & (avg_feeling >= 3)
+    down = ~up & (handle_more == 0) & (avg_feeling <= 2)
+    adjustment = up.astype(np.int64) - down.astype(np.int64)
+    return np.where(sessions >= 3, adjustment, 0)
+
+
+def calibrated_limits(base: dict, adjustment: np.ndarray) -> dict:
+    return {
+        "low": np.maximum(1, base["low"] + adjustment),
+        "med": np.maximum(2, base["med"] + adjustment),
+        "high": np.minimum(base["high"] + adjustment, base["high"]),
+    }
@@ -1,13 +1,19 @@
-from config import supabase
+from typing import Optional
+from db import db
 from services.bac_calculator import calculate_limits
+from services.profile_cache import store_profile
 
+# Bump when calculate_limits or the calibration adjustment changes, so stored
+# calibrated limits are recomputed on their next read
+LIMITS_FORMULA_VERSION = 2
 
-def adjust_limits_from_calibration(user_id: str, weight_lbs: int, gender: str) -> dict:
+
+async def adjust_limits_from_calibration(user_id: str, weight_lbs: int, gender: str) -> dict:
     """After 3 calibration sessions, adjust limits based on feedback."""
     base_limits = calculate_limits(weight_lbs, gender)
 
-    result = (
-        supabase.table("calibration_sessions")
+    result = await (
+        db.table("calibration_sessions")
         .select("*")
         .eq("user_id", user_id)
         .order("session_number")
@@ -32,3 +38,60 @@ def adjust_limits_from_calibration(user_id: str, weight_lbs: int, gender: str) -
         "med": max(2, base_limits["med"] + adjustment),
         "high": min(base_limits["high"] + adjustment, base_limits["high"]),
     }
+
+
+def limits_version(weight_lbs: int, gender: str) -> str:
+    """Stamp for limits derived from calibration with this formula and these inputs."""
+    return f"{LIMITS_FORMULA_VERSION}:{weight_lbs}:{gender}"
+
+
+async def current_limits(profile: dict) -> dict:
+    """The profile's limits, re-deriving calibrated limits only when stale.
+
+    The calculated_*_limit columns are the source of truth. Calibrated limits
+    are recomputed (and saved) only when their limits_version stamp no longer
+    matches the formula version, weight or gender; before calibration is
+    complete the stored values are returned as they are.
+    """
+    limits = {
+        "low": profile.get("calculated_low_limit"),
+        "med": profile.get("calculated_med_limit"),
+        "high": profile.get("calculated_high_limit"),
+    }
+    if profile.get("calibration_count", 0) < 3:
+        return limits
+
+    version = limits_version(profile["weight_lbs"], profile["biological_gender"])
+    if profile.get("limits_version") == version:
+        return limits
+
+    limits = await adjust_limits_from_calibration(
+        profile["id"], profile["weight_lbs"], profile["biological_gender"]
+    )
+    result = await (
+        db.table("profiles")
+        .update(
+            {
+                "calculated_low_limit": limits["low"],
+                "calculated_med_limit": limits["med"],
+                "calculated_high_limit": limits["high"],
+                "limits_version": version,
+            }
+        )
+        .eq("id", profile["id"])
+        .execute()
+    )
+    if result.data:
+        store_profile(result.data[0])
+    return limits
+
+
+def limit_level(total_standard_drinks: float, profile: dict) -> Optional[str]:
+    """The alert level ('high' or 'medium') a session total has reached, if any."""
+    high_limit = profile.get("calculated_high_limit") or 0
+    med_limit = profile.get("calculated_med_limit") or 0
+    if high_limit and total_standard_drinks >= high_limit:
+        return "high"
+    if med_limit and total_standard_drinks >= med_limit:
+        return "medium"
+    return None
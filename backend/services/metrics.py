@@ -0,0 +1,255 @@
+"""Request and upstream metrics in the Prometheus text format.
+
+Counters and fixed-bucket histograms live in process memory and are rendered
+on scrape, so recording a sample is a dict lookup and a bisect. Requests are
+labelled by route template (``/api/drinks/sessions/{session_id}``), never the
+raw path, to keep the series count bounded. Every PostgREST call goes through
+:class:`InstrumentedTransport`, which times it by table and operation and adds
+it to the current request's tally (a contextvar), so each request also
+reports how many round trips it made and how long it waited on them.
+"""
+import bisect
+import contextvars
+import logging
+import time
+from typing import Callable, Optional
+
+import httpx
+
+from config import SLOW_REQUEST_MS
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names: tuple, values: tuple) -> str:
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+class Counter:
+    __slots__ = ("name", "help", "labelnames", "_values")
+
+    def __init__(self, name: str, help: str, labelnames: tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{{{_label_text(self.labelnames, labels)}}} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram; per label set, counts per bucket plus the sum."""
+
+    __slots__ = ("name", "help", "labelnames", "buckets", "_series")
+
+    def __init__(self, name: str, help: str, labelnames: tuple, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            base = _label_text(self.labelnames, labels)
+            sep = "," if base else ""
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if isinstance(bound, str) else f"{bound:g}"
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+request_duration = Histogram(
+    "buzzboard_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+request_upstream_calls = Histogram(
+    "buzzboard_request_upstream_calls",
+    "PostgREST round trips made while serving one request.",
+    ("method", "route"),
+    ROUND_TRIP_BUCKETS,
+)
+request_upstream_seconds = Counter(
+    "buzzboard_request_upstream_seconds_total",
+    "Time requests spent waiting on PostgREST, by route.",
+    ("method", "route"),
+)
+upstream_duration = Histogram(
+    "buzzboard_upstream_duration_seconds",
+    "PostgREST call latency up to the response headers, by table (or RPC) and operation.",
+    ("table", "op"),
+    LATENCY_BUCKETS,
+)
+upstream_requests = Counter(
+    "buzzboard_upstream_requests_total",
+    "PostgREST calls by table (or RPC), operation and HTTP status ('error' if none).",
+    ("table", "op", "status"),
+)
+
+_METRICS = (
+    request_duration,
+    request_upstream_calls,
+    request_upstream_seconds,
+    upstream_duration,
+    upstream_requests,
+)
+
+# name prefix, constant labels, stats() callable; see collect()
+_collectors: list[tuple[str, dict, Callable[[], dict]]] = []
+
+
+def collect(prefix: str, stats: Callable[[], dict], **labels):
+    """Export every numeric field of `stats()` as a gauge `{prefix}_{field}` on scrape."""
+    _collectors.append((prefix, labels, stats))
+
+
+def render() -> str:
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    gauges: dict[str, list[str]] = {}
+    for prefix, labels, stats in _collectors:
+        label_text = f"{{{_label_text(tuple(labels), tuple(labels.values()))}}}" if labels else ""
+        for field, value in stats().items():
+            if isinstance(value, (int, float)):
+                gauges.setdefault(f"{prefix}_{field}", []).append(f"{label_text} {value}")
+    for name, samples in gauges.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{sample}" for sample in samples)
+    return "\n".join(lines) + "\n"
+
+
+class _UpstreamTally:
+    __slots__ = ("calls", "seconds")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+
+# Tally for the request being served; tasks started from it (db.gather) share it
+_tally: contextvars.ContextVar[Optional[_UpstreamTally]] = contextvars.ContextVar(
+    "upstream_tally", default=None
+)
+
+_METHOD_OPS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def _table_and_op(request: httpx.Request) -> tuple[str, str]:
+    _, _, rest = request.url.path.partition("/rest/v1/")
+    if rest.startswith("rpc/"):
+        return rest[4:], "rpc"
+    op = _METHOD_OPS.get(request.method, request.method.lower())
+    if op == "insert" and "merge-duplicates" in request.headers.get("prefer", ""):
+        op = "upsert"
+    return rest.split("/", 1)[0] or "-", op
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Times every call made through `inner` (the pooled or a mock transport)."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self._inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._inner.handle_async_request(request)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            table, op = _table_and_op(request)
+            upstream_duration.observe((table, op), elapsed)
+            upstream_requests.inc((table, op, str(status)))
+            tally = _tally.get()
+            if tally is not None:
+                tally.calls += 1
+                tally.seconds += elapsed
+
+    async def aclose(self):
+        await self._inner.aclose()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and upstream use per route.
+
+    A request is measured up to its last response byte, so work queued as a
+    background task after the response is not counted against it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        tally = _UpstreamTally()
+        token = _tally.set(tally)
+        status = None
+
+        async def send_and_record(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body"):
+                record(scope, status, time.perf_counter() - start, tally)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        except Exception:
+            if status is None:  # failed before a response was started
+                record(scope, 500, time.perf_counter() - start, tally)
+            raise
+        finally:
+            _tally.reset(token)
+
+
+def record(scope: dict, status: int, elapsed: float, tally: _UpstreamTally):
+    route = scope.get("route")
+    # Unmatched paths share one label so scanners can't grow the series count
+    path = route.path if route is not None else "unmatched"
+    method = scope["method"]
+    request_duration.observe((method, path, str(status)), elapsed)
+    request_upstream_calls.observe((method, path), tally.calls)
+    if tally.calls:
+        request_upstream_seconds.inc((method, path), tally.seconds)
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        logger.warning(
+            "slow request: %s %s -> %s in %.0f ms (%d upstream calls, %.0f ms upstream)",
+            method, path, status, elapsed * 1000, tally.calls, tally.seconds * 1000,
+        )
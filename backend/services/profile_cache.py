@@ -0,0 +1,37 @@
+"""Per-process cache of profiles rows.
+
+Weight, gender and limits rarely change during a night out, so reads go
+through a TTL/LRU cache. Writes made through this API refresh or drop the
+cached row, including the counters (completed_sessions when a session
+ends, unread_alerts when alerts arrive or are read); the TTL bounds
+staleness for writes made elsewhere, such as by another instance. Cached rows
+are shared, so callers must not mutate them.
+"""
+from typing import Optional
+
+from config import PROFILE_CACHE_SIZE, PROFILE_CACHE_TTL
+from db import db
+from services.cache import TTLCache
+
+profiles = TTLCache(maxsize=PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+
+async def get_profile(user_id: str) -> Optional[dict]:
+    profile = profiles.get(user_id)
+    if profile is None:
+        result = await (
+            db.table("profiles").select("*").eq("id", user_id).maybe_single().execute()
+        )
+        profile = result.data if result else None
+        if profile:
+            profiles.set(user_id, profile)
+    return profile
+
+
+def store_profile(profile: dict):
+    """Write-through: cache the row returned by a profiles update."""
+    profiles.set(profile["id"], profile)
+
+
+def invalidate_profile(user_id: str):
+    profiles.pop(user_id)
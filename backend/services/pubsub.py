@@ -0,0 +1,115 @@
+"""In-process pub/sub hub for pushing events to connected users.
+
+Each open stream is a Subscription with a bounded queue. Publishing never
+blocks the publisher: when a subscriber's queue is full it is cut off
+instead, and its stream ends with a `reset` event so the client reconnects
+and refetches. Memory per connection is therefore bounded by the queue
+size, and a stalled client cannot slow down anyone else.
+
+The hub is per process, like the other in-process indexes: a user
+connected to one worker only sees events published by that worker.
+"""
+import asyncio
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+from config import PUBSUB_MAX_STREAMS_PER_USER, PUBSUB_QUEUE_SIZE
+
+_CLOSED = None
+
+
+class Subscription:
+    __slots__ = ("user_id", "queue", "closed")
+
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def offer(self, event: tuple[str, dict]) -> bool:
+        """Queue an event without blocking; False if the subscriber fell behind."""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.close()
+            return False
+
+    def close(self):
+        """End the stream; the reader gets a reset once the queue drains."""
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(_CLOSED)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[tuple[str, dict]]:
+        """Next event, or None once closed. Raises TimeoutError when idle."""
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Hub:
+    def __init__(self, queue_size: int = PUBSUB_QUEUE_SIZE, max_per_user: int = PUBSUB_MAX_STREAMS_PER_USER):
+        self.queue_size = queue_size
+        self.max_per_user = max_per_user
+        # user_id -> open subscriptions, oldest first
+        self._subscribers: dict[str, list[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def is_connected(self, user_id: str) -> bool:
+        return user_id in self._subscribers
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    @contextmanager
+    def subscribe(self, user_id: str):
+        sub = Subscription(user_id, self.queue_size)
+        subs = self._subscribers.setdefault(user_id, [])
+        subs.append(sub)
+        # A user reconnecting in a loop can't pile up streams
+        while len(subs) > self.max_per_user:
+            subs.pop(0).close()
+        try:
+            yield sub
+        finally:
+            sub.close()
+            subs = self._subscribers.get(user_id)
+            if subs and sub in subs:
+                subs.remove(sub)
+                if not subs:
+                    del self._subscribers[user_id]
+
+    def publish(self, user_ids: Iterable[str], event: str, data: dict) -> int:
+        """Send an event to every open stream of each user; returns deliveries."""
+        self.published += 1
+        delivered = 0
+        for user_id in user_ids:
+            for sub in self._subscribers.get(user_id, ()):
+                if sub.offer((event, data)):
+                    delivered += 1
+                else:
+                    self.dropped += 1
+        self.delivered += delivered
+        return delivered
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._subscribers),
+            "streams": len(self),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+hub = Hub()
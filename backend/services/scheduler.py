@@ -0,0 +1,114 @@
+"""Periodic background jobs inside the API process.
+
+Each job runs in its own asyncio task, sleeping its interval with random
+jitter between runs so instances started together don't sweep in lockstep.
+Leased jobs first take a lease in the database (acquire_lease, see
+sql/010_session_housekeeping.sql): every instance wakes up, but only the
+lease holder does the work. The holder renews the lease on every run and
+another instance takes over once it lapses, after at most two intervals.
+"""
+import asyncio
+import logging
+import os
+import random
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from db import db
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    __slots__ = (
+        "name", "interval", "run", "lease",
+        "runs", "failures", "skipped", "items",
+        "total_seconds", "max_seconds", "last_seconds", "last_finished",
+    )
+
+    def __init__(self, name: str, interval: float, run: Callable[[], Awaitable[Optional[int]]], lease: bool):
+        self.name = name
+        self.interval = interval
+        self.run = run  # returns the number of items handled, if it counts them
+        self.lease = lease
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0  # another instance held the lease
+        self.items = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+        self.last_finished = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "items": self.items,
+            "last_seconds": round(self.last_seconds, 4),
+            "max_seconds": round(self.max_seconds, 4),
+            "avg_seconds": round(self.total_seconds / self.runs, 4) if self.runs else 0.0,
+            "last_finished": self.last_finished,
+        }
+
+
+class Scheduler:
+    def __init__(self, jitter: float = 0.1):
+        self.jitter = jitter
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: dict[str, Job] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def add(self, name: str, interval: float, run: Callable[[], Awaitable[Optional[int]]], lease: bool = True) -> Job:
+        job = self.jobs[name] = Job(name, interval, run, lease)
+        return job
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._loop(job)) for job in self.jobs.values()]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _loop(self, job: Job):
+        # The first run also waits, so startup isn't slowed by housekeeping
+        while True:
+            await asyncio.sleep(job.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+            await self.run_once(job)
+
+    async def run_once(self, job: Job) -> bool:
+        """Run `job` now if this instance can hold its lease; False if skipped."""
+        start = time.perf_counter()
+        try:
+            if job.lease and not await self._acquire(job):
+                job.skipped += 1
+                return False
+            items = await job.run()
+        except Exception:
+            job.failures += 1
+            logger.exception("job %s failed", job.name)
+            return True
+
+        elapsed = time.perf_counter() - start
+        job.last_finished = time.time()
+        job.runs += 1
+        job.items += items or 0
+        job.last_seconds = elapsed
+        job.total_seconds += elapsed
+        job.max_seconds = max(job.max_seconds, elapsed)
+        return True
+
+    async def _acquire(self, job: Job) -> bool:
+        result = await db.rpc(
+            "acquire_lease",
+            {"p_job": job.name, "p_holder": self.holder, "p_ttl_seconds": int(job.interval * 2)},
+        ).execute()
+        return bool(result.data)
+
+    def stats(self) -> dict:
+        return {name: job.stats() for name, job in self.jobs.items()}
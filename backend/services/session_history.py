@@ -0,0 +1,105 @@
+"""Past sessions, newest first, read one keyset page at a time.
+
+Pages are ordered by (started_at, id) descending and continue from the last
+row's key, so every page is an index range scan no matter how deep the
+history goes, and an export holds only one page in memory at a time.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from db import db
+from services.hangover_predictor import predict_hangover
+
+_COLUMNS = "id, started_at, ended_at, total_standard_drinks, peak_bac, drink_logs(drink_type, quantity)"
+
+CSV_FIELDS = [
+    "session_id", "started_at", "ended_at", "duration_hours", "drinks",
+    "peak_bac", "shots", "beers", "mixed", "hangover",
+]
+
+
+async def fetch_history_page(
+    user_id: str, after: Optional[tuple[str, str]], limit: int
+) -> list[dict]:
+    """Completed sessions ordered after the (started_at, id) key `after`."""
+    query = (
+        db.table("drink_sessions")
+        .select(_COLUMNS)
+        .eq("user_id", user_id)
+        .eq("is_active", False)
+    )
+    if after:
+        started_at, session_id = after
+        query = query.or_(
+            f'started_at.lt."{started_at}",'
+            f'and(started_at.eq."{started_at}",id.lt.{session_id})'
+        )
+    result = await (
+        query.order("started_at", desc=True).order("id", desc=True).limit(limit).execute()
+    )
+    return result.data or []
+
+
+def summarize_session(session: dict, profile: dict) -> dict:
+    """Per-session aggregates shown on the History page."""
+    # One log row can record several drinks of its type
+    counts = {"shot": 0, "beer": 0, "mixed": 0}
+    for log in session.get("drink_logs") or []:
+        if log["drink_type"] in counts:
+            counts[log["drink_type"]] += log.get("quantity") or 1
+
+    hours = None
+    if session.get("ended_at"):
+        hours = (
+            datetime.fromisoformat(session["ended_at"])
+            - datetime.fromisoformat(session["started_at"])
+        ).total_seconds() / 3600
+    drinks = session.get("total_standard_drinks") or 0
+
+    return {
+        "session_id": session["id"],
+        "started_at": session["started_at"],
+        "ended_at": session.get("ended_at"),
+        "duration_hours": round(hours, 2) if hours is not None else None,
+        "drinks": drinks,
+        "peak_bac": session.get("peak_bac") or 0,
+        "shots": counts["shot"],
+        "beers": counts["beer"],
+        "mixed": counts["mixed"],
+        "hangover": predict_hangover(
+            drinks, profile["weight_lbs"], profile["biological_gender"], hours or 0
+        )["severity"],
+    }
+
+
+async def iter_history(user_id: str, profile: dict, page_size: int) -> AsyncIterator[list[dict]]:
+    """Every completed session's summary, one page at a time."""
+    after = None
+    while True:
+        page = await fetch_history_page(user_id, after, page_size)
+        if page:
+            yield [summarize_session(session, profile) for session in page]
+        if len(page) < page_size:
+            return
+        after = (page[-1]["started_at"], page[-1]["id"])
+
+
+async def ndjson_chunks(pages: AsyncIterator[list[dict]]) -> AsyncIterator[str]:
+    async for page in pages:
+        yield "".join(json.dumps(summary) + "\n" for summary in page)
+
+
+async def csv_chunks(pages: AsyncIterator[list[dict]]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    async for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
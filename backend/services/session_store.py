@@ -0,0 +1,360 @@
+"""Active sessions held in process memory, with drink logs written behind.
+
+Enabled by SESSION_STORE=1. At startup the store replays its journal and
+loads every active session, one compact record per user. From then on it
+is the source of truth for those sessions. Logging a drink updates the
+record, computes BAC and limit crossings as the log_drink RPC does, and
+answers without touching the database. The new log row is queued, and a
+background task sends the queue to apply_drink_writes()
+(sql/012_drink_write_behind.sql) in batches.
+
+Every queued write is first appended to the journal, a JSON-lines file.
+The journal is rotated aside while a batch is in flight and deleted once
+the batch is stored. Logs keep the ids the API gave them, so replaying a
+journal after a crash stores only what is missing.
+
+This only holds while this process is the sole writer of active sessions,
+so see config.SESSION_STORE before enabling it. Starting and ending
+sessions, offline batches and the stale-session sweep still go through the
+database; they flush the queue first and then update the record. Ending
+a session untracks it before the flush, so no drink can be queued against
+it while it closes.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from config import SESSION_JOURNAL, WRITE_BEHIND_BATCH, WRITE_BEHIND_INTERVAL_MS
+from db import db
+from services.bac_calculator import calculate_bac
+from services.limit_engine import limit_level
+
+logger = logging.getLogger(__name__)
+
+LOAD_PAGE_SIZE = 1000
+
+
+class ActiveSession:
+    __slots__ = ("id", "user_id", "started_at", "created_at", "total", "last_drink_at", "peak_bac")
+
+    def __init__(self, row: dict):
+        self.id: str = row["id"]
+        self.user_id: str = row["user_id"]
+        self.started_at = datetime.fromisoformat(row["started_at"])
+        self.created_at: Optional[str] = row.get("created_at")
+        self.total = float(row.get("total_standard_drinks") or 0)
+        logged = [datetime.fromisoformat(l["logged_at"]) for l in row.get("drink_logs") or []]
+        self.last_drink_at: Optional[datetime] = max(logged) if logged else None
+        self.peak_bac: Optional[float] = row.get("peak_bac")
+
+    def row(self) -> dict:
+        """The session as GET /drinks/sessions/active returns it."""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "started_at": self.started_at.isoformat(),
+            "ended_at": None,
+            "is_active": True,
+            "status": "active",
+            "total_standard_drinks": self.total,
+            "peak_bac": self.peak_bac,
+            "last_drink_at": self.last_drink_at.isoformat() if self.last_drink_at else None,
+            "created_at": self.created_at,
+        }
+
+
+class SessionStore:
+    def __init__(
+        self,
+        journal_path: str = SESSION_JOURNAL,
+        interval: float = WRITE_BEHIND_INTERVAL_MS / 1000,
+        batch_size: int = WRITE_BEHIND_BATCH,
+    ):
+        self.ready = False
+        self.journal_path = journal_path
+        self.interval = interval
+        self.batch_size = batch_size
+        self._by_user: dict[str, ActiveSession] = {}
+        # Log rows answered for but not yet stored, each with its session's
+        # peak_bac at the time, in journal order
+        self._pending: list[dict] = []
+        self._journal = None
+        self._flushing = asyncio.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self.logged = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.replayed = 0
+        self.flush_seconds = 0.0
+
+    # -- lifecycle ---------------------------------------------------------
+
+    async def load(self):
+        """Replay any journal left by a previous process, then load every active session."""
+        self.replayed = await self._recover()
+        sessions: dict[str, ActiveSession] = {}
+        after = None
+        while True:
+            query = (
+                db.table("drink_sessions")
+                .select("id, user_id, started_at, total_standard_drinks, peak_bac, created_at, drink_logs(logged_at)")
+                .eq("is_active", True)
+            )
+            if after:
+                query = query.gt("id", after)
+            page = (await query.order("id").limit(LOAD_PAGE_SIZE).execute()).data or []
+            # PostgREST caps each read at max-rows, so a short page isn't necessarily the last
+            if not page:
+                break
+            for row in page:
+                sessions[row["user_id"]] = ActiveSession(row)
+            after = page[-1]["id"]
+
+        self._by_user = sessions
+        self._journal = open(self.journal_path, "a", encoding="utf-8", buffering=1)
+        self.ready = True
+        logger.info("session store: %d active sessions, %d writes replayed", len(sessions), self.replayed)
+
+    def start(self):
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and store what is still queued."""
+        if self._task:
+            # Ask the loop to exit rather than cancelling it, so a batch in
+            # flight finishes (and a wake racing the cancel can't swallow it)
+            self._stopping = True
+            self._wake.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.ready:
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("final write-behind flush failed; the journal keeps the writes")
+            self._journal.close()
+            self.ready = False
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                async with asyncio.timeout(self.interval):
+                    await self._wake.wait()
+            except TimeoutError:
+                pass
+            if self._stopping:
+                return
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # Writes stay queued and journaled; retry after a pause
+                logger.exception("write-behind flush failed")
+                try:
+                    async with asyncio.timeout(self.interval * 10):
+                        await self._wake.wait()
+                except TimeoutError:
+                    pass
+
+    # -- sessions ----------------------------------------------------------
+
+    def get(self, user_id: str) -> Optional[ActiveSession]:
+        return self._by_user.get(user_id)
+
+    def add(self, row: dict) -> ActiveSession:
+        """Track a session just inserted in the database."""
+        session = self._by_user[row["user_id"]] = ActiveSession(row)
+        return session
+
+    def discard(self, user_id: str, session_id: str):
+        """Stop tracking a session that has ended."""
+        session = self._by_user.get(user_id)
+        if session is not None and session.id == session_id:
+            del self._by_user[user_id]
+
+    def take(self, user_id: str, session_id: str) -> Optional[ActiveSession]:
+        """Stop tracking a session about to be ended, so no drink is logged to
+        it while the database closes it; restore() it if that fails."""
+        session = self._by_user.get(user_id)
+        if session is None or session.id != session_id:
+            return None
+        del self._by_user[user_id]
+        return session
+
+    def take_idle(self, before: datetime) -> dict[str, ActiveSession]:
+        """take() every session with no drink (or start) since `before`, by id."""
+        idle = [s for s in self._by_user.values() if (s.last_drink_at or s.started_at) < before]
+        for session in idle:
+            del self._by_user[session.user_id]
+        return {s.id: s for s in idle}
+
+    def restore(self, session: Optional[ActiveSession]):
+        """Track a taken session again, unless the user has started another."""
+        if session is not None:
+            self._by_user.setdefault(session.user_id, session)
+
+    def log_drink(
+        self,
+        user_id: str,
+        session_id: str,
+        drink_type: str,
+        quantity: float,
+        standard_drinks: float,
+        profile: dict,
+    ) -> Optional[dict]:
+        """Log a drink in memory; same result as record_drink, or None without such an active session."""
+        session = self._by_user.get(user_id)
+        if session is None or session.id != session_id:
+            return None
+
+        now = datetime.now(timezone.utc)
+        previous_total = session.total
+        session.total += standard_drinks
+        session.last_drink_at = now
+        current_bac = calculate_bac(
+            session.total,
+            profile["weight_lbs"],
+            profile["biological_gender"],
+            (now - session.started_at).total_seconds() / 3600,
+        )
+        session.peak_bac = max(session.peak_bac or 0, current_bac)
+
+        log = {
+            "id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "client_id": None,
+            "drink_type": drink_type,
+            "quantity": quantity,
+            "standard_drink_equivalent": standard_drinks,
+            "logged_at": now.isoformat(),
+        }
+        self._queue(log, session.peak_bac)
+
+        level = limit_level(session.total, profile)
+        return {
+            "log": log,
+            "previous_total": previous_total,
+            "total_standard_drinks": session.total,
+            "current_bac": current_bac,
+            "peak_bac": session.peak_bac,
+            "limit_level": level,
+            "crossed_level": level if level != limit_level(previous_total, profile) else None,
+            "started_at": session.started_at.isoformat(),
+            "weight_lbs": profile["weight_lbs"],
+            "biological_gender": profile["biological_gender"],
+        }
+
+    def apply(self, user_id: str, result: dict):
+        """Add what a log_drinks RPC stored to the session.
+
+        Drinks logged here while the RPC was in flight are in the record but
+        not yet in the database, so add the RPC's increment rather than
+        taking its total.
+        """
+        session = self._by_user.get(user_id)
+        if session is None:
+            return
+        session.total += float(result["total_standard_drinks"]) - float(result["previous_total"])
+        session.peak_bac = max(session.peak_bac or 0, result["peak_bac"] or 0) or None
+        for log in result["logs"]:
+            logged_at = datetime.fromisoformat(log["logged_at"])
+            if session.last_drink_at is None or logged_at > session.last_drink_at:
+                session.last_drink_at = logged_at
+
+    # -- write-behind ------------------------------------------------------
+
+    def _queue(self, log: dict, peak_bac: float):
+        entry = {**log, "peak_bac": peak_bac}
+        self._journal.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._pending.append(entry)
+        self.logged += 1
+        if len(self._pending) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        """Store every queued write now; returns how many logs were sent."""
+        async with self._flushing:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, []
+            # New writes go to a fresh journal while this batch is in flight
+            in_flight = self.journal_path + ".flushing"
+            self._journal.close()
+            os.replace(self.journal_path, in_flight)
+            self._journal = open(self.journal_path, "a", encoding="utf-8", buffering=1)
+
+            start = time.perf_counter()
+            try:
+                for i in range(0, len(batch), self.batch_size):
+                    await _apply(batch[i:i + self.batch_size])
+                    self.batches += 1
+            except Exception:
+                self.failures += 1
+                # Requeue ahead of newer writes and journal them again; the
+                # stored part of the batch is skipped when resent
+                self._pending[:0] = batch
+                for entry in batch:
+                    self._journal.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                os.remove(in_flight)
+                raise
+            os.remove(in_flight)
+            self.flushed += len(batch)
+            self.flush_seconds += time.perf_counter() - start
+            return len(batch)
+
+    async def _recover(self) -> int:
+        replayed = 0
+        for path in (self.journal_path + ".flushing", self.journal_path):
+            if not os.path.exists(path):
+                continue
+            entries = []
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # torn final line from a crash mid-write
+            for i in range(0, len(entries), self.batch_size):
+                await _apply(entries[i:i + self.batch_size])
+            replayed += len(entries)
+            os.remove(path)
+        return replayed
+
+    def stats(self) -> dict:
+        return {
+            "ready": int(self.ready),
+            "sessions": len(self._by_user),
+            "pending": len(self._pending),
+            "logged": self.logged,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "replayed": self.replayed,
+            "flush_seconds": round(self.flush_seconds, 4),
+        }
+
+
+async def _apply(entries: list[dict]):
+    peaks: dict[str, float] = {}
+    for entry in entries:
+        peaks[entry["session_id"]] = max(peaks.get(entry["session_id"], 0), entry["peak_bac"] or 0)
+    await db.rpc(
+        "apply_drink_writes",
+        {
+            "p_logs": [{k: v for k, v in entry.items() if k != "peak_bac"} for entry in entries],
+            "p_sessions": [{"id": sid, "peak_bac": peak} for sid, peak in peaks.items()],
+        },
+    ).execute()
+
+
+session_store = SessionStore()
@@ -0,0 +1,83 @@
+"""Coalescing for hot shared reads.
+
+Concurrent callers asking for the same key share one in-flight load instead
+of each sending the same query upstream, and with a TTL the result is also
+reused for a short while after it lands. Failures are never cached: every
+waiter of a failed load gets the exception and the next call retries.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from services.cache import TTLCache
+
+_MISSING = object()
+
+
+class SingleFlight:
+    def __init__(self, ttl: Optional[float] = None, maxsize: int = 1024):
+        self.ttl = ttl
+        self._results = TTLCache(maxsize=maxsize, ttl=ttl) if ttl else None
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.hits = 0  # served from the TTL cache
+        self.coalesced = 0  # joined a load already in flight
+        self.loads = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        if self._results is not None:
+            value = self._results.get(key, _MISSING)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.loads += 1
+            # The load runs in its own task, in a copy of the first caller's
+            # context, so one waiter giving up doesn't cancel it for the rest
+            task = self._in_flight[key] = asyncio.ensure_future(self._load(key, load))
+            task.add_done_callback(_consume)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        current = asyncio.current_task()
+        try:
+            value = await load()
+        except BaseException:
+            self.errors += 1
+            raise
+        finally:
+            # forget() may have dropped this load since; then it's stale
+            latest = self._in_flight.get(key) is current
+            if latest:
+                del self._in_flight[key]
+        if latest and self._results is not None:
+            self._results.set(key, value)
+        return value
+
+    def forget(self, key: Hashable):
+        """Drop a cached result after a write; a load already in flight won't be reused or cached."""
+        self._in_flight.pop(key, None)
+        if self._results is not None:
+            self._results.pop(key)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "loads": self.loads,
+            "errors": self.errors,
+            "in_flight": len(self._in_flight),
+            "cached": len(self._results) if self._results is not None else 0,
+        }
+
+
+def _consume(task: asyncio.Task):
+    # Mark the outcome retrieved even if every waiter was cancelled
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,168 @@
+"""Search index over the university list (config.UNIVERSITIES_CSV).
+
+The CSV is read once per process into a handful of NumPy arrays and sorted
+lists:
+
+- every folded name, sorted, for whole-name prefix matches (a bisect);
+- every word of every name, sorted, for word-prefix matches ("berk");
+- a trigram -> ids posting list per trigram, for typo-tolerant matches.
+
+A query costs a few bisects, plus one bincount over the posting lists it
+touches when prefix matches alone can't fill the page, so ranked results
+come back in under a millisecond. The same
+index gives canonical(), which maps user input onto the exact CSV spelling
+so leaderboard keys are consistent.
+"""
+import csv
+import re
+import sys
+import unicodedata
+from bisect import bisect_left
+from typing import Optional
+
+import numpy as np
+
+from config import UNIVERSITIES_CSV
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+# Ranking tiers; trigram similarity (0..1) orders the fuzzy tier
+_EXACT, _PREFIX, _WORDS, _FUZZY = 3, 2, 1, 0
+# Share of the query's trigrams a fuzzy match must contain
+_MIN_SIMILARITY = 0.5
+
+
+def fold(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def _trigrams(folded: str, partial_last: bool = False) -> set[str]:
+    """pg_trgm-style trigrams, each word padded with two leading spaces and
+    one trailing; the trailing pad is left off a word still being typed."""
+    words = folded.split()
+    grams = set()
+    for i, word in enumerate(words):
+        padded = "  " + word if partial_last and i == len(words) - 1 else f"  {word} "
+        grams.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return grams
+
+
+class UniversityIndex:
+    def __init__(self, rows: list[tuple[str, str]]):
+        # Names repeat across countries; keep one entry per folded name,
+        # preferring the US row
+        by_folded: dict[str, tuple[str, str]] = {}
+        for country, name in rows:
+            key = fold(name)
+            if key and (key not in by_folded or country == "US"):
+                by_folded[key] = (country, name)
+
+        self.names = [name for _, name in by_folded.values()]
+        self._folded = list(by_folded)
+        self._ids = {key: i for i, key in enumerate(self._folded)}
+        n = len(self.names)
+        self._us = np.array([country == "US" for country, _ in by_folded.values()], dtype=bool)
+        self._lengths = np.array([len(name) for name in self.names], dtype=np.int32)
+
+        order = sorted(range(n), key=self._folded.__getitem__)
+        self._sorted = [self._folded[i] for i in order]
+        self._sorted_ids = np.array(order, dtype=np.int32)
+
+        words = sorted(
+            (sys.intern(word), i) for i, key in enumerate(self._folded) for word in set(key.split())
+        )
+        self._words = [word for word, _ in words]
+        self._word_ids = np.array([i for _, i in words], dtype=np.int32)
+
+        # Trigram posting lists, packed end to end: the ids containing gram g
+        # are _postings[_offsets[g]:_offsets[g + 1]]
+        postings: dict[str, list[int]] = {}
+        for i, key in enumerate(self._folded):
+            for gram in _trigrams(key):
+                postings.setdefault(gram, []).append(i)
+        self._grams = {gram: g for g, gram in enumerate(postings)}
+        self._offsets = np.cumsum([0] + [len(ids) for ids in postings.values()])
+        self._postings = np.fromiter(
+            (i for ids in postings.values() for i in ids), dtype=np.intp, count=self._offsets[-1]
+        )
+
+    @classmethod
+    def from_csv(cls, path: str) -> "UniversityIndex":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls([(row[0].strip(), row[1].strip()) for row in csv.reader(f) if len(row) >= 2])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _prefix_range(self, keys: list[str], prefix: str) -> tuple[int, int]:
+        return bisect_left(keys, prefix), bisect_left(keys, prefix + "\x7f")
+
+    def canonical(self, name: str) -> Optional[str]:
+        """The CSV spelling of `name`, ignoring case, accents and punctuation."""
+        i = self._ids.get(fold(name))
+        return None if i is None else self.names[i]
+
+    def search(self, query: str, limit: int = 8) -> list[str]:
+        q = fold(query)
+        if len(q) < 2:
+            return []
+        n = len(self.names)
+        tier = np.full(n, -1, dtype=np.int8)
+
+        # Every query word is the start of some word in the name
+        matched = np.ones(n, dtype=bool)
+        for word in q.split():
+            lo, hi = self._prefix_range(self._words, word)
+            hit = np.zeros(n, dtype=bool)
+            hit[self._word_ids[lo:hi]] = True
+            matched &= hit
+        tier[matched] = _WORDS
+
+        lo, hi = self._prefix_range(self._sorted, q)
+        tier[self._sorted_ids[lo:hi]] = _PREFIX
+        exact = self._ids.get(q)
+        if exact is not None:
+            tier[exact] = _EXACT
+
+        # Fuzzy matches are only needed when the exact tiers can't fill the
+        # page, which skips the costly posting lists of broad queries
+        similarity = np.zeros(n, dtype=np.float64)
+        if np.count_nonzero(tier >= 0) < limit:
+            grams = _trigrams(q, partial_last=True)
+            ids = [
+                self._postings[self._offsets[g]:self._offsets[g + 1]]
+                for g in (self._grams.get(gram) for gram in grams)
+                if g is not None
+            ]
+            if ids:
+                similarity = np.bincount(np.concatenate(ids), minlength=n) / len(grams)
+                similarity[tier >= 0] = 0
+                tier[similarity >= _MIN_SIMILARITY] = _FUZZY
+
+        # One integer sort key: tier, then (fuzzy matches only) similarity,
+        # then US schools, then shorter names
+        hits = np.flatnonzero(tier >= 0)
+        key = (
+            (tier[hits].astype(np.int64) << 40)
+            | (np.round(similarity[hits] * 0xFFFF).astype(np.int64) << 20)
+            | (self._us[hits].astype(np.int64) << 19)
+            | (0x7FFFF - self._lengths[hits])
+        )
+        if len(hits) > limit:
+            best = np.argpartition(-key, limit)[:limit]
+            hits, key = hits[best], key[best]
+        return [self.names[i] for i in hits[np.argsort(-key, kind="stable")]]
+
+
+_index: Optional[UniversityIndex] = None
+
+
+def get_index() -> UniversityIndex:
+    """The process-wide index, built on first use (main checks the CSV exists at startup)."""
+    global _index
+    if _index is None:
+        _index = UniversityIndex.from_csv(UNIVERSITIES_CSV)
+    return _index
@@ -0,0 +1,77 @@
+-- Consolidated drink logging for POST /api/drinks/log.
+--
+-- Inserts the log, atomically increments the session total, updates peak BAC
+-- and reports the limit level in one transaction (one PostgREST round trip).
+-- The UPDATE takes the session row lock first, so concurrent drinks on the
+-- same session serialize instead of losing increments.
+--
+-- The BAC expression mirrors services.bac_calculator.calculate_bac and the
+-- local stand-in local_rpcs.log_drink; keep them in sync.
+
+create or replace function public.log_drink(
+  p_user_id uuid,
+  p_session_id uuid,
+  p_drink_type text,
+  p_quantity numeric,
+  p_standard_drinks numeric
+) returns jsonb
+language plpgsql
+as $$
+declare
+  v_session drink_sessions%rowtype;
+  v_profile profiles%rowtype;
+  v_log drink_logs%rowtype;
+  v_bac numeric;
+  v_level text;
+begin
+  update drink_sessions
+     set total_standard_drinks = coalesce(total_standard_drinks, 0) + p_standard_drinks
+   where id = p_session_id
+     and user_id = p_user_id
+     and is_active
+  returning * into v_session;
+
+  if not found then
+    raise exception 'Active session not found' using errcode = 'P0002';
+  end if;
+
+  insert into drink_logs (session_id, drink_type, quantity, standard_drink_equivalent)
+  values (p_session_id, p_drink_type, p_quantity, p_standard_drinks)
+  returning * into v_log;
+
+  select * into v_profile from profiles where id = p_user_id;
+
+  v_bac := greatest(0, round(
+    (v_session.total_standard_drinks * 14)
+      / (v_profile.weight_lbs * 453.592
+         * case v_profile.biological_gender when 'female' then 0.55 else 0.68 end)
+    - 0.015 * extract(epoch from (now() - v_session.started_at)) / 3600,
+    4
+  ));
+
+  update drink_sessions
+     set peak_bac = greatest(coalesce(peak_bac, 0), v_bac)
+   where id = p_session_id
+  returning peak_bac into v_session.peak_bac;
+
+  v_level := case
+    when coalesce(v_profile.calculated_high_limit, 0) > 0
+         and v_session.total_standard_drinks >= v_profile.calculated_high_limit then 'high'
+    when coalesce(v_profile.calculated_med_limit, 0) > 0
+         and v_session.total_standard_drinks >= v_profile.calculated_med_limit then 'medium'
+  end;
+
+  return jsonb_build_object(
+    'log', to_jsonb(v_log),
+    'previous_total', v_session.total_standard_drinks - p_standard_drinks,
+    'total_standard_drinks', v_session.total_standard_drinks,
+    'current_bac', v_bac,
+    'peak_bac', v_session.peak_bac,
+    'limit_level', v_level
+  );
+end;
+$$;
+
+-- p_user_id is trusted, so only the backend's service role may call this.
+revoke all on function public.log_drink(uuid, uuid, text, numeric, numeric) from public, anon, authenticated;
+grant execute on function public.log_drink(uuid, uuid, text, numeric, numeric) to service_role;
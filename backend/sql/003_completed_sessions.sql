@@ -0,0 +1,78 @@
+-- Per-user completed-session counter for the leaderboards.
+--
+-- complete_session() ends a session and bumps the owner's counter in one
+-- transaction; ending an already completed session is a no-op for the
+-- counter. rebuild_completed_sessions() backfills every counter from
+-- drink_sessions (run it via scripts/rebuild_leaderboards.py).
+
+alter table profiles
+  add column if not exists completed_sessions integer not null default 0;
+
+create or replace function public.complete_session(
+  p_user_id uuid,
+  p_session_id uuid
+) returns jsonb
+language plpgsql
+as $$
+declare
+  v_session drink_sessions%rowtype;
+  v_count integer;
+begin
+  update drink_sessions
+     set is_active = false,
+         ended_at = now(),
+         status = 'completed'
+   where id = p_session_id
+     and user_id = p_user_id
+     and status is distinct from 'completed'
+  returning * into v_session;
+
+  if found then
+    update profiles
+       set completed_sessions = completed_sessions + 1
+     where id = p_user_id
+    returning completed_sessions into v_count;
+  else
+    select * into v_session
+      from drink_sessions
+     where id = p_session_id
+       and user_id = p_user_id;
+
+    if not found then
+      raise exception 'Session not found' using errcode = 'P0002';
+    end if;
+  end if;
+
+  return jsonb_build_object(
+    'session', to_jsonb(v_session),
+    'completed_sessions', v_count
+  );
+end;
+$$;
+
+create or replace function public.rebuild_completed_sessions()
+returns integer
+language sql
+as $$
+  with counts as (
+    select p.id, count(s.id)::integer as n
+      from profiles p
+      left join drink_sessions s
+        on s.user_id = p.id
+       and s.status = 'completed'
+     group by p.id
+  ), updated as (
+    update profiles p
+       set completed_sessions = counts.n
+      from counts
+     where p.id = counts.id
+       and p.completed_sessions is distinct from counts.n
+    returning p.id
+  )
+  select count(*)::integer from updated;
+$$;
+
+revoke all on function public.complete_session(uuid, uuid) from public, anon, authenticated;
+grant execute on function public.complete_session(uuid, uuid) to service_role;
+revoke all on function public.rebuild_completed_sessions() from public, anon, authenticated;
+grant execute on function public.rebuild_completed_sessions() to service_role;
@@ -0,0 +1,6 @@
+-- Stamp recording which formula version and inputs the stored
+-- calculated_*_limit values were derived from (see
+-- services.limit_engine.limits_version). NULL means never derived by the API.
+
+alter table profiles
+  add column if not exists limits_version text;
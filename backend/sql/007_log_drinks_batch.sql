@@ -0,0 +1,116 @@
+-- Batch drink logging for clients that queued drinks while offline.
+--
+-- Each queued drink carries a client-generated client_id; the unique index
+-- makes a replayed batch insert nothing, so totals are never double-counted.
+-- log_drinks() inserts the whole batch in one statement and updates the
+-- session total once. crossed_level compares the totals before and after
+-- the batch, so a batch fires at most one alert. The session's drinks are
+-- returned so the API can compute the peak over their actual times.
+
+alter table drink_logs
+  add column if not exists client_id text;
+
+create unique index if not exists drink_logs_session_client_id_key
+  on drink_logs (session_id, client_id);
+
+create or replace function public.log_drinks(
+  p_user_id uuid,
+  p_session_id uuid,
+  p_drinks jsonb
+) returns jsonb
+language plpgsql
+as $$
+declare
+  v_session drink_sessions%rowtype;
+  v_profile profiles%rowtype;
+  v_logs jsonb;
+  v_added numeric;
+  v_bac numeric;
+  v_previous numeric;
+  v_level text;
+  v_previous_level text;
+begin
+  select * into v_session
+    from drink_sessions
+   where id = p_session_id
+     and user_id = p_user_id
+     and is_active
+     for update;
+
+  if not found then
+    raise exception 'Active session not found' using errcode = 'P0002';
+  end if;
+
+  -- Client clocks can't be trusted, so times are clamped to the session
+  with inserted as (
+    insert into drink_logs (session_id, client_id, drink_type, quantity, standard_drink_equivalent, logged_at)
+    select p_session_id, d.client_id, d.drink_type, d.quantity, d.standard_drinks,
+           least(greatest(coalesce(d.logged_at, now()), v_session.started_at), now())
+      from jsonb_to_recordset(p_drinks)
+        as d(client_id text, drink_type text, quantity numeric, standard_drinks numeric, logged_at timestamptz)
+    on conflict (session_id, client_id) do nothing
+    returning *
+  )
+  select coalesce(jsonb_agg(to_jsonb(inserted) order by inserted.logged_at), '[]'::jsonb),
+         coalesce(sum(inserted.standard_drink_equivalent), 0)
+    into v_logs, v_added
+    from inserted;
+
+  update drink_sessions
+     set total_standard_drinks = coalesce(total_standard_drinks, 0) + v_added
+   where id = p_session_id
+  returning * into v_session;
+
+  select * into v_profile from profiles where id = p_user_id;
+
+  v_bac := greatest(0, round(
+    (v_session.total_standard_drinks * 14)
+      / (v_profile.weight_lbs * 453.592
+         * case v_profile.biological_gender when 'female' then 0.55 else 0.68 end)
+      * 100
+    - 0.015 * extract(epoch from (now() - v_session.started_at)) / 3600,
+    4
+  ));
+
+  v_previous := v_session.total_standard_drinks - v_added;
+
+  v_level := case
+    when coalesce(v_profile.calculated_high_limit, 0) > 0
+         and v_session.total_standard_drinks >= v_profile.calculated_high_limit then 'high'
+    when coalesce(v_profile.calculated_med_limit, 0) > 0
+         and v_session.total_standard_drinks >= v_profile.calculated_med_limit then 'medium'
+  end;
+
+  v_previous_level := case
+    when coalesce(v_profile.calculated_high_limit, 0) > 0
+         and v_previous >= v_profile.calculated_high_limit then 'high'
+    when coalesce(v_profile.calculated_med_limit, 0) > 0
+         and v_previous >= v_profile.calculated_med_limit then 'medium'
+  end;
+
+  return jsonb_build_object(
+    'logs', v_logs,
+    'duplicates', jsonb_array_length(p_drinks) - jsonb_array_length(v_logs),
+    'previous_total', v_previous,
+    'total_standard_drinks', v_session.total_standard_drinks,
+    'current_bac', v_bac,
+    'peak_bac', v_session.peak_bac,
+    'limit_level', v_level,
+    'crossed_level', case when v_level is distinct from v_previous_level then v_level end,
+    'started_at', v_session.started_at,
+    'weight_lbs', v_profile.weight_lbs,
+    'biological_gender', v_profile.biological_gender,
+    'session_drinks', (
+      select coalesce(jsonb_agg(jsonb_build_object(
+               'logged_at', l.logged_at,
+               'standard_drink_equivalent', l.standard_drink_equivalent)), '[]'::jsonb)
+        from drink_logs l
+       where l.session_id = p_session_id
+    )
+  );
+end;
+$$;
+
+-- p_user_id is trusted, so only the backend's service role may call this.
+revoke all on function public.log_drinks(uuid, uuid, jsonb) from public, anon, authenticated;
+grant execute on function public.log_drinks(uuid, uuid, jsonb) to service_role;
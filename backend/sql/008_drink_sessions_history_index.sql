@@ -0,0 +1,6 @@
+-- Keyset index for the history endpoints (services/session_history.py):
+-- each page is a range scan continuing from the last (started_at, id).
+
+create index if not exists drink_sessions_history_idx
+  on drink_sessions (user_id, started_at desc, id desc)
+  where not is_active;
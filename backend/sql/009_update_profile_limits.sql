@@ -0,0 +1,28 @@
+-- Bulk write for scripts/recompute_limits.py: applies a batch of re-derived
+-- limits in one statement. Rows whose inputs changed since they were read
+-- (weight or gender edited mid-run) are skipped, since their stamp would
+-- no longer describe them; current_limits re-derives those on next read.
+
+create or replace function public.update_profile_limits(p_rows jsonb)
+returns integer
+language sql
+as $$
+  with updated as (
+    update profiles p
+       set calculated_low_limit = r.low,
+           calculated_med_limit = r.med,
+           calculated_high_limit = r.high,
+           limits_version = r.limits_version
+      from jsonb_to_recordset(p_rows)
+        as r(id uuid, low integer, med integer, high integer, limits_version text,
+             weight_lbs integer, biological_gender text)
+     where p.id = r.id
+       and p.weight_lbs = r.weight_lbs
+       and p.biological_gender is not distinct from r.biological_gender
+    returning p.id
+  )
+  select count(*)::integer from updated;
+$$;
+
+revoke all on function public.update_profile_limits(jsonb) from public, anon, authenticated;
+grant execute on function public.update_profile_limits(jsonb) to service_role;
@@ -0,0 +1,131 @@
+-- Background housekeeping run by services/scheduler.py.
+--
+-- scheduler_leases gives each periodic job a single runner across API
+-- instances: acquire_lease() takes or renews a job's lease and returns false
+-- while another holder's lease is still live.
+--
+-- close_stale_sessions() completes up to p_limit active sessions with no
+-- drink (or start) in the last p_idle_minutes, in one statement. ended_at is
+-- the last activity rather than the sweep time, and each owner's
+-- completed_sessions counter is bumped as complete_session() would. Rows
+-- locked by a concurrent end_session are skipped and picked up next sweep.
+-- The closed sessions come back with their drinks so the API can compute
+-- the final peak, which finalize_peak_bac() then stores in bulk.
+
+create table if not exists scheduler_leases (
+  job text primary key,
+  holder text not null,
+  expires_at timestamptz not null
+);
+
+alter table scheduler_leases enable row level security;
+
+create index if not exists drink_sessions_active_started_idx
+  on drink_sessions (started_at)
+  where is_active;
+
+create or replace function public.acquire_lease(
+  p_job text,
+  p_holder text,
+  p_ttl_seconds integer
+) returns boolean
+language plpgsql
+as $$
+begin
+  insert into scheduler_leases as l (job, holder, expires_at)
+  values (p_job, p_holder, now() + make_interval(secs => p_ttl_seconds))
+  on conflict (job) do update
+     set holder = excluded.holder,
+         expires_at = excluded.expires_at
+   where l.holder = excluded.holder
+      or l.expires_at < now();
+  return found;
+end;
+$$;
+
+create or replace function public.close_stale_sessions(
+  p_idle_minutes integer,
+  p_limit integer
+) returns jsonb
+language plpgsql
+as $$
+declare
+  v_result jsonb;
+begin
+  with stale as (
+    select s.id, coalesce(last.logged_at, s.started_at) as last_activity
+      from drink_sessions s
+      left join lateral (
+        select max(l.logged_at) as logged_at
+          from drink_logs l
+         where l.session_id = s.id
+      ) last on true
+     where s.is_active
+       and s.status is distinct from 'completed'
+       and s.started_at < now() - make_interval(mins => p_idle_minutes)
+       and coalesce(last.logged_at, s.started_at) < now() - make_interval(mins => p_idle_minutes)
+     order by s.started_at
+     limit p_limit
+       for update of s skip locked
+  ), closed as (
+    update drink_sessions s
+       set is_active = false,
+           ended_at = stale.last_activity,
+           status = 'completed'
+      from stale
+     where s.id = stale.id
+    returning s.*
+  ), counters as (
+    update profiles p
+       set completed_sessions = p.completed_sessions + c.n
+      from (select user_id, count(*)::integer as n from closed group by user_id) c
+     where p.id = c.user_id
+    returning p.id, p.completed_sessions, p.weight_lbs, p.biological_gender
+  )
+  select coalesce(jsonb_agg(jsonb_build_object(
+           'session_id', c.id,
+           'user_id', c.user_id,
+           'started_at', c.started_at,
+           'ended_at', c.ended_at,
+           'peak_bac', c.peak_bac,
+           'completed_sessions', p.completed_sessions,
+           'weight_lbs', p.weight_lbs,
+           'biological_gender', p.biological_gender,
+           'drinks', coalesce((
+             select jsonb_agg(jsonb_build_object(
+                      'logged_at', l.logged_at,
+                      'standard_drink_equivalent', l.standard_drink_equivalent
+                    ) order by l.logged_at)
+               from drink_logs l
+              where l.session_id = c.id
+           ), '[]'::jsonb)
+         )), '[]'::jsonb)
+    into v_result
+    from closed c
+    join counters p on p.id = c.user_id;
+
+  return v_result;
+end;
+$$;
+
+create or replace function public.finalize_peak_bac(p_rows jsonb)
+returns integer
+language sql
+as $$
+  with updated as (
+    update drink_sessions s
+       set peak_bac = r.peak_bac
+      from jsonb_to_recordset(p_rows) as r(id uuid, peak_bac numeric)
+     where s.id = r.id
+       and (s.peak_bac is null or s.peak_bac < r.peak_bac)
+    returning s.id
+  )
+  select count(*)::integer from updated;
+$$;
+
+revoke all on function public.acquire_lease(text, text, integer) from public, anon, authenticated;
+grant execute on function public.acquire_lease(text, text, integer) to service_role;
+revoke all on function public.close_stale_sessions(integer, integer) from public, anon, authenticated;
+grant execute on function public.close_stale_sessions(integer, integer) to service_role;
+revoke all on function public.finalize_peak_bac(jsonb) from public, anon, authenticated;
+grant execute on function public.finalize_peak_bac(jsonb) to service_role;
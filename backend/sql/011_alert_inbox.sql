@@ -0,0 +1,115 @@
+-- Alerts inbox: keyset pages, bulk mark-read and a per-user unread counter.
+--
+-- profiles.unread_alerts counts the user's unread friend_alerts so the
+-- badge is a primary-key read. insert_friend_alerts() stores a batch of
+-- alerts and bumps each recipient's counter in one statement;
+-- mark_alerts_read() marks every unread alert at or before a
+-- (created_at, id) key and mark_alert_read() a single one, both lowering
+-- the counter by the rows they changed. rebuild_unread_alerts() recounts
+-- every counter (alerts removed by cascades never decrement it) and runs
+-- on a schedule from services/housekeeping.py.
+
+alter table profiles
+  add column if not exists unread_alerts integer not null default 0;
+
+-- Inbox pages, newest first, continuing from the last (created_at, id)
+create index if not exists friend_alerts_inbox_idx
+  on friend_alerts (friend_id, created_at desc, id desc);
+
+create index if not exists friend_alerts_unread_idx
+  on friend_alerts (friend_id, created_at, id)
+  where not is_read;
+
+create or replace function public.insert_friend_alerts(p_alerts jsonb)
+returns jsonb
+language sql
+as $$
+  with inserted as (
+    insert into friend_alerts (user_id, friend_id, session_id, message)
+    select r.user_id, r.friend_id, r.session_id, r.message
+      from jsonb_to_recordset(p_alerts)
+        as r(user_id uuid, friend_id uuid, session_id uuid, message text)
+    returning *
+  ), counters as (
+    update profiles p
+       set unread_alerts = p.unread_alerts + c.n
+      from (select friend_id, count(*)::integer as n from inserted group by friend_id) c
+     where p.id = c.friend_id
+    returning p.id, p.unread_alerts
+  )
+  select coalesce(jsonb_agg(to_jsonb(i) || jsonb_build_object('unread', c.unread_alerts)), '[]'::jsonb)
+    from inserted i
+    left join counters c on c.id = i.friend_id;
+$$;
+
+create or replace function public.mark_alerts_read(
+  p_user_id uuid,
+  p_created_at timestamptz,
+  p_id uuid
+) returns integer
+language sql
+as $$
+  with marked as (
+    update friend_alerts
+       set is_read = true
+     where friend_id = p_user_id
+       and not is_read
+       and (created_at, id) <= (p_created_at, p_id)
+    returning id
+  )
+  update profiles
+     set unread_alerts = greatest(unread_alerts - (select count(*) from marked)::integer, 0)
+   where id = p_user_id
+  returning unread_alerts;
+$$;
+
+create or replace function public.mark_alert_read(
+  p_user_id uuid,
+  p_alert_id uuid
+) returns integer
+language sql
+as $$
+  with marked as (
+    update friend_alerts
+       set is_read = true
+     where id = p_alert_id
+       and friend_id = p_user_id
+       and not is_read
+    returning id
+  )
+  update profiles
+     set unread_alerts = greatest(unread_alerts - (select count(*) from marked)::integer, 0)
+   where id = p_user_id
+  returning unread_alerts;
+$$;
+
+create or replace function public.rebuild_unread_alerts()
+returns integer
+language sql
+as $$
+  with counts as (
+    select p.id, count(a.id)::integer as n
+      from profiles p
+      left join friend_alerts a
+        on a.friend_id = p.id
+       and not a.is_read
+     group by p.id
+  ), updated as (
+    update profiles p
+       set unread_alerts = counts.n
+      from counts
+     where p.id = counts.id
+       and p.unread_alerts is distinct from counts.n
+    returning p.id
+  )
+  select count(*)::integer from updated;
+$$;
+
+revoke all on function public.insert_friend_alerts(jsonb) from public, anon, authenticated;
+grant execute on function public.insert_friend_alerts(jsonb) to service_role;
+revoke all on function public.mark_alerts_read(uuid, timestamptz, uuid) from public, anon, authenticated;
+grant execute on function public.mark_alerts_read(uuid, timestamptz, uuid) to service_role;
+revoke all on function public.mark_alert_read(uuid, uuid) from public, anon, authenticated;
+grant execute on function public.mark_alert_read(uuid, uuid) to service_role;
+revoke all on function public.rebuild_unread_alerts() from public, anon, authenticated;
+grant execute on function public.rebuild_unread_alerts() to service_role;
@@ -0,0 +1,56 @@
+-- Batched write-behind for the in-memory session store
+-- (services/session_store.py, SESSION_STORE=1).
+--
+-- apply_drink_writes() stores drink logs the API has already answered for.
+-- Each log carries the id the API gave it, so a batch replayed after a
+-- crash inserts only the logs that are missing, and each session's total
+-- grows by exactly those. peak_bac only ever rises. Returns the number of
+-- logs inserted.
+
+create or replace function public.apply_drink_writes(
+  p_logs jsonb,
+  p_sessions jsonb
+) returns integer
+language plpgsql
+as $$
+declare
+  v_inserted integer;
+begin
+  with inserted as (
+    insert into drink_logs (id, session_id, drink_type, quantity, standard_drink_equivalent, logged_at)
+    select r.id, r.session_id, r.drink_type, r.quantity, r.standard_drink_equivalent, r.logged_at
+      from jsonb_to_recordset(p_logs) as r(
+        id uuid,
+        session_id uuid,
+        drink_type text,
+        quantity numeric,
+        standard_drink_equivalent numeric,
+        logged_at timestamptz
+      )
+    on conflict (id) do nothing
+    returning session_id, standard_drink_equivalent
+  ), totals as (
+    update drink_sessions s
+       set total_standard_drinks = coalesce(s.total_standard_drinks, 0) + t.added
+      from (
+        select session_id, sum(standard_drink_equivalent) as added
+          from inserted
+         group by session_id
+      ) t
+     where s.id = t.session_id
+    returning s.id
+  )
+  select count(*)::integer into v_inserted from inserted;
+
+  update drink_sessions s
+     set peak_bac = r.peak_bac
+    from jsonb_to_recordset(p_sessions) as r(id uuid, peak_bac numeric)
+   where s.id = r.id
+     and (s.peak_bac is null or s.peak_bac < r.peak_bac);
+
+  return v_inserted;
+end;
+$$;
+
+revoke all on function public.apply_drink_writes(jsonb, jsonb) from public, anon, authenticated;
+grant execute on function public.apply_drink_writes(jsonb, jsonb) to service_role;
@@ -0,0 +1,43 @@
+-- Per-user calibration totals for scripts/recompute_limits.py.
+--
+-- The script used to read the raw calibration_sessions rows for a whole
+-- chunk of profiles in one request, which PostgREST's max-rows cap cut
+-- short without an error. calibration_aggregates() groups them here
+-- instead: one {user_id, sessions, handle_more, feeling} object per user
+-- with sessions in the id range, returned as a single jsonb value so the
+-- cap never applies.
+
+create index if not exists calibration_sessions_user_id_idx
+  on calibration_sessions (user_id);
+
+create or replace function public.calibration_aggregates(
+  p_first uuid,
+  p_last uuid
+) returns jsonb
+language sql
+stable
+as $$
+  select coalesce(
+           jsonb_agg(
+             jsonb_build_object(
+               'user_id', user_id,
+               'sessions', sessions,
+               'handle_more', handle_more,
+               'feeling', feeling
+             )
+           ),
+           '[]'::jsonb
+         )
+    from (
+      select user_id,
+             count(*)::integer as sessions,
+             (count(*) filter (where could_handle_more))::integer as handle_more,
+             coalesce(sum(feeling_rating), 0)::integer as feeling
+        from calibration_sessions
+       where user_id between p_first and p_last
+       group by user_id
+    ) totals;
+$$;
+
+revoke all on function public.calibration_aggregates(uuid, uuid) from public, anon, authenticated;
+grant execute on function public.calibration_aggregates(uuid, uuid) to service_role;
@@ -0,0 +1,97 @@
+"""Fixtures: the app on an empty local_db.LocalPostgrest store.
+
+Tests are async through the anyio pytest plugin (installed with httpx) and
+drive the app with httpx.ASGITransport, which skips the lifespan, so no
+warm-up or background jobs run. Each test gets a fresh store and fresh
+per-process caches and indexes.
+"""
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SUPABASE_URL", "http://upstream")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test-secret")
+
+import httpx
+import pytest
+from jose import jwt
+
+from db import db
+from local_db import LocalPostgrest
+from main import app
+from routers.auth import redeemed_tickets, verified_tokens
+from services.friend_graph import friend_graph
+from services.group_live import live_reads
+from services.groups import group_reads
+from services.leaderboard_index import board_loads, leaderboards
+from services.profile_cache import profiles
+from services.session_store import session_store
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def store():
+    store = LocalPostgrest()
+    db.use_transport(store)
+    for cache in (profiles, verified_tokens, redeemed_tickets):
+        cache.clear()
+    leaderboards.clear()
+    for flight in (board_loads, group_reads, live_reads):
+        flight.__init__(ttl=flight.ttl)
+    friend_graph.__init__()
+    session_store.__init__()
+    return store
+
+
+@pytest.fixture
+async def client(store):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+
+
+def auth(user_id: str) -> dict:
+    token = jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "exp": time.time() + 3600},
+        os.environ["SUPABASE_JWT_SECRET"],
+    )
+    return {"Authorization": f"Bearer {token}"}
+
+
+def add_profile(store: LocalPostgrest, **fields) -> dict:
+    profile = {
+        "id": str(uuid.uuid4()),
+        "display_name": "Student",
+        "weight_lbs": 160,
+        "biological_gender": "male",
+        "calculated_low_limit": 2,
+        "calculated_med_limit": 4,
+        "calculated_high_limit": 6,
+        "completed_sessions": 0,
+        "unread_alerts": 0,
+        "calibration_count": 0,
+        "show_on_leaderboard": True,
+        **fields,
+    }
+    store.add("profiles", [profile])
+    return profile
+
+
+def add_session(store: LocalPostgrest, user_id: str, hours_ago: float = 1, **fields) -> dict:
+    session = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "started_at": (datetime.now(timezone.utc) - timedelta(hours=hours_ago)).isoformat(),
+        "ended_at": None,
+        "is_active": True,
+        "status": "active",
+        "total_standard_drinks": 0,
+        "peak_bac": None,
+        **fields,
+    }
+    store.add("drink_sessions", [session])
+    return session
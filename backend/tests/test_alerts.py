@@ -0,0 +1,40 @@
+"""Friend alerts and the unread counter on cached profiles."""
+import uuid
+
+import pytest
+
+from conftest import add_profile, add_session, auth
+from services.alert_service import send_friend_alerts
+
+
+@pytest.mark.anyio
+async def test_cached_profile_follows_the_unread_counter(store, client):
+    me, friend = add_profile(store), add_profile(store)
+    store.add(
+        "friendships",
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "requester_id": me["id"],
+                "addressee_id": friend["id"],
+                "status": "accepted",
+                "can_see_drinks": True,
+            }
+        ],
+    )
+    session = add_session(store, me["id"])
+
+    async def unread_on_profile() -> int:
+        response = await client.get("/api/profile/", headers=auth(friend["id"]))
+        return response.json()["unread_alerts"]
+
+    assert await unread_on_profile() == 0
+    await send_friend_alerts(me["id"], session["id"], 0.05, "low")
+    assert await unread_on_profile() == 1
+
+    inbox = await client.get("/api/social/alerts", headers=auth(friend["id"]))
+    response = await client.put(
+        "/api/social/alerts/read", json={"cursor": inbox.json()["read_cursor"]}, headers=auth(friend["id"])
+    )
+    assert response.json()["unread"] == 0
+    assert await unread_on_profile() == 0
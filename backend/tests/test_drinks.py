@@ -0,0 +1,111 @@
+"""Drink logging routes."""
+import asyncio
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from conftest import add_profile, add_session, auth
+from db import db
+from services.bac_calculator import DRINK_STANDARD_EQUIVALENTS, calculate_bac
+
+
+class Interleaved(httpx.AsyncBaseTransport):
+    """Yields to the event loop before every upstream call, so concurrent
+    requests interleave their round trips as they would over the network."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.005)
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.mark.anyio
+async def test_concurrent_logs_lose_no_update(store, client):
+    me = add_profile(store)
+    session = add_session(store, me["id"])
+    db.use_transport(Interleaved(store))
+    drinks = ["beer", "shot", "mixed", "beer", "shot", "beer", "mixed", "shot"]
+
+    responses = await asyncio.gather(
+        *(
+            client.post("/api/drinks/log", json={"session_id": session["id"], "drink_type": d}, headers=auth(me["id"]))
+            for d in drinks
+        )
+    )
+    assert [r.status_code for r in responses] == [200] * len(drinks)
+
+    expected = sum(DRINK_STANDARD_EQUIVALENTS[d] for d in drinks)
+    assert store.get("drink_sessions", session["id"])["total_standard_drinks"] == pytest.approx(expected)
+    assert len(store.lookup("drink_logs", "session_id", session["id"])) == len(drinks)
+    assert max(r.json()["total_standard_drinks"] for r in responses) == pytest.approx(expected)
+
+
+@pytest.mark.anyio
+async def test_log_to_someone_elses_session_is_not_found(store, client):
+    me, other = add_profile(store), add_profile(store)
+    session = add_session(store, other["id"])
+
+    response = await client.post(
+        "/api/drinks/log", json={"session_id": session["id"], "drink_type": "beer"}, headers=auth(me["id"])
+    )
+    assert response.status_code == 404
+    assert store.get("drink_sessions", session["id"])["total_standard_drinks"] == 0
+
+
+@pytest.mark.anyio
+async def test_log_and_projection_report_the_same_bac(store, client):
+    me = add_profile(store)
+    session = add_session(store, me["id"], hours_ago=2)
+
+    for drink in ["beer", "mixed", "shot"]:
+        logged = await client.post("/api/drinks/log", json={"session_id": session["id"], "drink_type": drink}, headers=auth(me["id"]))
+        assert logged.status_code == 200
+    projection = await client.get("/api/drinks/sessions/active/projection", headers=auth(me["id"]))
+    curve = await client.get(f"/api/drinks/sessions/{session['id']}/curve", headers=auth(me["id"]))
+
+    assert logged.json()["current_bac"] == logged.json()["projection"]["current_bac"]
+    assert projection.json()["current_bac"] == pytest.approx(logged.json()["current_bac"], abs=1e-4)
+    assert "current_bac" not in curve.json() and "curve_bac" in curve.json()
+
+
+@pytest.mark.anyio
+async def test_history_counts_drinks_not_log_rows(store, client):
+    me = add_profile(store)
+    session = add_session(store, me["id"], hours_ago=3)
+    for drink, quantity in [("beer", 2), ("beer", 1), ("shot", 3), ("mixed", 1)]:
+        response = await client.post(
+            "/api/drinks/log",
+            json={"session_id": session["id"], "drink_type": drink, "quantity": quantity},
+            headers=auth(me["id"]),
+        )
+        assert response.status_code == 200
+    ended = await client.put(f"/api/drinks/sessions/{session['id']}/end", headers=auth(me["id"]))
+    assert ended.status_code == 200
+
+    history = await client.get("/api/drinks/history", headers=auth(me["id"]))
+    [summary] = history.json()["sessions"]
+    assert (summary["beers"], summary["shots"], summary["mixed"]) == (3, 3, 1)
+
+
+@pytest.mark.anyio
+async def test_backfilled_batch_stores_the_peak_in_the_log_model(store, client):
+    me = add_profile(store)
+    session = add_session(store, me["id"], hours_ago=3)
+    started_at = datetime.fromisoformat(session["started_at"])
+    drinks = [
+        {"client_id": str(i), "drink_type": "beer", "logged_at": (started_at + timedelta(minutes=10 + i)).isoformat()}
+        for i in range(4)
+    ]
+
+    response = await client.post(
+        "/api/drinks/log/batch", json={"session_id": session["id"], "drinks": drinks}, headers=auth(me["id"])
+    )
+    assert response.status_code == 200
+
+    # What /log would have stored had each drink been logged as it was had
+    expected = calculate_bac(4, me["weight_lbs"], me["biological_gender"], 13 / 60)
+    assert response.json()["peak_bac"] == pytest.approx(expected)
+    assert store.get("drink_sessions", session["id"])["peak_bac"] == pytest.approx(expected)
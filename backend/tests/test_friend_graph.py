@@ -0,0 +1,85 @@
+"""Rebuilding the in-memory friend graph from storage."""
+import uuid
+
+import pytest
+
+from conftest import add_profile, add_session, auth
+from services.friend_graph import friend_graph
+
+
+@pytest.mark.anyio
+async def test_rebuild_pages_past_max_rows_and_keeps_active_overrides(store):
+    store.max_rows = 50
+    me = add_profile(store)
+    friends = [add_profile(store) for _ in range(120)]
+    store.add(
+        "friendships",
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "requester_id": me["id"],
+                "addressee_id": f["id"],
+                "status": "accepted",
+                "can_see_drinks": True,
+            }
+            for f in friends
+        ],
+    )
+    # Each friend has an active session hiding it from me, and an ended one
+    active = [add_session(store, f["id"]) for f in friends]
+    ended = [add_session(store, f["id"], is_active=False, status="completed") for f in friends]
+    store.add(
+        "night_privacy_overrides",
+        [
+            {"user_id": s["user_id"], "session_id": s["id"], "friend_id": me["id"], "can_see": False}
+            for s in active + ended
+        ],
+    )
+
+    assert await friend_graph.rebuild() == len(friends)
+    assert friend_graph.stats()["override_sessions"] == len(active)
+    assert not any(friend_graph.can_see_drinks(me["id"], s["user_id"], s["id"]) for s in active)
+    assert all(friend_graph.can_see_drinks(me["id"], s["user_id"], s["id"]) for s in ended)
+
+
+@pytest.mark.anyio
+async def test_only_the_session_owner_can_hide_it(store, client):
+    owner, viewer, stranger = add_profile(store), add_profile(store), add_profile(store)
+    store.add(
+        "friendships",
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "requester_id": owner["id"],
+                "addressee_id": viewer["id"],
+                "status": "accepted",
+                "can_see_drinks": True,
+            }
+        ],
+    )
+    session = add_session(store, owner["id"])
+    await friend_graph.rebuild()
+
+    response = await client.post(
+        "/api/social/privacy/override",
+        json={"session_id": session["id"], "friend_id": viewer["id"], "can_see": False},
+        headers=auth(stranger["id"]),
+    )
+    assert response.status_code == 403
+    assert friend_graph.drink_viewers(owner["id"], session["id"]) == [viewer["id"]]
+
+    # A row written around the API by someone else is ignored on rebuild
+    store.add(
+        "night_privacy_overrides",
+        [{"user_id": stranger["id"], "session_id": session["id"], "friend_id": viewer["id"], "can_see": False}],
+    )
+    await friend_graph.rebuild()
+    assert friend_graph.can_see_drinks(viewer["id"], owner["id"], session["id"])
+
+    response = await client.post(
+        "/api/social/privacy/override",
+        json={"session_id": session["id"], "friend_id": viewer["id"], "can_see": False},
+        headers=auth(owner["id"]),
+    )
+    assert response.status_code == 200
+    assert friend_graph.drink_viewers(owner["id"], session["id"]) == []
@@ -0,0 +1,43 @@
+"""A group's live dashboard and who may see each member on it."""
+import uuid
+
+import pytest
+
+from conftest import add_profile, add_session, auth
+
+
+def add_group(store, creator: dict, members: list[dict]) -> str:
+    group_id = str(uuid.uuid4())
+    store.add("friend_groups", [{"id": group_id, "name": "Friday", "creator_id": creator["id"]}])
+    store.add("friend_group_members", [{"group_id": group_id, "user_id": m["id"]} for m in members])
+    return group_id
+
+
+@pytest.mark.anyio
+async def test_overrides_only_apply_to_their_own_session(store, client):
+    owner, other, viewer = add_profile(store), add_profile(store), add_profile(store)
+    store.add(
+        "friendships",
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "requester_id": user["id"],
+                "addressee_id": viewer["id"],
+                "status": "accepted",
+                "can_see_drinks": True,
+            }
+            for user in (owner, other)
+        ],
+    )
+    session = add_session(store, owner["id"])
+    add_session(store, other["id"])
+    group_id = add_group(store, owner, [owner, other, viewer])
+    # other's row names owner's session, so it hides neither of them
+    store.add(
+        "night_privacy_overrides",
+        [{"user_id": other["id"], "session_id": session["id"], "friend_id": viewer["id"], "can_see": False}],
+    )
+
+    response = await client.get(f"/api/social/groups/{group_id}/live", headers=auth(viewer["id"]))
+    assert response.status_code == 200
+    assert {m["id"] for m in response.json()["members"]} == {owner["id"], other["id"], viewer["id"]}
@@ -0,0 +1,53 @@
+"""University and group leaderboards."""
+import pytest
+
+from conftest import add_profile, auth
+from services.leaderboard_index import leaderboards
+
+SCHOOL = "Stanford University"
+
+
+@pytest.mark.anyio
+async def test_university_board_loads_past_the_max_rows_cap(store):
+    store.max_rows = 50
+    users = [add_profile(store, university_name=SCHOOL, completed_sessions=i % 17) for i in range(130)]
+    add_profile(store, university_name=SCHOOL, show_on_leaderboard=False)
+
+    board = await leaderboards.university(SCHOOL)
+    assert len(board) == len(users)
+
+
+@pytest.mark.anyio
+async def test_boards_are_keyed_by_canonical_name_only(store, client):
+    me = add_profile(store, university_name=SCHOOL)
+
+    response = await client.get("/api/leaderboard/university", params={"name": "stanford  university"}, headers=auth(me["id"]))
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+
+    response = await client.get("/api/leaderboard/university", params={"name": "No Such College 123"}, headers=auth(me["id"]))
+    assert response.status_code == 404
+    assert list(leaderboards.universities) == [SCHOOL]
+
+
+@pytest.mark.anyio
+async def test_pages_total_and_ranks_cover_a_board_larger_than_max_rows(store, client):
+    store.max_rows = 50
+    users = [add_profile(store, university_name=SCHOOL, completed_sessions=i % 17) for i in range(130)]
+
+    entries, cursor = [], None
+    while True:
+        params = {"name": SCHOOL, "limit": 40, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/api/leaderboard/university", params=params, headers=auth(users[0]["id"]))).json()
+        assert page["total"] == len(users)
+        entries += page["entries"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(e["id"] for e in entries) == sorted(u["id"] for u in users)
+    assert [e["sessions"] for e in entries] == sorted((u["completed_sessions"] for u in users), reverse=True)
+
+    for user in users[:20]:
+        mine = (await client.get("/api/leaderboard/university/me", params={"name": SCHOOL}, headers=auth(user["id"]))).json()
+        ahead = sum(1 for u in users if u["completed_sessions"] > user["completed_sessions"])
+        assert (mine["rank"], mine["sessions"], mine["total"]) == (ahead + 1, user["completed_sessions"], len(users))
@@ -0,0 +1,35 @@
+"""local_db.LocalPostgrest through the real postgrest-py client."""
+import pytest
+
+from conftest import add_profile, add_session
+from db import db
+
+
+@pytest.mark.anyio
+async def test_filters_order_and_embeds(store):
+    alice = add_profile(store, display_name="Alice", university="Stanford University")
+    add_profile(store, display_name="Bob", university="Stanford University")
+    add_profile(store, display_name="Cy", university="Rice University")
+    add_session(store, alice["id"])
+
+    result = await (
+        db.table("profiles")
+        .select("display_name, drink_sessions(is_active)")
+        .eq("university", "Stanford University")
+        .order("display_name", desc=True)
+        .execute()
+    )
+    assert [p["display_name"] for p in result.data] == ["Bob", "Alice"]
+    assert result.data[1]["drink_sessions"] == [{"is_active": True}]
+
+
+@pytest.mark.anyio
+async def test_max_rows_truncates_reads_silently(store):
+    store.max_rows = 2
+    for _ in range(5):
+        add_profile(store)
+
+    result = await db.table("profiles").select("id").order("id").execute()
+    assert len(result.data) == 2
+    result = await db.table("profiles").select("id").order("id").limit(10).execute()
+    assert len(result.data) == 2
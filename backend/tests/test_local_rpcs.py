@@ -0,0 +1,118 @@
+"""The RPC stand-ins in local_rpcs.py against the functions in sql/."""
+import re
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from conftest import add_profile, add_session
+from local_rpcs import RPCS
+from services import housekeeping
+from services.alert_service import mark_alerts_read
+from services.drink_logger import complete_session, record_drink
+from services.scheduler import Scheduler
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+
+def test_every_sql_function_has_a_stand_in():
+    defined = set()
+    for path in (BACKEND / "sql").glob("*.sql"):
+        defined |= set(re.findall(r"create or replace function public\.(\w+)", path.read_text()))
+    assert defined == set(RPCS)
+
+
+def test_every_rpc_the_app_calls_has_a_stand_in():
+    called = set()
+    for path in BACKEND.rglob("*.py"):
+        if {"tests", "benchmarks"} & set(path.relative_to(BACKEND).parts):
+            continue
+        called |= set(re.findall(r'\.rpc\(\s*"(\w+)"', path.read_text()))
+    assert called and called <= set(RPCS)
+
+
+@pytest.mark.anyio
+async def test_log_drink_accumulates_and_rejects_foreign_sessions(store):
+    me, other = add_profile(store), add_profile(store)
+    session = add_session(store, me["id"])
+
+    first = await record_drink(me["id"], session["id"], "beer", 1, 1.0)
+    second = await record_drink(me["id"], session["id"], "shot", 2, 2.0)
+    assert (first["previous_total"], second["previous_total"]) == (0, 1.0)
+    assert second["total_standard_drinks"] == 3.0
+    assert len(store.lookup("drink_logs", "session_id", session["id"])) == 2
+
+    assert await record_drink(other["id"], session["id"], "beer", 1, 1.0) is None
+
+
+@pytest.mark.anyio
+async def test_complete_session_counts_once(store):
+    me = add_profile(store)
+    session = add_session(store, me["id"])
+
+    first = await complete_session(me["id"], session["id"])
+    again = await complete_session(me["id"], session["id"])
+    assert first["completed_sessions"] == 1
+    assert again["completed_sessions"] is None
+    assert store.get("profiles", me["id"])["completed_sessions"] == 1
+
+
+@pytest.mark.anyio
+async def test_close_stale_sessions_closes_idle_sessions_only(store):
+    idle, busy = add_profile(store), add_profile(store)
+    stale = add_session(store, idle["id"], hours_ago=12)
+    fresh = add_session(store, busy["id"], hours_ago=12)
+    store.add(
+        "drink_logs",
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "session_id": fresh["id"],
+                "drink_type": "beer",
+                "quantity": 1,
+                "standard_drink_equivalent": 1.0,
+                "logged_at": datetime.now(timezone.utc).isoformat(),
+            }
+        ],
+    )
+
+    assert await housekeeping.close_stale_sessions() == 1
+    assert store.get("drink_sessions", stale["id"])["status"] == "completed"
+    assert store.get("drink_sessions", fresh["id"])["is_active"]
+
+
+@pytest.mark.anyio
+async def test_acquire_lease_has_one_holder_until_it_lapses(store):
+    first, second = Scheduler(), Scheduler()
+    job = first.add("sweep", 60, lambda: None, lease=True)
+    other = second.add("sweep", 60, lambda: None, lease=True)
+
+    assert await first._acquire(job)
+    assert not await second._acquire(other)
+    store.get("scheduler_leases", "sweep")["expires_at"] = time.time() - 1
+    assert await second._acquire(other)
+
+
+@pytest.mark.anyio
+async def test_mark_alerts_read_lowers_the_counter_by_the_alerts_marked(store):
+    me, friend = add_profile(store), add_profile(store)
+    start = datetime.now(timezone.utc) - timedelta(minutes=10)
+    alerts = [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": friend["id"],
+            "friend_id": me["id"],
+            "message": f"alert {i}",
+            "is_read": False,
+            "created_at": (start + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(3)
+    ]
+    store.add("friend_alerts", alerts)
+    store.get("profiles", me["id"])["unread_alerts"] = 3
+
+    assert await mark_alerts_read(me["id"], (alerts[1]["created_at"], alerts[1]["id"])) == 1
+    assert await mark_alerts_read(me["id"], (alerts[1]["created_at"], alerts[1]["id"])) == 1
+    assert [a["is_read"] for a in alerts] == [True, True, False]
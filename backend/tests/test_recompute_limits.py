@@ -0,0 +1,50 @@
+"""scripts/recompute_limits.py against a store that caps reads."""
+import random
+import uuid
+
+import pytest
+
+from conftest import add_profile
+from scripts.recompute_limits import recompute
+from services.limit_engine import adjust_limits_from_calibration, limits_version
+
+
+@pytest.mark.anyio
+async def test_recompute_reads_past_the_max_rows_cap(store):
+    rng = random.Random(5)
+    store.max_rows = 50
+    profiles = [
+        add_profile(
+            store,
+            weight_lbs=rng.randint(110, 260),
+            biological_gender=rng.choice(["male", "female"]),
+            calibration_count=3,
+        )
+        for _ in range(120)
+    ]
+    sessions = [
+        {
+            "id": str(uuid.uuid4()),
+            "user_id": p["id"],
+            "session_number": n + 1,
+            "could_handle_more": rng.random() < 0.5,
+            "feeling_rating": rng.randint(1, 5),
+        }
+        for p in profiles
+        for n in range(rng.choice([3, 4]))
+    ]
+    store.add("calibration_sessions", sessions)
+    assert len(sessions) > 4 * store.max_rows
+
+    stats = await recompute(chunk_size=100, dry_run=False)
+    assert stats["profiles"] == len(profiles)
+
+    for p in profiles:
+        expected = await adjust_limits_from_calibration(p["id"], p["weight_lbs"], p["biological_gender"])
+        stored = store.get("profiles", p["id"])
+        assert (stored["calculated_low_limit"], stored["calculated_med_limit"], stored["calculated_high_limit"]) == (
+            expected["low"],
+            expected["med"],
+            expected["high"],
+        )
+        assert stored["limits_version"] == limits_version(p["weight_lbs"], p["biological_gender"])
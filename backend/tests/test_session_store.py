@@ -0,0 +1,135 @@
+"""The in-memory session store (SESSION_STORE=1) against the database."""
+import httpx
+import pytest
+
+from conftest import add_profile, add_session, auth
+from db import db
+from services import housekeeping
+from services.session_store import session_store
+
+
+class DuringRpc(httpx.AsyncBaseTransport):
+    """Runs a callback just before forwarding a call to the named RPC."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, rpc: str, callback):
+        self.inner, self.rpc, self.callback = inner, rpc, callback
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith(f"/rpc/{self.rpc}"):
+            self.callback()
+        return await self.inner.handle_async_request(request)
+
+
+@pytest.fixture
+async def loaded(store, tmp_path):
+    session_store.__init__(journal_path=str(tmp_path / "journal.ndjson"))
+    yield store
+    await session_store.stop()
+
+
+@pytest.mark.anyio
+async def test_drink_logged_during_a_batch_is_kept(loaded, client):
+    me = add_profile(loaded)
+    session = add_session(loaded, me["id"])
+    await session_store.load()
+    db.use_transport(
+        DuringRpc(
+            loaded,
+            "log_drinks",
+            lambda: session_store.log_drink(me["id"], session["id"], "shot", 1, 1.0, me),
+        )
+    )
+
+    response = await client.post(
+        "/api/drinks/log/batch",
+        json={"session_id": session["id"], "drinks": [{"client_id": "a", "drink_type": "beer"}]},
+        headers=auth(me["id"]),
+    )
+    assert response.status_code == 200
+
+    assert session_store.get(me["id"]).total == pytest.approx(2.0)
+    await session_store.flush()
+    assert loaded.get("drink_sessions", session["id"])["total_standard_drinks"] == pytest.approx(2.0)
+
+
+@pytest.mark.anyio
+async def test_stale_sweep_stores_queued_drinks_first(loaded, client):
+    me = add_profile(loaded)
+    session = add_session(loaded, me["id"], hours_ago=12)
+    await session_store.load()
+
+    response = await client.post(
+        "/api/drinks/log", json={"session_id": session["id"], "drink_type": "beer"}, headers=auth(me["id"])
+    )
+    assert response.status_code == 200
+
+    assert await housekeeping.close_stale_sessions() == 0
+    assert loaded.get("drink_sessions", session["id"])["is_active"]
+    assert session_store.get(me["id"]) is not None
+
+
+@pytest.mark.anyio
+async def test_load_pages_past_the_max_rows_cap(loaded):
+    loaded.max_rows = 50
+    users = [add_profile(loaded) for _ in range(130)]
+    for user in users:
+        add_session(loaded, user["id"])
+
+    await session_store.load()
+    assert all(session_store.get(user["id"]) for user in users)
+
+
+@pytest.mark.anyio
+async def test_no_drink_is_queued_while_a_session_ends(loaded, client):
+    me = add_profile(loaded)
+    session = add_session(loaded, me["id"])
+    await session_store.load()
+    late = []
+    db.use_transport(
+        DuringRpc(
+            loaded,
+            "complete_session",
+            lambda: late.append(session_store.log_drink(me["id"], session["id"], "beer", 1, 1.0, me)),
+        )
+    )
+
+    response = await client.put(f"/api/drinks/sessions/{session['id']}/end", headers=auth(me["id"]))
+    assert response.status_code == 200
+    assert late == [None]
+    assert session_store.get(me["id"]) is None
+
+
+@pytest.mark.anyio
+async def test_ending_someone_elses_session_keeps_yours(loaded, client):
+    me, other = add_profile(loaded), add_profile(loaded)
+    session = add_session(loaded, me["id"])
+    theirs = add_session(loaded, other["id"])
+    await session_store.load()
+
+    response = await client.put(f"/api/drinks/sessions/{theirs['id']}/end", headers=auth(me["id"]))
+    assert response.status_code == 404
+    assert session_store.get(me["id"]).id == session["id"]
+    assert session_store.get(other["id"]).id == theirs["id"]
+
+
+@pytest.mark.anyio
+async def test_no_drink_is_queued_while_the_sweep_closes_a_session(loaded):
+    me, busy = add_profile(loaded), add_profile(loaded)
+    session = add_session(loaded, me["id"], hours_ago=12)
+    add_session(loaded, busy["id"], hours_ago=1)
+    await session_store.load()
+    late = []
+    db.use_transport(
+        DuringRpc(
+            loaded,
+            "close_stale_sessions",
+            lambda: late.append(session_store.log_drink(me["id"], session["id"], "beer", 1, 1.0, me)),
+        )
+    )
+
+    assert await housekeeping.close_stale_sessions() == 1
+    assert late[0] is None
+    assert session_store.get(me["id"]) is None
+    assert session_store.get(busy["id"]) is not None
+    await session_store.flush()
+    assert loaded.get("drink_sessions", session["id"])["total_standard_drinks"] == 0
@@ -0,0 +1,50 @@
+"""Authenticating the event stream without a JWT in the query string."""
+import os
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from jose import JWTError, jwt
+
+from conftest import auth
+from routers.auth import get_stream_user
+
+
+async def ticket_for(client, user_id: str) -> str:
+    response = await client.post("/api/auth/stream-ticket", headers=auth(user_id))
+    assert response.status_code == 200
+    return response.json()["ticket"]
+
+
+@pytest.mark.anyio
+async def test_ticket_opens_one_stream(client):
+    me = str(uuid.uuid4())
+    ticket = await ticket_for(client, me)
+
+    assert await get_stream_user(None, ticket) == me
+    with pytest.raises(HTTPException) as refused:
+        await get_stream_user(None, ticket)
+    assert refused.value.status_code == 401
+
+
+@pytest.mark.anyio
+async def test_query_string_takes_no_access_token(client):
+    me = str(uuid.uuid4())
+    token = auth(me)["Authorization"].removeprefix("Bearer ")
+
+    response = await client.get("/api/social/stream", params={"access_token": token})
+    assert response.status_code == 401
+    with pytest.raises(HTTPException):
+        await get_stream_user(None, token)
+
+
+@pytest.mark.anyio
+async def test_ticket_is_not_a_bearer_token(client):
+    me = str(uuid.uuid4())
+    ticket = await ticket_for(client, me)
+
+    response = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {ticket}"})
+    assert response.status_code == 401
+    # Not even under another audience: Supabase's secret didn't sign it
+    with pytest.raises(JWTError):
+        jwt.decode(ticket, os.environ["SUPABASE_JWT_SECRET"], algorithms=["HS256"], options={"verify_aud": False})
@@ -0,0 +1,34 @@
+"""The university list: shipped with the backend and required at startup."""
+import os
+
+import pytest
+
+import config
+import main
+from conftest import add_profile, auth
+
+
+def test_default_list_ships_inside_backend():
+    backend = os.path.dirname(os.path.abspath(config.__file__))
+    assert os.path.commonpath([backend, os.path.abspath(config.UNIVERSITIES_CSV)]) == backend
+    assert os.path.exists(config.UNIVERSITIES_CSV)
+
+
+@pytest.mark.anyio
+async def test_startup_fails_without_the_list(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "UNIVERSITIES_CSV", str(tmp_path / "missing.csv"))
+    with pytest.raises(RuntimeError, match="University list not found"):
+        async with main.lifespan(main.app):
+            pass
+
+
+@pytest.mark.anyio
+async def test_profile_update_rejects_unknown_university(store, client):
+    me = add_profile(store)
+
+    response = await client.put("/api/profile/", json={"university_name": "No Such College 123"}, headers=auth(me["id"]))
+    assert response.status_code == 422
+
+    response = await client.put("/api/profile/", json={"university_name": "stanford university"}, headers=auth(me["id"]))
+    assert response.status_code == 200
+    assert response.json()["university_name"] == "Stanford University"